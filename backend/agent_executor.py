@@ -0,0 +1,214 @@
+"""
+Agent executor for Google ADK Agent Platform
+Function-calling loop that runs an agent's tool calls concurrently and streams each step
+"""
+
+import asyncio
+import json
+import re
+import time
+import uuid
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, Awaitable, Callable, Collection, Dict, List, Optional, Tuple
+
+import structlog
+
+logger = structlog.get_logger(__name__)
+
+
+@dataclass
+class Tool:
+    """A function the model may call, bound to the plugin method that implements it"""
+    name: str
+    description: str
+    parameters: Dict[str, Any]
+    plugin_id: str
+    method: str
+
+    def spec(self) -> Dict[str, Any]:
+        """OpenAI-style function tool definition"""
+        return {
+            "type": "function",
+            "function": {"name": self.name, "description": self.description, "parameters": self.parameters}
+        }
+
+
+@dataclass
+class ToolCall:
+    id: str
+    name: str
+    arguments: Dict[str, Any] = field(default_factory=dict)
+
+    @property
+    def cache_key(self) -> Tuple[str, str]:
+        return self.name, json.dumps(self.arguments, sort_keys=True, default=str)
+
+
+# complete(messages, tool_specs) -> {"content": str, "tool_calls": [ToolCall, ...], "usage": {name: tokens}}
+CompleteFunc = Callable[[List[Dict[str, Any]], List[Dict[str, Any]]], Awaitable[Dict[str, Any]]]
+# invoke(tool, arguments) -> JSON-serializable result; exceptions are reported to the model
+InvokeFunc = Callable[[Tool, Dict[str, Any]], Awaitable[Any]]
+
+
+def tool_name(plugin_name: str, method: str, taken: Collection[str] = ()) -> str:
+    """A function name providers accept: [a-zA-Z0-9_-], at most 64 characters.
+
+    Sanitizing and truncating can map different methods to the same name, so
+    a name already in `taken` gets a numeric suffix.
+    """
+    name = re.sub(r"[^a-zA-Z0-9_-]+", "_", f"{plugin_name}__{method}").strip("_")[:64]
+    suffix = 1
+    candidate = name
+    while candidate in taken:
+        suffix += 1
+        candidate = f"{name[:63 - len(str(suffix))]}_{suffix}"
+    return candidate
+
+
+def parse_tool_calls(raw_calls: Optional[List[Any]]) -> List[ToolCall]:
+    """Tool calls from a provider response message, with JSON arguments decoded"""
+    calls = []
+    for raw in raw_calls or []:
+        function = raw["function"] if isinstance(raw, dict) else raw.function
+        name = function["name"] if isinstance(function, dict) else function.name
+        arguments = function["arguments"] if isinstance(function, dict) else function.arguments
+        if isinstance(arguments, str):
+            try:
+                arguments = json.loads(arguments) if arguments.strip() else {}
+            except json.JSONDecodeError:
+                arguments = {"_raw": arguments}
+        call_id = (raw.get("id") if isinstance(raw, dict) else getattr(raw, "id", None)) or str(uuid.uuid4())
+        calls.append(ToolCall(call_id, name, arguments if isinstance(arguments, dict) else {"value": arguments}))
+    return calls
+
+
+class AgentExecutor:
+    """Runs one agent turn: model call, tool calls, repeat until a final answer.
+
+    Every tool call the model makes in one response is independent by
+    construction, so they run concurrently. Results are cached for the turn
+    by (tool, arguments); a repeated call, in the same response or a later
+    one, reuses the first result instead of running the plugin again. At most
+    `max_iterations` model calls are made with tools; if the model is still
+    calling tools after that, one more call without tools asks it to answer
+    from the results it has.
+    """
+
+    def __init__(self, complete: CompleteFunc, invoke: InvokeFunc, tools: List[Tool], max_iterations: int = 5):
+        self.complete = complete
+        self.invoke = invoke
+        self.tools = {tool.name: tool for tool in tools}
+        self.max_iterations = max(1, max_iterations)
+        self._cache: Dict[Tuple[str, str], "asyncio.Future"] = {}
+
+    async def run(self, messages: List[Dict[str, Any]]) -> AsyncIterator[Dict[str, Any]]:
+        """Yield model_response, tool_call and tool_result steps, then a final step"""
+        messages = list(messages)
+        specs = [tool.spec() for tool in self.tools.values()]
+        started = time.monotonic()
+        tool_calls = 0
+        cached_calls = 0
+        usage: Dict[str, int] = {}
+        content = ""
+
+        try:
+            for iteration in range(1, self.max_iterations + 1):
+                response = await self.complete(messages, specs)
+                content = self._record(response, usage)
+                calls: List[ToolCall] = response.get("tool_calls") or []
+                yield {"type": "model_response", "iteration": iteration, "content": content,
+                       "tool_calls": [{"id": c.id, "name": c.name, "arguments": c.arguments} for c in calls]}
+                if not calls:
+                    break
+
+                messages.append({
+                    "role": "assistant",
+                    "content": content or None,
+                    "tool_calls": [{"id": c.id, "type": "function",
+                                    "function": {"name": c.name, "arguments": json.dumps(c.arguments, default=str)}}
+                                   for c in calls]
+                })
+                for call in calls:
+                    yield {"type": "tool_call", "iteration": iteration, "id": call.id,
+                           "name": call.name, "arguments": call.arguments}
+
+                results: Dict[str, Dict[str, Any]] = {}
+                pending = [asyncio.ensure_future(self._call_tool(call)) for call in calls]
+                try:
+                    for next_done in asyncio.as_completed(pending):
+                        step = await next_done
+                        results[step["id"]] = step
+                        tool_calls += 1
+                        cached_calls += step["cached"]
+                        yield {"type": "tool_result", "iteration": iteration, **step}
+                finally:
+                    for task in pending:
+                        task.cancel()
+
+                # Tool messages follow the order of the calls, not their completion
+                for call in calls:
+                    step = results[call.id]
+                    payload = {"error": step["error"]} if "error" in step else step["result"]
+                    messages.append({"role": "tool", "tool_call_id": call.id, "name": call.name,
+                                     "content": json.dumps(payload, default=str)})
+
+            if calls:
+                # The last response asked for tools, so its content is rarely an answer
+                content = await self._final_answer(messages, usage)
+                yield {"type": "model_response", "iteration": iteration + 1, "content": content, "tool_calls": []}
+
+            yield {
+                "type": "final",
+                "response": content,
+                "finish_reason": "max_iterations" if calls else "stop",
+                "empty": not content,
+                "iterations": iteration,
+                "tool_calls": tool_calls,
+                "cached_tool_calls": cached_calls,
+                "usage": usage,
+                "elapsed": time.monotonic() - started
+            }
+        finally:
+            # Shared tool calls nobody is waiting for any more
+            for future in self._cache.values():
+                future.cancel()
+            self._cache.clear()
+
+    @staticmethod
+    def _record(response: Dict[str, Any], usage: Dict[str, int]) -> str:
+        for key, tokens in (response.get("usage") or {}).items():
+            usage[key] = usage.get(key, 0) + tokens
+        return response.get("content") or ""
+
+    async def _final_answer(self, messages: List[Dict[str, Any]], usage: Dict[str, int]) -> str:
+        """One model call without tools once the iteration limit is reached"""
+        try:
+            response = await self.complete(messages, [])
+        except Exception as e:
+            # Some providers refuse tool history without tool definitions; the turn still ends
+            logger.warning("Agent final answer failed after max iterations", error=str(e))
+            return ""
+        return self._record(response, usage)
+
+    async def _call_tool(self, call: ToolCall) -> Dict[str, Any]:
+        started = time.monotonic()
+        step: Dict[str, Any] = {"id": call.id, "name": call.name}
+        tool = self.tools.get(call.name)
+        if tool is None:
+            step.update({"cached": False, "error": f"Unknown tool: {call.name}", "duration": 0.0})
+            return step
+
+        future = self._cache.get(call.cache_key)
+        step["cached"] = future is not None
+        if future is None:
+            future = self._cache[call.cache_key] = asyncio.ensure_future(self.invoke(tool, call.arguments))
+        try:
+            # Shielded so one caller going away does not cancel a result others share
+            step["result"] = await asyncio.shield(future)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            step["error"] = getattr(e, "detail", None) or str(e)
+            logger.warning(f"Agent tool call failed: {call.name}", error=step["error"])
+        step["duration"] = time.monotonic() - started
+        return step
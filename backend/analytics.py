@@ -0,0 +1,198 @@
+"""
+Execution analytics for Google ADK Agent Platform
+Recent plugin and workflow executions in columnar NumPy arrays with vectorized group-by and percentile queries
+"""
+
+import os
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+
+ANALYTICS_MAX_ROWS = int(os.getenv("ANALYTICS_MAX_ROWS", "1000000"))
+
+STATUSES = ["completed", "failed", "timed_out", "budget_exceeded", "partial", "cancelled"]
+FAILURE_STATUSES = ["failed", "timed_out", "budget_exceeded", "partial"]
+TIME_BUCKETS = {"minute": 60, "hour": 3600, "day": 86400}
+LABEL_COLUMNS = ("entity", "method")
+GROUP_KEYS = LABEL_COLUMNS + ("status",) + tuple(TIME_BUCKETS)
+
+
+class AnalyticsQueryError(ValueError):
+    """Raised for an invalid analytics query"""
+
+
+class ColumnarLog:
+    """Append-only execution rows in parallel NumPy columns.
+
+    Labels are interned to integer ids. Columns grow by doubling up to
+    `capacity`, after which the oldest rows are overwritten in place.
+    """
+
+    def __init__(self, capacity: int = ANALYTICS_MAX_ROWS):
+        self.capacity = max(1, capacity)
+        self.size = 0
+        self._next = 0
+        self.timestamp = np.empty(min(1024, self.capacity), dtype=np.float64)
+        self.duration = np.empty_like(self.timestamp)
+        self.status = np.empty(len(self.timestamp), dtype=np.int8)
+        self.entity = np.empty(len(self.timestamp), dtype=np.int32)
+        self.method = np.empty(len(self.timestamp), dtype=np.int32)
+        self.labels: Dict[str, List[str]] = {name: [] for name in LABEL_COLUMNS}
+        self._label_ids: Dict[str, Dict[str, int]] = {name: {} for name in LABEL_COLUMNS}
+
+    def label_id(self, column: str, label: str, create: bool = False) -> Optional[int]:
+        ids = self._label_ids[column]
+        label_id = ids.get(label)
+        if label_id is None and create:
+            label_id = ids[label] = len(self.labels[column])
+            self.labels[column].append(label)
+        return label_id
+
+    def _grow(self) -> None:
+        size = min(self.capacity, len(self.timestamp) * 2)
+        for name in ("timestamp", "duration", "status", "entity", "method"):
+            column = getattr(self, name)
+            grown = np.empty(size, dtype=column.dtype)
+            grown[:len(column)] = column
+            setattr(self, name, grown)
+
+    def append(self, entity: str, method: str, status: str, duration: float, timestamp: float) -> None:
+        if self._next == len(self.timestamp) and len(self.timestamp) < self.capacity:
+            self._grow()
+        index = self._next
+        self.timestamp[index] = timestamp
+        self.duration[index] = duration
+        self.status[index] = STATUSES.index(status) if status in STATUSES else STATUSES.index("failed")
+        self.entity[index] = self.label_id("entity", entity, create=True)
+        self.method[index] = self.label_id("method", method, create=True)
+        self._next = (index + 1) % self.capacity
+        self.size = min(self.size + 1, self.capacity)
+
+
+def _percentiles(values: np.ndarray, groups: np.ndarray, counts: np.ndarray,
+                 percentiles: Sequence[float]) -> Dict[float, np.ndarray]:
+    """Linear-interpolated percentiles of values within each group, without a Python loop over groups"""
+    order = np.lexsort((values, groups))
+    ordered = values[order]
+    starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+    result = {}
+    for q in percentiles:
+        position = starts + (counts - 1) * (q / 100.0)
+        low = np.floor(position).astype(np.int64)
+        high = np.ceil(position).astype(np.int64)
+        result[q] = ordered[low] + (ordered[high] - ordered[low]) * (position - low)
+    return result
+
+
+class ExecutionAnalytics:
+    """Columnar logs of plugin and workflow executions and the queries over them"""
+
+    SOURCES = ("plugins", "workflows")
+
+    def __init__(self, capacity: int = ANALYTICS_MAX_ROWS):
+        self.logs = {source: ColumnarLog(capacity) for source in self.SOURCES}
+
+    def record(self, source: str, entity: str, status: str, duration: Optional[float],
+               timestamp: Optional[datetime] = None, method: str = "") -> None:
+        """Add one finished execution"""
+        when = timestamp.timestamp() if timestamp is not None else time.time()
+        self.logs[source].append(entity, method, status, duration or 0.0, when)
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        return {source: {"rows": log.size, "capacity": log.capacity} for source, log in self.logs.items()}
+
+    def query(self, source: str, group_by: Sequence[str] = ("entity",), percentiles: Sequence[float] = (50, 95, 99),
+              start: Optional[float] = None, end: Optional[float] = None, entity: Optional[str] = None,
+              limit: int = 1000) -> Dict[str, Any]:
+        """Count, failure rate, mean and percentile latency per group.
+
+        Groups combine any of entity, method, status and a minute/hour/day
+        time bucket; rows come back ordered by the group keys.
+        """
+        if source not in self.logs:
+            raise AnalyticsQueryError(f"Unknown source: {source}; use one of {list(self.SOURCES)}")
+        unknown = [key for key in group_by if key not in GROUP_KEYS]
+        if unknown:
+            raise AnalyticsQueryError(f"Cannot group by {unknown[0]}; use any of {list(GROUP_KEYS)}")
+        if any(not 0 <= q <= 100 for q in percentiles):
+            raise AnalyticsQueryError("Percentiles must be between 0 and 100")
+
+        started = time.perf_counter()
+        log = self.logs[source]
+        n = log.size
+        mask = np.ones(n, dtype=bool)
+        timestamps = log.timestamp[:n]
+        if start is not None:
+            mask &= timestamps >= start
+        if end is not None:
+            mask &= timestamps <= end
+        if entity is not None:
+            entity_id = log.label_id("entity", entity)
+            mask &= log.entity[:n] == (-1 if entity_id is None else entity_id)
+
+        columns = {
+            "entity": log.entity[:n][mask].astype(np.int64),
+            "method": log.method[:n][mask].astype(np.int64),
+            "status": log.status[:n][mask].astype(np.int64)
+        }
+        for bucket, width in TIME_BUCKETS.items():
+            if bucket in group_by:
+                columns[bucket] = (timestamps[mask] // width).astype(np.int64)
+        durations = log.duration[:n][mask]
+        failures = np.isin(columns["status"], [STATUSES.index(s) for s in FAILURE_STATUSES])
+
+        # Fold the group columns into one mixed-radix key so grouping is a single np.unique
+        combined = np.zeros(len(durations), dtype=np.int64)
+        offsets, radixes = [], []
+        for key in group_by:
+            values = columns[key]
+            low = int(values.min()) if len(values) else 0
+            radix = int(values.max()) - low + 1 if len(values) else 1
+            combined = combined * radix + (values - low)
+            offsets.append(low)
+            radixes.append(radix)
+        group_keys, groups = np.unique(combined, return_inverse=True)
+        groups = groups.reshape(-1)
+
+        counts = np.bincount(groups, minlength=len(group_keys))
+        failed = np.bincount(groups, weights=failures, minlength=len(group_keys))
+        total_duration = np.bincount(groups, weights=durations, minlength=len(group_keys))
+        latency = _percentiles(durations, groups, counts, percentiles) if len(durations) else {}
+
+        # Decode each group's key back into its labels
+        decoded: Dict[str, np.ndarray] = {}
+        remaining = group_keys.copy()
+        for key, low, radix in reversed(list(zip(group_by, offsets, radixes))):
+            decoded[key] = remaining % radix + low
+            remaining //= radix
+
+        rows = []
+        for i in range(min(len(group_keys), limit)):
+            row: Dict[str, Any] = {}
+            for key in group_by:
+                value = int(decoded[key][i])
+                if key in LABEL_COLUMNS:
+                    row[key] = log.labels[key][value]
+                elif key == "status":
+                    row[key] = STATUSES[value]
+                else:
+                    row[key] = datetime.fromtimestamp(value * TIME_BUCKETS[key]).isoformat()
+            row.update({
+                "count": int(counts[i]),
+                "failures": int(failed[i]),
+                "failure_rate": float(failed[i] / counts[i]),
+                "mean_latency": float(total_duration[i] / counts[i]),
+                **{f"p{q:g}_latency": float(values[i]) for q, values in latency.items()}
+            })
+            rows.append(row)
+
+        return {
+            "source": source,
+            "group_by": list(group_by),
+            "rows": rows,
+            "groups": int(len(group_keys)),
+            "executions": int(len(durations)),
+            "elapsed_ms": (time.perf_counter() - started) * 1000.0
+        }
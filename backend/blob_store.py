@@ -0,0 +1,228 @@
+"""
+Shared-memory blob store for Google ADK Agent Platform
+Large binary payloads live in shared memory and travel between nodes and plugin workers as small handles
+"""
+
+import os
+import sys
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from multiprocessing import resource_tracker, shared_memory
+from typing import Any, Dict, Iterator, List
+
+import structlog
+
+logger = structlog.get_logger(__name__)
+
+BLOB_STORE_MAX_MB = int(os.getenv("BLOB_STORE_MAX_MB", "1024"))
+BLOB_INLINE_THRESHOLD_BYTES = int(os.getenv("BLOB_INLINE_THRESHOLD_BYTES", str(1024 * 1024)))
+
+HANDLE_KEY = "$blob"
+CREATOR = "creator"  # holder of the reference an upload starts with
+
+
+class BlobNotFoundError(KeyError):
+    """Raised when a handle refers to a blob that was released and evicted"""
+
+
+class BlobStoreFullError(Exception):
+    """Raised when pinned blobs leave no room for a new one"""
+
+
+def make_handle(blob_id: str, size: int, content_type: str = "application/octet-stream") -> Dict[str, Any]:
+    """JSON- and pickle-friendly reference to a blob"""
+    return {HANDLE_KEY: blob_id, "size": size, "content_type": content_type}
+
+
+def is_handle(value: Any) -> bool:
+    return isinstance(value, dict) and HANDLE_KEY in value
+
+
+def iter_handles(value: Any) -> Iterator[Dict[str, Any]]:
+    """Every blob handle nested in a JSON-like value"""
+    if is_handle(value):
+        yield value
+    elif isinstance(value, dict):
+        for item in value.values():
+            yield from iter_handles(item)
+    elif isinstance(value, (list, tuple)):
+        for item in value:
+            yield from iter_handles(item)
+
+
+def attach(blob_id: str) -> shared_memory.SharedMemory:
+    """Map an existing segment without letting this process's resource tracker own it.
+
+    Before Python 3.13 attaching registers the segment with the resource
+    tracker, which would unlink it when a worker exits. Workers share the
+    owner's tracker, so unregistering afterwards would also drop the owner's
+    registration; registration is skipped instead.
+    """
+    if sys.version_info >= (3, 13):
+        return shared_memory.SharedMemory(name=blob_id, track=False)
+    register = resource_tracker.register
+    resource_tracker.register = lambda name, rtype: None
+    try:
+        return shared_memory.SharedMemory(name=blob_id)
+    finally:
+        resource_tracker.register = register
+
+
+def discard_detached(handle: Dict[str, Any]) -> None:
+    """Unlink a worker-created segment that will never be adopted"""
+    try:
+        segment = shared_memory.SharedMemory(name=handle[HANDLE_KEY])
+    except FileNotFoundError:
+        return
+    segment.close()
+    segment.unlink()
+
+
+def create_detached(data: bytes, content_type: str = "application/octet-stream") -> Dict[str, Any]:
+    """Copy bytes into a new segment owned by whoever adopts the returned handle"""
+    segment = shared_memory.SharedMemory(create=True, size=max(len(data), 1))
+    resource_tracker.unregister(segment._name, "shared_memory")
+    segment.buf[:len(data)] = data
+    handle = make_handle(segment.name, len(data), content_type)
+    segment.close()
+    return handle
+
+
+@dataclass
+class _Blob:
+    segment: shared_memory.SharedMemory
+    size: int
+    content_type: str
+    created_at: float
+    holders: Dict[str, int] = field(default_factory=dict)  # holder -> references it owns
+
+    @property
+    def refcount(self) -> int:
+        return sum(self.holders.values())
+
+
+class SharedBlobStore:
+    """Owner of shared-memory blobs in the API process.
+
+    References are counted per holder (the uploader, or an execution ID), so
+    a holder can only release references it took. Blobs with any reference
+    are pinned. Unreferenced blobs stay readable until capacity is needed,
+    then the least recently used are unlinked.
+    """
+
+    def __init__(self, max_bytes: int = BLOB_STORE_MAX_MB * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.total_bytes = 0
+        self.blobs: "OrderedDict[str, _Blob]" = OrderedDict()
+
+    def __contains__(self, blob_id: str) -> bool:
+        return blob_id in self.blobs
+
+    def put(self, data: bytes, content_type: str = "application/octet-stream", pinned: bool = True) -> Dict[str, Any]:
+        """Copy bytes into shared memory and return a handle"""
+        self._make_room(len(data))
+        segment = shared_memory.SharedMemory(create=True, size=max(len(data), 1))
+        segment.buf[:len(data)] = data
+        blob = self._register(segment, len(data), content_type)
+        if pinned:
+            blob.holders[CREATOR] = 1
+        return make_handle(segment.name, len(data), content_type)
+
+    def adopt(self, handle: Dict[str, Any]) -> None:
+        """Take ownership of a segment created by a worker (unpinned)"""
+        blob_id = handle[HANDLE_KEY]
+        if blob_id in self.blobs:
+            return
+        self._make_room(handle["size"])
+        # Attaching in the owner registers it with our resource tracker, which is what we want
+        segment = shared_memory.SharedMemory(name=blob_id)
+        self._register(segment, handle["size"], handle.get("content_type", "application/octet-stream"))
+
+    def _register(self, segment: shared_memory.SharedMemory, size: int, content_type: str) -> _Blob:
+        blob = self.blobs[segment.name] = _Blob(segment, size, content_type, time.time())
+        self.total_bytes += size
+        return blob
+
+    def _blob(self, blob_id: str) -> _Blob:
+        blob = self.blobs.get(blob_id)
+        if blob is None:
+            raise BlobNotFoundError(blob_id)
+        self.blobs.move_to_end(blob_id)
+        return blob
+
+    def view(self, handle: Dict[str, Any]) -> memoryview:
+        """Zero-copy view of a blob's bytes"""
+        blob = self._blob(handle[HANDLE_KEY])
+        return blob.segment.buf[:blob.size]
+
+    def handle(self, blob_id: str) -> Dict[str, Any]:
+        blob = self._blob(blob_id)
+        return make_handle(blob_id, blob.size, blob.content_type)
+
+    def retain(self, handle: Dict[str, Any], holder: str = CREATOR) -> None:
+        holders = self._blob(handle[HANDLE_KEY]).holders
+        holders[holder] = holders.get(holder, 0) + 1
+
+    def release(self, handle: Dict[str, Any], holder: str = CREATOR) -> bool:
+        """Drop one of the holder's references; returns False if it held none"""
+        blob = self.blobs.get(handle[HANDLE_KEY])
+        if blob is None or not blob.holders.get(holder):
+            return False
+        blob.holders[holder] -= 1
+        if not blob.holders[holder]:
+            del blob.holders[holder]
+        return True
+
+    def retain_all(self, value: Any, holder: str) -> List[Dict[str, Any]]:
+        """Retain every blob referenced in a value for a holder, returning the handles retained"""
+        retained = []
+        for handle in iter_handles(value):
+            if handle[HANDLE_KEY] in self.blobs:
+                self.retain(handle, holder)
+                retained.append(handle)
+        return retained
+
+    def _make_room(self, size: int) -> None:
+        if self.total_bytes + size <= self.max_bytes:
+            return
+        for blob_id in [b for b, blob in self.blobs.items() if blob.refcount == 0]:
+            self._unlink(blob_id)
+            if self.total_bytes + size <= self.max_bytes:
+                return
+        raise BlobStoreFullError(
+            f"Blob store full: {self.total_bytes + size} bytes needed, {self.max_bytes} allowed"
+        )
+
+    def _unlink(self, blob_id: str) -> None:
+        blob = self.blobs.pop(blob_id)
+        self.total_bytes -= blob.size
+        try:
+            blob.segment.close()
+        except BufferError:
+            # A view is still exported; the mapping lives on until it is dropped
+            logger.warning("Evicted blob still has live views", blob_id=blob_id)
+        blob.segment.unlink()
+
+    def drop(self, blob_id: str) -> bool:
+        """Release the creator's reference, unlinking now unless another holder still has one"""
+        blob = self.blobs.get(blob_id)
+        if blob is None:
+            return False
+        self.release({HANDLE_KEY: blob_id}, CREATOR)
+        if blob.refcount == 0:
+            self._unlink(blob_id)
+        return True
+
+    def close(self) -> None:
+        """Unlink every blob; called at shutdown"""
+        for blob_id in list(self.blobs):
+            self._unlink(blob_id)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "blobs": len(self.blobs),
+            "pinned": sum(1 for blob in self.blobs.values() if blob.refcount > 0),
+            "total_bytes": self.total_bytes,
+            "max_bytes": self.max_bytes
+        }
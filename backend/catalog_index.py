@@ -0,0 +1,199 @@
+"""
+Catalog search index for Google ADK Agent Platform
+In-memory inverted index with prefix and fuzzy matching, facets, usage ranking and pagination
+"""
+
+import bisect
+import heapq
+import math
+import re
+from collections import defaultdict
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+_TOKEN_RE = re.compile(r"\w+")
+
+# Relative weight of a match by how the query token matched the indexed term
+EXACT_MATCH = 1.0
+PREFIX_MATCH = 0.7
+FUZZY_MATCH = 0.4
+MIN_FUZZY_LENGTH = 4
+
+
+def tokenize(text: str) -> List[str]:
+    return _TOKEN_RE.findall(text.lower())
+
+
+def _deletes(term: str) -> Set[str]:
+    """The term plus every variant with one character removed"""
+    return {term} | {term[:i] + term[i + 1:] for i in range(len(term))}
+
+
+def facet_key(value: Any) -> str:
+    """Facet values match regardless of case: "Tool" and "tool" are one value"""
+    return str(value).strip().casefold()
+
+
+class CatalogIndex:
+    """Inverted index over catalog entries.
+
+    Text fields are tokenized into postings weighted per field. Facet fields
+    keep value -> ids sets for filtering and counts, keyed case-insensitively
+    and reported with the first spelling seen. Fuzzy matching uses a
+    one-deletion neighbourhood index, so a query token matches terms within
+    roughly one edit without scanning the vocabulary.
+    """
+
+    def __init__(self, field_weights: Dict[str, float], facet_fields: Iterable[str]):
+        self.field_weights = field_weights
+        self.facet_fields = tuple(facet_fields)
+        self.postings: Dict[str, Dict[str, float]] = defaultdict(dict)
+        self.deletes: Dict[str, Set[str]] = defaultdict(set)
+        self.facets: Dict[str, Dict[str, Set[str]]] = {name: defaultdict(set) for name in self.facet_fields}
+        self.facet_labels: Dict[str, Dict[str, str]] = {name: {} for name in self.facet_fields}  # key -> display value
+        self.documents: Dict[str, Dict[str, Any]] = {}
+        self._terms: List[str] = []
+        self._terms_dirty = False
+
+    def __len__(self) -> int:
+        return len(self.documents)
+
+    def add(self, doc_id: str, fields: Dict[str, Any], facets: Dict[str, Any], rank: float = 0) -> None:
+        """Index an entry, replacing any previous version of it"""
+        if doc_id in self.documents:
+            self.remove(doc_id)
+
+        term_weights: Dict[str, float] = {}
+        for name, weight in self.field_weights.items():
+            value = fields.get(name)
+            if isinstance(value, (list, tuple)):
+                value = " ".join(str(v) for v in value)
+            for term in tokenize(str(value or "")):
+                term_weights[term] = max(term_weights.get(term, 0.0), weight)
+
+        for term, weight in term_weights.items():
+            if term not in self.postings:
+                self._terms_dirty = True
+                for variant in _deletes(term):
+                    self.deletes[variant].add(term)
+            self.postings[term][doc_id] = weight
+
+        facet_values = {}
+        for name in self.facet_fields:
+            value = facets.get(name)
+            if value is not None:
+                key = facet_key(value)
+                facet_values[name] = key
+                self.facets[name][key].add(doc_id)
+                self.facet_labels[name].setdefault(key, str(value).strip())
+
+        self.documents[doc_id] = {
+            "terms": tuple(term_weights),
+            "facets": facet_values,
+            "rank": rank,
+            "sort_name": str(fields.get("name") or "").lower()
+        }
+
+    def remove(self, doc_id: str) -> None:
+        document = self.documents.pop(doc_id, None)
+        if document is None:
+            return
+        for term in document["terms"]:
+            postings = self.postings.get(term)
+            if postings is not None:
+                postings.pop(doc_id, None)
+                # Empty terms stay in the vocabulary; lookups skip them
+        for name, value in document["facets"].items():
+            ids = self.facets[name].get(value)
+            if ids is not None:
+                ids.discard(doc_id)
+                if not ids:
+                    del self.facets[name][value]
+                    self.facet_labels[name].pop(value, None)
+
+    def update_rank(self, doc_id: str, rank: float) -> None:
+        """Change an entry's ranking signal without reindexing its text"""
+        document = self.documents.get(doc_id)
+        if document is not None:
+            document["rank"] = rank
+
+    def facet_values(self, name: str) -> List[str]:
+        labels = self.facet_labels.get(name, {})
+        return [labels[key] for key in sorted(self.facets.get(name, {}))]
+
+    def _sorted_terms(self) -> List[str]:
+        if self._terms_dirty:
+            self._terms = sorted(self.postings)
+            self._terms_dirty = False
+        return self._terms
+
+    def _match_token(self, token: str, fuzzy: bool) -> Dict[str, float]:
+        """Score of each entry matching one query token"""
+        scores: Dict[str, float] = {}
+
+        def collect(term: str, factor: float) -> None:
+            for doc_id, weight in self.postings.get(term, {}).items():
+                score = weight * factor
+                if score > scores.get(doc_id, 0.0):
+                    scores[doc_id] = score
+
+        terms = self._sorted_terms()
+        start = bisect.bisect_left(terms, token)
+        for term in terms[start:]:
+            if not term.startswith(token):
+                break
+            collect(term, EXACT_MATCH if term == token else PREFIX_MATCH)
+
+        if fuzzy and not scores and len(token) >= MIN_FUZZY_LENGTH:
+            candidates = set()
+            for variant in _deletes(token):
+                candidates |= self.deletes.get(variant, set())
+            for term in candidates:
+                collect(term, FUZZY_MATCH)
+
+        return scores
+
+    def search(self, query: str = "", filters: Optional[Dict[str, Optional[str]]] = None,
+               offset: int = 0, limit: Optional[int] = None, fuzzy: bool = True) -> Dict[str, Any]:
+        """Return {"ids", "total", "facets"} for entries matching every query token and filter.
+
+        Results are ordered by text relevance boosted by each entry's rank
+        (usage), or by rank alone for an empty query.
+        """
+        scores: Optional[Dict[str, float]] = None
+        for token in dict.fromkeys(tokenize(query)):
+            token_scores = self._match_token(token, fuzzy)
+            if scores is None:
+                scores = token_scores
+            else:
+                scores = {doc_id: score + token_scores[doc_id]
+                          for doc_id, score in scores.items() if doc_id in token_scores}
+            if not scores:
+                break
+
+        sets = [self.facets.get(name, {}).get(facet_key(value), set())
+                for name, value in (filters or {}).items() if value is not None]
+        if scores is not None:
+            sets.append(scores.keys())
+        # Intersect starting from the smallest set so selective filters stay cheap
+        sets.sort(key=len)
+        candidates: Iterable[str] = self.documents.keys()
+        if sets:
+            candidates = set(sets[0]).intersection(*sets[1:])
+
+        facet_counts: Dict[str, Dict[str, int]] = {name: defaultdict(int) for name in self.facet_fields}
+        ranked: List[Tuple[float, str, str]] = []
+        for doc_id in candidates:
+            document = self.documents[doc_id]
+            for name, key in document["facets"].items():
+                facet_counts[name][self.facet_labels[name][key]] += 1
+            boost = 1.0 + math.log1p(max(document["rank"], 0))
+            relevance = boost if scores is None else scores[doc_id] * boost
+            ranked.append((-relevance, document["sort_name"], doc_id))
+
+        end = None if limit is None else offset + limit
+        page = sorted(ranked) if end is None else heapq.nsmallest(end, ranked)
+        return {
+            "ids": [doc_id for _, _, doc_id in page[offset:end]],
+            "total": len(ranked),
+            "facets": {name: dict(counts) for name, counts in facet_counts.items()}
+        }
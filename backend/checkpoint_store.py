@@ -0,0 +1,146 @@
+"""
+Checkpoint stores for Google ADK Agent Platform workflow executions
+Persist node outputs as each node completes so executions can resume after a restart
+"""
+
+import json
+import os
+import shutil
+from typing import Any, Dict, List, Optional
+
+import structlog
+
+logger = structlog.get_logger(__name__)
+
+
+class CheckpointStore:
+    """Interface for persisting workflow execution progress"""
+
+    durable = False  # whether checkpoints survive a restart
+
+    def begin(self, execution_id: str, header: Dict[str, Any]) -> None:
+        """Record a new execution with everything needed to restart it"""
+        raise NotImplementedError
+
+    def save_node_output(self, execution_id: str, node_id: str, output: Any,
+                         usage: Optional[Dict[str, Any]] = None) -> None:
+        """Record the output of a completed node and the execution's usage so far"""
+        raise NotImplementedError
+
+    def complete(self, execution_id: str) -> None:
+        """Forget an execution that reached a terminal state"""
+        raise NotImplementedError
+
+    def load(self, execution_id: str) -> Optional[Dict[str, Any]]:
+        """Return {"header": ..., "node_outputs": ..., "usage": ...} for an incomplete execution"""
+        raise NotImplementedError
+
+    def list_incomplete(self) -> List[Dict[str, Any]]:
+        """Return checkpoints of all executions that never reached a terminal state"""
+        raise NotImplementedError
+
+
+class InMemoryCheckpointStore(CheckpointStore):
+    """Process-local store; survives task failures but not restarts"""
+
+    def __init__(self):
+        self.checkpoints: Dict[str, Dict[str, Any]] = {}
+
+    def begin(self, execution_id: str, header: Dict[str, Any]) -> None:
+        self.checkpoints[execution_id] = {"header": header, "node_outputs": {}, "usage": {}}
+
+    def save_node_output(self, execution_id: str, node_id: str, output: Any,
+                         usage: Optional[Dict[str, Any]] = None) -> None:
+        if execution_id in self.checkpoints:
+            self.checkpoints[execution_id]["node_outputs"][node_id] = output
+            if usage is not None:
+                self.checkpoints[execution_id]["usage"] = dict(usage)
+
+    def complete(self, execution_id: str) -> None:
+        self.checkpoints.pop(execution_id, None)
+
+    def load(self, execution_id: str) -> Optional[Dict[str, Any]]:
+        return self.checkpoints.get(execution_id)
+
+    def list_incomplete(self) -> List[Dict[str, Any]]:
+        return list(self.checkpoints.values())
+
+
+class FileCheckpointStore(CheckpointStore):
+    """Durable store with one directory per execution.
+
+    The header is written atomically once; node outputs are appended to a JSON
+    lines file so each checkpoint costs a single small write. The methods do
+    blocking I/O, so async callers run them in a thread.
+    """
+
+    durable = True
+
+    HEADER_FILE = "header.json"
+    NODES_FILE = "nodes.jsonl"
+
+    def __init__(self, root: str):
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+
+    def _path(self, execution_id: str, name: str = "") -> str:
+        return os.path.join(self.root, execution_id, name)
+
+    def begin(self, execution_id: str, header: Dict[str, Any]) -> None:
+        os.makedirs(self._path(execution_id), exist_ok=True)
+        tmp_path = self._path(execution_id, self.HEADER_FILE + ".tmp")
+        with open(tmp_path, "w") as f:
+            json.dump(header, f, default=str)
+        os.replace(tmp_path, self._path(execution_id, self.HEADER_FILE))
+
+    def save_node_output(self, execution_id: str, node_id: str, output: Any,
+                         usage: Optional[Dict[str, Any]] = None) -> None:
+        record = {"node_id": node_id, "output": output, "usage": usage}
+        with open(self._path(execution_id, self.NODES_FILE), "a") as f:
+            f.write(json.dumps(record, default=str) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+    def complete(self, execution_id: str) -> None:
+        shutil.rmtree(self._path(execution_id), ignore_errors=True)
+
+    def load(self, execution_id: str) -> Optional[Dict[str, Any]]:
+        try:
+            with open(self._path(execution_id, self.HEADER_FILE)) as f:
+                header = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+
+        node_outputs = {}
+        usage: Dict[str, Any] = {}
+        try:
+            with open(self._path(execution_id, self.NODES_FILE)) as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except json.JSONDecodeError:
+                        # A torn final line from a crash mid-write; that node reruns
+                        break
+                    node_outputs[record["node_id"]] = record["output"]
+                    usage = record.get("usage") or usage
+        except FileNotFoundError:
+            pass
+
+        return {"header": header, "node_outputs": node_outputs, "usage": usage}
+
+    def list_incomplete(self) -> List[Dict[str, Any]]:
+        checkpoints = []
+        for execution_id in os.listdir(self.root):
+            checkpoint = self.load(execution_id)
+            if checkpoint is not None:
+                checkpoints.append(checkpoint)
+        return checkpoints
+
+
+def create_checkpoint_store() -> CheckpointStore:
+    """Build the checkpoint store configured by WORKFLOW_CHECKPOINT_DIR"""
+    checkpoint_dir = os.getenv("WORKFLOW_CHECKPOINT_DIR")
+    if checkpoint_dir:
+        logger.info("Using durable workflow checkpoints", checkpoint_dir=checkpoint_dir)
+        return FileCheckpointStore(checkpoint_dir)
+    return InMemoryCheckpointStore()
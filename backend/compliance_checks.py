@@ -0,0 +1,177 @@
+"""
+Compliance checks for Google ADK Agent Platform
+Registry of safety checks evaluated concurrently against platform telemetry, with per-check timeouts and a TTL cache
+"""
+
+import asyncio
+import os
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field, fields
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+import structlog
+
+logger = structlog.get_logger(__name__)
+
+COMPLIANCE_CHECK_TIMEOUT = float(os.getenv("COMPLIANCE_CHECK_TIMEOUT", "2.0"))
+COMPLIANCE_CACHE_TTL_SECONDS = float(os.getenv("COMPLIANCE_CACHE_TTL_SECONDS", "60"))
+COMPLIANCE_CACHE_MAX_ENTRIES = int(os.getenv("COMPLIANCE_CACHE_MAX_ENTRIES", "256"))
+COMPLIANCE_MAX_WATTS = float(os.getenv("COMPLIANCE_MAX_WATTS", "250"))
+
+# Minimum score a check needs to pass at each safety level
+SAFETY_LEVEL_THRESHOLDS = {"conservative": 0.99, "balanced": 0.95, "aggressive": 0.9}
+
+
+@dataclass
+class CheckContext:
+    """What a check evaluates: the assessment request and a telemetry snapshot.
+
+    The snapshot is collected on first access, so an assessment served from
+    the cache never builds it.
+    """
+    task_type: str
+    safety_level: str
+    failure_threshold: float
+    collect_telemetry: Callable[[], Dict[str, Any]] = field(default=dict, compare=False, repr=False)
+    _telemetry: Optional[Dict[str, Any]] = field(default=None, init=False, compare=False, repr=False)
+
+    @property
+    def telemetry(self) -> Dict[str, Any]:
+        if self._telemetry is None:
+            self._telemetry = self.collect_telemetry()
+        return self._telemetry
+
+    def cache_key(self) -> Tuple[Any, ...]:
+        """Every request input a check may read; telemetry staleness is bounded by the cache TTL"""
+        return tuple(getattr(self, f.name) for f in fields(self) if f.compare)
+
+    @property
+    def pass_threshold(self) -> float:
+        return SAFETY_LEVEL_THRESHOLDS.get(self.safety_level, SAFETY_LEVEL_THRESHOLDS["balanced"])
+
+
+# A check returns {"score": 0..1, ...details}, optionally with an explicit "passed"
+CheckFunc = Callable[[CheckContext], Awaitable[Dict[str, Any]]]
+
+
+@dataclass
+class ComplianceCheck:
+    name: str
+    func: CheckFunc
+    timeout: float = COMPLIANCE_CHECK_TIMEOUT
+    description: str = ""
+
+
+class ComplianceRegistry:
+    """Named checks run together, so an assessment takes as long as its slowest check.
+
+    Results are cached per request (task type, safety level and failure
+    threshold) for `cache_ttl` seconds. Entries are kept oldest first, so
+    expired ones are pruned from the front on insert and at most
+    `cache_max_entries` are held.
+    """
+
+    def __init__(self, cache_ttl: float = COMPLIANCE_CACHE_TTL_SECONDS,
+                 cache_max_entries: int = COMPLIANCE_CACHE_MAX_ENTRIES):
+        self.checks: Dict[str, ComplianceCheck] = {}
+        self.cache_ttl = cache_ttl
+        self.cache_max_entries = cache_max_entries
+        self._cache: "OrderedDict[Tuple[Any, ...], Tuple[float, List[Dict[str, Any]]]]" = OrderedDict()
+
+    def register(self, name: str, timeout: float = COMPLIANCE_CHECK_TIMEOUT,
+                 description: str = "") -> Callable[[CheckFunc], CheckFunc]:
+        """Decorator adding a check; re-registering a name replaces it"""
+        def decorator(func: CheckFunc) -> CheckFunc:
+            self.checks[name] = ComplianceCheck(name, func, timeout, description or (func.__doc__ or "").strip())
+            self._cache.clear()
+            return func
+        return decorator
+
+    def unregister(self, name: str) -> None:
+        self.checks.pop(name, None)
+        self._cache.clear()
+
+    def invalidate(self) -> None:
+        self._cache.clear()
+
+    async def run(self, context: CheckContext, use_cache: bool = True) -> List[Dict[str, Any]]:
+        """Evaluate every check concurrently, returning results in registration order"""
+        key = context.cache_key()
+        cached = self._cache.get(key)
+        if use_cache and cached is not None and time.monotonic() - cached[0] < self.cache_ttl:
+            return [{**result, "cached": True} for result in cached[1]]
+
+        results = list(await asyncio.gather(*(self._run_check(check, context) for check in self.checks.values())))
+        self._store(key, results)
+        return results
+
+    def _store(self, key: Tuple[Any, ...], results: List[Dict[str, Any]]) -> None:
+        now = time.monotonic()
+        self._cache.pop(key, None)
+        while self._cache:
+            oldest = next(iter(self._cache.values()))
+            if now - oldest[0] < self.cache_ttl and len(self._cache) < self.cache_max_entries:
+                break
+            self._cache.popitem(last=False)
+        self._cache[key] = (now, results)
+
+    async def _run_check(self, check: ComplianceCheck, context: CheckContext) -> Dict[str, Any]:
+        started = time.monotonic()
+        try:
+            outcome = dict(await asyncio.wait_for(check.func(context), check.timeout))
+            score = float(outcome.pop("score"))
+            passed = bool(outcome.pop("passed", score >= context.pass_threshold))
+            result = {"check": check.name, "passed": passed, "score": score, "details": outcome}
+        except asyncio.TimeoutError:
+            result = {"check": check.name, "passed": False, "score": 0.0,
+                      "error": f"Timed out after {check.timeout}s"}
+        except Exception as e:
+            logger.error(f"Compliance check failed: {check.name}", error=str(e))
+            result = {"check": check.name, "passed": False, "score": 0.0, "error": str(e)}
+        result["duration"] = time.monotonic() - started
+        return result
+
+
+def _ratio(part: float, whole: float) -> float:
+    return part / whole if whole else 0.0
+
+
+def register_default_checks(registry: ComplianceRegistry) -> ComplianceRegistry:
+    """The built-in checks, reading the telemetry snapshot built by the Integral AI manager"""
+
+    @registry.register("catastrophic_failure_prevention")
+    async def catastrophic_failure_prevention(context: CheckContext) -> Dict[str, Any]:
+        """Model and plugin call failure rate stays within the requested failure threshold"""
+        models = context.telemetry.get("models", {})
+        plugins = context.telemetry.get("plugins", {})
+        calls = models.get("requests", 0) + plugins.get("executions", 0)
+        failures = models.get("errors", 0) + plugins.get("failed", 0) + plugins.get("timed_out", 0)
+        rate = _ratio(failures, calls)
+        return {"score": 1.0 - rate, "passed": rate <= context.failure_threshold,
+                "failure_rate": rate, "calls": calls}
+
+    @registry.register("skill_acquisition_safety")
+    async def skill_acquisition_safety(context: CheckContext) -> Dict[str, Any]:
+        """Autonomous learning sessions complete rather than fail"""
+        learning = context.telemetry.get("learning", {})
+        return {"score": 1.0 - _ratio(learning.get("failed", 0), learning.get("sessions", 0)),
+                "sessions": learning.get("sessions", 0)}
+
+    @registry.register("energy_threshold_monitoring")
+    async def energy_threshold_monitoring(context: CheckContext) -> Dict[str, Any]:
+        """Average power of the most demanding phase stays under COMPLIANCE_MAX_WATTS"""
+        watts = context.telemetry.get("energy", {})
+        phase, peak = max(watts.items(), key=lambda item: item[1], default=(None, 0.0))
+        return {"score": min(1.0, _ratio(COMPLIANCE_MAX_WATTS, peak)) if peak else 1.0,
+                "peak_phase": phase, "peak_watts": peak}
+
+    @registry.register("learning_boundaries_adherence")
+    async def learning_boundaries_adherence(context: CheckContext) -> Dict[str, Any]:
+        """Workflow executions stay within their time and token budgets"""
+        workflows = context.telemetry.get("workflows", {})
+        overruns = workflows.get("budget_exceeded", 0) + workflows.get("timed_out", 0)
+        return {"score": 1.0 - _ratio(overruns, workflows.get("executions", 0)),
+                "executions": workflows.get("executions", 0), "overruns": overruns}
+
+    return registry
@@ -0,0 +1,54 @@
+"""
+Concurrency limits for Google ADK Agent Platform
+Semaphores with bounded wait queues that reject work fast once the queue is full
+"""
+
+import asyncio
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict
+
+
+class QueueFullError(Exception):
+    """Raised when a limiter's wait queue is full"""
+
+
+class BoundedLimiter:
+    """Allows `limit` concurrent holders and at most `max_waiting` callers queued behind them"""
+
+    def __init__(self, name: str, limit: int, max_waiting: int):
+        self.name = name
+        self.limit = max(1, limit)
+        self.max_waiting = max(0, max_waiting)
+        self.in_flight = 0
+        self.waiting = 0
+        self.rejected = 0
+        self._semaphore = asyncio.Semaphore(self.limit)
+
+    @asynccontextmanager
+    async def slot(self) -> AsyncIterator[None]:
+        """Hold one slot for the duration of the block, queueing if allowed"""
+        if self.in_flight >= self.limit and self.waiting >= self.max_waiting:
+            self.rejected += 1
+            raise QueueFullError(f"{self.name} is at capacity ({self.limit} running, {self.waiting} queued)")
+
+        self.waiting += 1
+        try:
+            await self._semaphore.acquire()
+        finally:
+            self.waiting -= 1
+
+        self.in_flight += 1
+        try:
+            yield
+        finally:
+            self.in_flight -= 1
+            self._semaphore.release()
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "limit": self.limit,
+            "max_waiting": self.max_waiting,
+            "in_flight": self.in_flight,
+            "waiting": self.waiting,
+            "rejected": self.rejected
+        }
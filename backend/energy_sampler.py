@@ -0,0 +1,325 @@
+"""
+Energy sampling for Google ADK Agent Platform
+Reads host energy and CPU counters into a fixed-size ring buffer and attributes them to phases, agents and models
+"""
+
+import asyncio
+import glob
+import os
+import time
+from array import array
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import psutil
+import structlog
+
+logger = structlog.get_logger(__name__)
+
+ENERGY_SAMPLER = os.getenv("ENERGY_SAMPLER", "auto")  # auto, rapl, proc, psutil or synthetic
+ENERGY_SAMPLE_INTERVAL = float(os.getenv("ENERGY_SAMPLE_INTERVAL", "1.0"))
+ENERGY_BUFFER_SIZE = int(os.getenv("ENERGY_BUFFER_SIZE", "3600"))
+# Distinct (phase, agent, model) labels tracked; further ones are pooled per phase
+ENERGY_MAX_LABELS = int(os.getenv("ENERGY_MAX_LABELS", "1000"))
+# Power model for sources that only see CPU time
+ENERGY_WATTS_PER_CORE = float(os.getenv("ENERGY_WATTS_PER_CORE", "10.0"))
+ENERGY_IDLE_WATTS = float(os.getenv("ENERGY_IDLE_WATTS", "5.0"))
+
+RAPL_ROOT = "/sys/class/powercap"
+
+Labels = Tuple[str, Optional[str], Optional[str]]  # (phase, agent, model)
+IDLE: Labels = ("idle", None, None)
+OTHER = "other"  # agent and model of labels pooled once ENERGY_MAX_LABELS is reached
+
+
+class EnergySource:
+    """Cumulative host energy counter in joules"""
+    name = "base"
+    measured = False  # True when joules come from hardware rather than a power model
+
+    def available(self) -> bool:
+        try:
+            self.read()
+            return True
+        except (OSError, ValueError):
+            return False
+
+    def read(self) -> float:
+        raise NotImplementedError
+
+
+class RaplSource(EnergySource):
+    """Intel/AMD RAPL package counters, summed over sockets and corrected for wraparound"""
+    name = "rapl"
+    measured = True
+
+    def __init__(self, root: str = RAPL_ROOT):
+        # Top-level zones only (intel-rapl:0, not intel-rapl:0:0) so subzones are not double counted
+        self.zones = sorted(
+            path for path in glob.glob(os.path.join(root, "*-rapl:*"))
+            if os.path.basename(path).count(":") == 1
+        )
+        self._last: Dict[str, int] = {}
+        self._offset: Dict[str, int] = {}
+
+    def read(self) -> float:
+        if not self.zones:
+            raise OSError("No RAPL zones")
+        total = 0
+        for zone in self.zones:
+            with open(os.path.join(zone, "energy_uj")) as f:
+                value = int(f.read())
+            last = self._last.get(zone)
+            if last is not None and value < last:
+                with open(os.path.join(zone, "max_energy_range_uj")) as f:
+                    self._offset[zone] = self._offset.get(zone, 0) + int(f.read())
+            self._last[zone] = value
+            total += value + self._offset.get(zone, 0)
+        return total / 1e6
+
+
+class ProcStatSource(EnergySource):
+    """Estimate from host busy CPU time in /proc/stat"""
+    name = "proc"
+
+    def __init__(self, path: str = "/proc/stat"):
+        self.path = path
+        self.ticks = os.sysconf("SC_CLK_TCK") if hasattr(os, "sysconf") else 100
+        self.started = time.monotonic()
+
+    def busy_seconds(self) -> float:
+        with open(self.path) as f:
+            fields = f.readline().split()
+        if fields[0] != "cpu":
+            raise ValueError(f"Unexpected {self.path} format")
+        # user nice system idle iowait irq softirq steal ...
+        values = [int(v) for v in fields[1:9]]
+        return (sum(values) - values[3] - values[4]) / self.ticks
+
+    def read(self) -> float:
+        return self.busy_seconds() * ENERGY_WATTS_PER_CORE + (time.monotonic() - self.started) * ENERGY_IDLE_WATTS
+
+
+class PsutilSource(ProcStatSource):
+    """Same power model as ProcStatSource using psutil's portable CPU times"""
+    name = "psutil"
+
+    def __init__(self):
+        self.started = time.monotonic()
+
+    def busy_seconds(self) -> float:
+        times = psutil.cpu_times()
+        return sum(times) - times.idle - getattr(times, "iowait", 0.0)
+
+
+class SyntheticSource(EnergySource):
+    """Last resort: idle power plus this process's own CPU time"""
+    name = "synthetic"
+
+    def __init__(self):
+        self.started = time.monotonic()
+
+    def read(self) -> float:
+        return time.process_time() * ENERGY_WATTS_PER_CORE + (time.monotonic() - self.started) * ENERGY_IDLE_WATTS
+
+
+SOURCES = {"rapl": RaplSource, "proc": ProcStatSource, "psutil": PsutilSource, "synthetic": SyntheticSource}
+
+
+def select_source(preference: str = ENERGY_SAMPLER) -> EnergySource:
+    """The preferred source if it works here, otherwise the first that does"""
+    order = list(SOURCES) if preference == "auto" else [preference] + [n for n in SOURCES if n != preference]
+    for name in order:
+        source = SOURCES[name]()
+        if source.available():
+            if preference not in ("auto", name):
+                logger.warning(f"Energy source {preference} unavailable, using {name}")
+            return source
+    return SyntheticSource()
+
+
+@dataclass
+class Measurement:
+    """Energy and CPU used while one attribution was active"""
+    labels: Labels
+    joules: float = 0.0
+    cpu_seconds: float = 0.0
+    seconds: float = 0.0
+
+    @property
+    def watts(self) -> float:
+        return self.joules / self.seconds if self.seconds > 0 else 0.0
+
+
+class EnergySampler:
+    """Periodic energy samples in a ring buffer, attributed to whatever is running.
+
+    Each sample covers the interval since the previous one and is split
+    evenly across the label sets active during it; with nothing active it is
+    attributed to idle. Entering or leaving an attribution takes a sample, so
+    short phases are measured exactly regardless of the sampling interval.
+
+    Labels come from request input, so both are bounded: past `max_labels`
+    new labels are pooled as (phase, "other", "other"), and label sets no
+    longer referenced by the buffer are dropped once there are twice as
+    many as it holds.
+    """
+
+    def __init__(self, source: Optional[EnergySource] = None, interval: float = ENERGY_SAMPLE_INTERVAL,
+                 capacity: int = ENERGY_BUFFER_SIZE, max_labels: int = ENERGY_MAX_LABELS):
+        self.source = source or select_source()
+        self.interval = interval
+        self.capacity = max(1, capacity)
+        self.max_labels = max_labels
+        # Parallel typed arrays keep each sample at 36 bytes
+        self._timestamps = array("d", bytes(8 * self.capacity))
+        self._durations = array("d", bytes(8 * self.capacity))
+        self._joules = array("d", bytes(8 * self.capacity))
+        self._cpu = array("d", bytes(8 * self.capacity))
+        self._label_sets = array("i", bytes(4 * self.capacity))
+        self._next = 0
+        self.count = 0
+        self._set_ids: Dict[Tuple[Labels, ...], int] = {}
+        self._sets: List[Tuple[Labels, ...]] = []
+        self.active: Dict[Labels, int] = {}
+        self.totals: Dict[Labels, Measurement] = {}
+        self._open: List[Measurement] = []
+        self._last_time = time.time()
+        self._last_joules = self.source.read()
+        self._last_cpu = time.process_time()
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.ensure_future(self._run())
+            logger.info("Energy sampler started", source=self.source.name, interval=self.interval)
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                self.sample()
+            except (OSError, ValueError) as e:
+                logger.warning(f"Energy sample failed: {e}")
+
+    def _label_set_id(self, label_set: Tuple[Labels, ...]) -> int:
+        set_id = self._set_ids.get(label_set)
+        if set_id is None:
+            if len(self._sets) >= 2 * self.capacity:
+                self._compact_label_sets()
+            set_id = self._set_ids[label_set] = len(self._sets)
+            self._sets.append(label_set)
+        return set_id
+
+    def _compact_label_sets(self) -> None:
+        """Renumber the label sets still referenced by buffered samples, dropping the rest"""
+        remap: Dict[int, int] = {}
+        sets: List[Tuple[Labels, ...]] = []
+        for index in range(self.count):
+            old = self._label_sets[index]
+            if old not in remap:
+                remap[old] = len(sets)
+                sets.append(self._sets[old])
+            self._label_sets[index] = remap[old]
+        self._sets = sets
+        self._set_ids = {label_set: set_id for set_id, label_set in enumerate(sets)}
+
+    def _bounded(self, labels: Labels) -> Labels:
+        if labels in self.totals or labels in self.active or len(self.totals) < self.max_labels:
+            return labels
+        return (labels[0], OTHER, OTHER)
+
+    def sample(self) -> None:
+        """Record the interval since the last sample and attribute it"""
+        now = time.time()
+        joules = self.source.read()
+        cpu = time.process_time()
+        d_joules = max(0.0, joules - self._last_joules)
+        d_cpu = max(0.0, cpu - self._last_cpu)
+        d_time = max(0.0, now - self._last_time)
+        self._last_time, self._last_joules, self._last_cpu = now, joules, cpu
+
+        label_set = tuple(sorted(self.active, key=str)) or (IDLE,)
+        share = 1.0 / len(label_set)
+        for labels in label_set:
+            total = self.totals.get(labels)
+            if total is None:
+                total = self.totals[labels] = Measurement(labels)
+            total.joules += d_joules * share
+            total.cpu_seconds += d_cpu * share
+            total.seconds += d_time
+        for measurement in self._open:
+            measurement.joules += d_joules / len(label_set)
+            measurement.cpu_seconds += d_cpu / len(label_set)
+            measurement.seconds += d_time
+
+        index = self._next
+        self._timestamps[index] = now
+        self._durations[index] = d_time
+        self._joules[index] = d_joules
+        self._cpu[index] = d_cpu
+        self._label_sets[index] = self._label_set_id(label_set)
+        self._next = (index + 1) % self.capacity
+        self.count = min(self.count + 1, self.capacity)
+
+    @contextmanager
+    def attribute(self, phase: str, agent: Optional[str] = None, model: Optional[str] = None) -> Iterator[Measurement]:
+        """Attribute energy to (phase, agent, model) for the duration of the block"""
+        labels = self._bounded((phase, agent, model))
+        measurement = Measurement(labels)
+        self.sample()
+        self.active[labels] = self.active.get(labels, 0) + 1
+        self._open.append(measurement)
+        try:
+            yield measurement
+        finally:
+            self.sample()
+            self._open.remove(measurement)
+            self.active[labels] -= 1
+            if not self.active[labels]:
+                del self.active[labels]
+
+    def summary(self, phase: Optional[str] = None, agent: Optional[str] = None,
+                model: Optional[str] = None) -> Dict[str, Any]:
+        """Totals per label set matching the filters, plus their sum"""
+        rows = []
+        combined = Measurement(("*", agent, model))
+        for labels, total in self.totals.items():
+            if (phase is None or labels[0] == phase) and (agent is None or labels[1] == agent) \
+                    and (model is None or labels[2] == model):
+                rows.append({"phase": labels[0], "agent": labels[1], "model": labels[2],
+                             "joules": total.joules, "cpu_seconds": total.cpu_seconds,
+                             "seconds": total.seconds, "avg_watts": total.watts})
+                combined.joules += total.joules
+                combined.cpu_seconds += total.cpu_seconds
+        return {
+            "source": self.source.name,
+            "measured": self.source.measured,
+            "breakdown": sorted(rows, key=lambda r: -r["joules"]),
+            "total_joules": combined.joules,
+            "total_cpu_seconds": combined.cpu_seconds
+        }
+
+    def recent(self, limit: int = 60) -> List[Dict[str, Any]]:
+        """Most recent samples, oldest first"""
+        limit = min(limit, self.count)
+        samples = []
+        for offset in range(limit, 0, -1):
+            index = (self._next - offset) % self.capacity
+            seconds = self._durations[index]
+            samples.append({
+                "timestamp": self._timestamps[index],
+                "seconds": seconds,
+                "joules": self._joules[index],
+                "watts": self._joules[index] / seconds if seconds > 0 else 0.0,
+                "cpu_seconds": self._cpu[index],
+                "labels": [list(labels) for labels in self._sets[self._label_sets[index]]]
+            })
+        return samples
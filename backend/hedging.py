@@ -0,0 +1,169 @@
+"""
+Request hedging for Google ADK Agent Platform
+Sends a duplicate model request when the first is slower than usual to respond, keeping whichever answers first
+"""
+
+import asyncio
+import os
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+import structlog
+
+from metrics_store import RunningStats
+
+logger = structlog.get_logger(__name__)
+
+HEDGE_BUDGET_RATIO = float(os.getenv("HEDGE_BUDGET_RATIO", "0.1"))
+HEDGE_MIN_SAMPLES = int(os.getenv("HEDGE_MIN_SAMPLES", "20"))
+
+# An attempt sets the event when its first token arrives, then runs to completion
+Attempt = Callable[[asyncio.Event], Awaitable[Any]]
+
+
+@dataclass
+class HedgePolicy:
+    """Per-model hedging settings, given as ModelConfig.hedging"""
+    enabled: bool = True
+    alternate: Optional[str] = None  # model config to send the hedge to; the same model when unset
+    percentile: float = 90.0  # hedge once the first token is later than this TTFT percentile
+    budget: float = HEDGE_BUDGET_RATIO  # hedges allowed per request, on average
+    burst: float = 10.0  # hedges that can be saved up
+    min_samples: int = HEDGE_MIN_SAMPLES  # TTFT samples needed before hedging starts
+    min_delay: float = 0.0  # never hedge sooner than this many seconds
+
+    def __post_init__(self):
+        if not 0 < self.percentile < 100:
+            raise ValueError("Hedging percentile must be between 0 and 100")
+        if self.budget < 0 or self.burst < 1:
+            raise ValueError("Hedging budget must be non-negative and burst at least 1")
+
+
+class HedgeBudget:
+    """Token bucket: each request earns `ratio` tokens and a hedge spends one"""
+
+    def __init__(self, ratio: float, burst: float):
+        self.ratio = ratio
+        self.burst = burst
+        self.tokens = 1.0
+        self.spent = 0
+        self.denied = 0
+
+    def earn(self) -> None:
+        self.tokens = min(self.burst, self.tokens + self.ratio)
+
+    def try_spend(self) -> bool:
+        if self.tokens >= 1.0:
+            self.tokens -= 1.0
+            self.spent += 1
+            return True
+        self.denied += 1
+        return False
+
+
+class Hedger:
+    """Races a primary attempt against at most one delayed hedge.
+
+    The hedge starts once the primary has gone longer without a first token
+    than the policy's TTFT percentile, if the budget allows. Whichever attempt
+    produces a first token first wins and the other is cancelled. An attempt
+    that fails before responding drops out and the other carries on.
+
+    TTFT history only ever describes the primary. A primary that loses is
+    recorded at its elapsed time when cancelled, a lower bound on its TTFT,
+    so slow primaries keep the hedge delay high rather than being replaced
+    by the hedge's faster samples.
+    """
+
+    def __init__(self, policy: HedgePolicy):
+        self.policy = policy
+        self.budget = HedgeBudget(policy.budget, policy.burst)
+        self.ttft = RunningStats()
+        self.requests = 0
+        self.hedged = 0
+        self.hedge_wins = 0
+
+    def delay(self) -> Optional[float]:
+        """Seconds to wait for a first token before hedging, or None while TTFT history is too short"""
+        if self.ttft.window_count < self.policy.min_samples:
+            return None
+        return max(self.policy.min_delay, self.ttft.window_percentile(self.policy.percentile))
+
+    async def run(self, primary: Attempt, hedge: Attempt) -> Tuple[Any, Dict[str, Any]]:
+        """Result of the winning attempt and how the race went"""
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        self.requests += 1
+        self.budget.earn()
+        delay = self.delay() if self.policy.enabled else None
+
+        racers: List[Tuple[asyncio.Task, asyncio.Event, float]] = []
+
+        def launch(attempt: Attempt) -> None:
+            event = asyncio.Event()
+            racers.append((asyncio.ensure_future(attempt(event)), event, loop.time()))
+
+        launch(primary)
+        hedge_pending = delay is not None
+        failed: Dict[int, BaseException] = {}
+        try:
+            while True:
+                live = [i for i in range(len(racers)) if i not in failed]
+                if not live:
+                    raise failed[max(failed)]
+                timeout = max(0.0, started + delay - loop.time()) if hedge_pending else None
+                winner = await self._first_response(racers, live, timeout, failed)
+                if winner is not None:
+                    break
+                if hedge_pending and loop.time() - started >= delay:
+                    hedge_pending = False
+                    if self.budget.try_spend():
+                        self.hedged += 1
+                        launch(hedge)
+                        logger.info("Hedging model request", delay=delay)
+
+            task = racers[winner][0]
+            for index, (other, _, _) in enumerate(racers):
+                if index != winner:
+                    other.cancel()
+            if 0 not in failed:
+                self.ttft.add(loop.time() - racers[0][2])
+            result = await task
+        finally:
+            for task, _, _ in racers:
+                task.cancel()
+
+        if winner == 1:
+            self.hedge_wins += 1
+        return result, {"hedged": len(racers) > 1, "winner": "hedge" if winner == 1 else "primary",
+                        "hedge_delay": delay}
+
+    async def _first_response(self, racers, live: List[int], timeout: Optional[float],
+                              failed: Dict[int, BaseException]) -> Optional[int]:
+        """Index of the first live racer to produce a token or finish, None on timeout or failure"""
+        waiters = {asyncio.ensure_future(racers[i][1].wait()): i for i in live}
+        watched = {**waiters, **{racers[i][0]: i for i in live}}
+        try:
+            done, _ = await asyncio.wait(watched, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            for waiter in waiters:
+                waiter.cancel()
+        for future in done:
+            index = watched[future]
+            task = racers[index][0]
+            if future is task and not task.cancelled() and task.exception() is not None:
+                failed[index] = task.exception()
+                logger.warning("Hedged attempt failed", attempt=index, error=str(failed[index]))
+                return None
+        return watched[next(iter(done))] if done else None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "requests": self.requests,
+            "hedged": self.hedged,
+            "hedge_wins": self.hedge_wins,
+            "budget_tokens": self.budget.tokens,
+            "budget_denied": self.budget.denied,
+            "hedge_delay": self.delay(),
+            "ttft": self.ttft.snapshot()
+        }
@@ -0,0 +1,162 @@
+"""
+Background job scheduler for Google ADK Agent Platform
+Runs submitted long-running tasks with bounded concurrency, progress, cancellation and bounded retention
+"""
+
+import asyncio
+import os
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+import structlog
+
+from concurrency import QueueFullError
+
+logger = structlog.get_logger(__name__)
+
+JOB_MAX_CONCURRENCY = int(os.getenv("JOB_MAX_CONCURRENCY", "8"))
+JOB_MAX_QUEUE = int(os.getenv("JOB_MAX_QUEUE", "256"))
+JOB_RETENTION = int(os.getenv("JOB_RETENTION", "1000"))
+
+FINISHED_STATUSES = ("completed", "failed", "cancelled")
+
+
+@dataclass
+class Job:
+    """A submitted task; the task function reports progress by setting `progress` (0-100)"""
+    job_id: str
+    kind: str
+    metadata: Dict[str, Any] = field(default_factory=dict)
+    status: str = "queued"  # queued, running, completed, failed, cancelled
+    progress: float = 0.0
+    result: Any = None
+    error: Optional[str] = None
+    created_at: datetime = field(default_factory=datetime.now)
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    task: Optional["asyncio.Task"] = field(default=None, repr=False)
+
+    @property
+    def finished(self) -> bool:
+        return self.status in FINISHED_STATUSES
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "job_id": self.job_id,
+            "kind": self.kind,
+            "status": self.status,
+            "progress": self.progress,
+            "metadata": self.metadata,
+            "result": self.result,
+            "error": self.error,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at
+        }
+
+
+class JobScheduler:
+    """Runs at most `max_concurrency` jobs at once with up to `max_queue` waiting.
+
+    Submission never waits: it either schedules the job or raises
+    QueueFullError. Finished jobs are kept for polling, oldest dropped first
+    beyond `retention`.
+    """
+
+    def __init__(self, max_concurrency: int = JOB_MAX_CONCURRENCY, max_queue: int = JOB_MAX_QUEUE,
+                 retention: int = JOB_RETENTION):
+        self.max_concurrency = max(1, max_concurrency)
+        self.max_queue = max(0, max_queue)
+        self.retention = max(1, retention)
+        self.jobs: "OrderedDict[str, Job]" = OrderedDict()
+        self.active = 0  # queued or running
+        self.running = 0
+        self.rejected = 0
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+
+    def submit(self, kind: str, func: Callable[[Job], Awaitable[Any]],
+               metadata: Optional[Dict[str, Any]] = None) -> Job:
+        """Schedule func(job) and return the job immediately"""
+        if self.active >= self.max_concurrency + self.max_queue:
+            self.rejected += 1
+            raise QueueFullError(
+                f"Job scheduler is at capacity ({self.running} running, {self.active - self.running} queued)"
+            )
+        job = Job(job_id=str(uuid.uuid4()), kind=kind, metadata=metadata or {})
+        self.jobs[job.job_id] = job
+        self.active += 1
+        job.task = asyncio.ensure_future(self._run(job, func))
+        # A task cancelled before it starts never enters _run, so account for it here
+        job.task.add_done_callback(lambda _: self._finish(job))
+        self._trim()
+        return job
+
+    async def _run(self, job: Job, func: Callable[[Job], Awaitable[Any]]) -> None:
+        try:
+            async with self._semaphore:
+                job.status = "running"
+                job.started_at = datetime.now()
+                self.running += 1
+                try:
+                    job.result = await func(job)
+                finally:
+                    self.running -= 1
+            job.status = "completed"
+            job.progress = 100.0
+        except asyncio.CancelledError:
+            job.status = "cancelled"
+            raise
+        except Exception as e:
+            job.status = "failed"
+            job.error = getattr(e, "detail", None) or str(e)
+            logger.error(f"Job failed: {job.kind}", job_id=job.job_id, error=job.error)
+
+    def _finish(self, job: Job) -> None:
+        if not job.finished:
+            job.status = "cancelled"
+        job.finished_at = datetime.now()
+        self.active -= 1
+        self._trim()
+
+    def _trim(self) -> None:
+        """Drop the oldest finished jobs beyond the retention limit"""
+        excess = len(self.jobs) - self.retention
+        if excess <= 0:
+            return
+        for job_id in [job_id for job_id, job in self.jobs.items() if job.finished][:excess]:
+            del self.jobs[job_id]
+
+    def get(self, job_id: str) -> Optional[Job]:
+        return self.jobs.get(job_id)
+
+    def list(self, kind: Optional[str] = None, status: Optional[str] = None) -> List[Job]:
+        """Jobs newest first, optionally filtered"""
+        return [job for job in reversed(self.jobs.values())
+                if (kind is None or job.kind == kind) and (status is None or job.status == status)]
+
+    def cancel(self, job_id: str) -> Optional[Job]:
+        """Request cancellation; a no-op for jobs that already finished"""
+        job = self.jobs.get(job_id)
+        if job is not None and not job.finished and job.task is not None:
+            job.task.cancel()
+        return job
+
+    async def shutdown(self) -> None:
+        """Cancel every unfinished job and wait for them to stop"""
+        tasks = [job.task for job in self.jobs.values() if not job.finished and job.task is not None]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "max_concurrency": self.max_concurrency,
+            "max_queue": self.max_queue,
+            "running": self.running,
+            "queued": self.active - self.running,
+            "retained": len(self.jobs),
+            "rejected": self.rejected
+        }
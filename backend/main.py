@@ -4,23 +4,55 @@ Supports local and API MiniMax-M2 models plus custom models
 """
 
 import os
+import json
 import asyncio
 import logging
-from typing import Dict, List, Optional, Any
-from contextlib import asynccontextmanager
-from dataclasses import dataclass, asdict
+from typing import Deque, Dict, List, Optional, Any, Tuple
+from contextlib import aclosing, asynccontextmanager
+from dataclasses import dataclass, asdict, field, replace
 from datetime import datetime
+import time
 import uuid
+from collections import OrderedDict, deque
+from itertools import islice
 
 import uvicorn
-from fastapi import FastAPI, HTTPException, WebSocket, WebSocketDisconnect, BackgroundTasks
+from fastapi import FastAPI, HTTPException, Query, Request, WebSocket, WebSocketDisconnect, BackgroundTasks
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import HTMLResponse
+from fastapi.responses import HTMLResponse, JSONResponse, Response, StreamingResponse
 from pydantic import BaseModel
 import structlog
 import psutil
 
+from blob_store import BlobNotFoundError, BlobStoreFullError
+from catalog_index import CatalogIndex
+from checkpoint_store import create_checkpoint_store
+from compliance_checks import CheckContext, ComplianceRegistry, register_default_checks
+from concurrency import BoundedLimiter, QueueFullError
+from agent_executor import AgentExecutor, Tool, parse_tool_calls, tool_name
+from analytics import AnalyticsQueryError, ExecutionAnalytics
+from energy_sampler import EnergySampler
+from hedging import HedgePolicy, Hedger
+from job_scheduler import Job, JobScheduler
+from metrics_store import METRICS_WINDOW_SIZE, RunningStats
+from model_warmup import ModelWarmer
+from plugin_environments import PluginDependencyError, PluginEnvironmentManager
+from plugin_methods import MethodSpec, PluginValidationError, build_method_table
+from plugin_runtime import PLUGIN_CALL_TIMEOUT, PluginExecutionError, PluginRuntime, PluginTimeoutError
+from plugin_security import SecurityAnalyzer
+from prompt_cache import apply_cache_control, cache_usage, stable_history_window
+from serialization import ResponseCache, cached_json_response, to_jsonable
+from timeseries_store import TimeSeriesStore
+from workflow_engine import (
+    ExecutionBudget,
+    ExecutionContext,
+    WorkflowBudgetExceededError,
+    WorkflowEngine,
+    WorkflowTimeoutError,
+    map_bounded,
+)
+
 # Configure structured logging
 structlog.configure(
     processors=[
@@ -38,6 +70,31 @@ structlog.configure(
 
 logger = structlog.get_logger(__name__)
 
+# Default execution limits, overridable per request
+WORKFLOW_EXECUTION_TIMEOUT = float(os.getenv("WORKFLOW_EXECUTION_TIMEOUT", "300"))
+WORKFLOW_NODE_TIMEOUT = float(os.getenv("WORKFLOW_NODE_TIMEOUT", "60"))
+
+# Execution history retention; full payloads live in a bounded side store
+WORKFLOW_HISTORY_MAX_RECORDS = int(os.getenv("WORKFLOW_HISTORY_MAX_RECORDS", "100"))
+WORKFLOW_HISTORY_MAX_AGE_SECONDS = float(os.getenv("WORKFLOW_HISTORY_MAX_AGE_SECONDS", "604800"))
+WORKFLOW_RESULT_STORE_SIZE = int(os.getenv("WORKFLOW_RESULT_STORE_SIZE", "1000"))
+
+# Plugin execution concurrency; per-plugin values can be overridden in its configuration
+PLUGIN_MAX_CONCURRENCY = int(os.getenv("PLUGIN_MAX_CONCURRENCY", "4"))
+PLUGIN_MAX_QUEUE = int(os.getenv("PLUGIN_MAX_QUEUE", "16"))
+PLUGIN_CATEGORY_MAX_CONCURRENCY = int(os.getenv("PLUGIN_CATEGORY_MAX_CONCURRENCY", "16"))
+PLUGIN_CATEGORY_MAX_QUEUE = int(os.getenv("PLUGIN_CATEGORY_MAX_QUEUE", "64"))
+
+# Items and results a batch's history entry keeps; the full results were streamed to the caller
+PLUGIN_BATCH_HISTORY_SAMPLE = int(os.getenv("PLUGIN_BATCH_HISTORY_SAMPLE", "10"))
+
+# Node energy and CPU, attributed to the phase, agent and model running at the time
+energy_sampler = EnergySampler()
+ENERGY_MONITOR_AGENT = "energy-monitor"  # Labels the live windows energy monitoring itself measures
+
+# Finished plugin and workflow executions in columnar form for /analytics queries
+execution_analytics = ExecutionAnalytics()
+
 # Workflow Management
 @dataclass
 class WorkflowConfig:
@@ -50,7 +107,8 @@ class WorkflowConfig:
     updated_at: datetime = None
     nodes: List[WorkflowNode] = None
     connections: List[WorkflowConnection] = None
-    execution_history: List[Dict[str, Any]] = None
+    execution_history: List[Dict[str, Any]] = None  # bounded summaries, newest last
+    execution_count: int = 0  # lifetime total, unaffected by retention
     
     def __post_init__(self):
         if self.created_at is None:
@@ -64,6 +122,50 @@ class WorkflowConfig:
         if self.execution_history is None:
             self.execution_history = []
 
+class ExecutionPayloadStore:
+    """Bounded LRU store for execution inputs and results, keyed by execution ID.
+    
+    Payloads of running executions are pinned so eviction cannot drop the
+    workflow ID and input a resume or retry needs.
+    """
+    
+    def __init__(self, max_entries: int = WORKFLOW_RESULT_STORE_SIZE):
+        self.max_entries = max_entries
+        self.entries: OrderedDict = OrderedDict()
+        self.pinned: set = set()
+    
+    def put(self, execution_id: str, payload: Dict[str, Any], pin: bool = False) -> None:
+        """Store or update the payload for an execution, evicting the least recently used entries"""
+        if execution_id in self.entries:
+            self.entries[execution_id].update(payload)
+            self.entries.move_to_end(execution_id)
+        else:
+            self.entries[execution_id] = payload
+        if pin:
+            self.pinned.add(execution_id)
+        self._evict()
+    
+    def unpin(self, execution_id: str) -> None:
+        """Make a finished execution's payload evictable again"""
+        self.pinned.discard(execution_id)
+        self._evict()
+    
+    def _evict(self) -> None:
+        excess = len(self.entries) - self.max_entries
+        if excess > 0:
+            unpinned = (key for key in self.entries if key not in self.pinned)
+            for key in list(islice(unpinned, excess)):
+                del self.entries[key]
+    
+    def get(self, execution_id: str) -> Optional[Dict[str, Any]]:
+        payload = self.entries.get(execution_id)
+        if payload is not None:
+            self.entries.move_to_end(execution_id)
+        return payload
+    
+    def __len__(self) -> int:
+        return len(self.entries)
+
 class WorkflowManager:
     """Manages ADK workflow configurations and executions"""
     
@@ -71,9 +173,16 @@ class WorkflowManager:
         self.model_manager = model_manager
         self.agent_manager = agent_manager
         self.workflows: Dict[str, WorkflowConfig] = {}
+        self.response_cache = ResponseCache("workflows")
         self.execution_queue: List[Dict[str, Any]] = []
-        self.execution_results: Dict[str, Dict[str, Any]] = {}
-        
+        self.execution_results = ExecutionPayloadStore()
+        self.running_executions: Dict[str, asyncio.Task] = {}
+        self.cancel_requested: set = set()
+        self.resume_tasks: set = set()  # strong references to background resumes
+        self.plugin_manager = None  # Wired up once the PluginManager exists
+        self.checkpoint_store = create_checkpoint_store()
+        self.engine = WorkflowEngine(self._execute_node, self.checkpoint_store)
+
     def create_workflow(self, request: WorkflowCreateRequest) -> WorkflowConfig:
         """Create a new workflow"""
         try:
@@ -86,6 +195,7 @@ class WorkflowManager:
             )
             
             self.workflows[workflow_config.id] = workflow_config
+            self.response_cache.invalidate(workflow_config.id)
             
             logger.info(f"Created workflow: {workflow_config.name}", 
                        workflow_id=workflow_config.id)
@@ -97,8 +207,26 @@ class WorkflowManager:
             raise HTTPException(status_code=400, detail=str(e))
     
     def list_workflows(self) -> List[Dict[str, Any]]:
-        """List all workflows"""
-        return [asdict(workflow) for workflow in self.workflows.values()]
+        """List lightweight summaries of all workflows"""
+        return [
+            self.response_cache.get(workflow.id, self.workflow_summary, workflow)
+            for workflow in self.workflows.values()
+        ]
+    
+    def workflow_summary(self, workflow: WorkflowConfig) -> Dict[str, Any]:
+        """Summary of a workflow without its graph or execution history"""
+        return {
+            "id": workflow.id,
+            "name": workflow.name,
+            "description": workflow.description,
+            "status": workflow.status,
+            "created_at": workflow.created_at,
+            "updated_at": workflow.updated_at,
+            "node_count": len(workflow.nodes),
+            "connection_count": len(workflow.connections),
+            "execution_count": workflow.execution_count,
+            "last_execution": workflow.execution_history[-1] if workflow.execution_history else None
+        }
     
     def get_workflow(self, workflow_id: str) -> Optional[WorkflowConfig]:
         """Get workflow by ID"""
@@ -115,6 +243,7 @@ class WorkflowManager:
         workflow.nodes = request.nodes
         workflow.connections = request.connections
         workflow.updated_at = datetime.now()
+        self.response_cache.invalidate(workflow_id)
         
         logger.info(f"Updated workflow: {workflow.name}", workflow_id=workflow_id)
         return workflow
@@ -124,12 +253,15 @@ class WorkflowManager:
         if workflow_id in self.workflows:
             workflow = self.workflows[workflow_id]
             del self.workflows[workflow_id]
+            self.response_cache.invalidate(workflow_id)
             logger.info(f"Deleted workflow: {workflow.name}", workflow_id=workflow_id)
             return True
         return False
     
-    async def execute_workflow(self, workflow_id: str, input_data: Dict[str, Any] = {}) -> Dict[str, Any]:
-        """Execute a workflow"""
+    async def execute_workflow(self, workflow_id: str, input_data: Dict[str, Any] = {},
+                               budget: Optional[ExecutionBudget] = None,
+                               checkpoint: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """Execute a workflow, or resume one from a checkpoint"""
         workflow = self.get_workflow(workflow_id)
         if not workflow:
             raise HTTPException(status_code=404, detail="Workflow not found")
@@ -137,27 +269,69 @@ class WorkflowManager:
         if workflow.status != "active":
             raise HTTPException(status_code=400, detail="Workflow is not active")
         
-        execution_id = str(uuid.uuid4())
+        if budget is None:
+            budget = ExecutionBudget(
+                execution_timeout=WORKFLOW_EXECUTION_TIMEOUT,
+                node_timeout=WORKFLOW_NODE_TIMEOUT
+            )
+        
+        execution_id = checkpoint["header"]["execution_id"] if checkpoint else str(uuid.uuid4())
         execution_start = datetime.now()
+        context = ExecutionContext(
+            execution_id=execution_id,
+            workflow_id=workflow_id,
+            input_data=input_data,
+            budget=budget
+        )
         
-        # Add to execution queue
+        if checkpoint:
+            context.node_outputs.update(checkpoint["node_outputs"])
+            context.restore_usage(checkpoint.get("usage") or {})
+        else:
+            await asyncio.to_thread(self.checkpoint_store.begin, execution_id, {
+                "execution_id": execution_id,
+                "workflow_id": workflow_id,
+                "workflow": {
+                    "name": workflow.name,
+                    "description": workflow.description,
+                    "nodes": [node.dict() for node in workflow.nodes],
+                    "connections": [connection.dict() for connection in workflow.connections]
+                },
+                "input_data": input_data,
+                "budget": asdict(budget),
+                "started_at": execution_start.isoformat()
+            })
+        
+        # History keeps a summary; inputs and results go to the payload store
         execution_record = {
             "execution_id": execution_id,
             "workflow_id": workflow_id,
             "status": "running",
-            "start_time": execution_start,
-            "input_data": input_data
+            "start_time": execution_start
         }
+        if checkpoint:
+            execution_record["resumed_nodes"] = len(checkpoint["node_outputs"])
         
-        workflow.execution_history.append(execution_record)
+        self._append_history(workflow, execution_record)
+        self.execution_results.put(execution_id, {
+            "workflow_id": workflow_id,
+            "status": "running",
+            "input_data": input_data
+        }, pin=True)
+        keep_checkpoint = False
+        
+        # Blobs passed in by handle must outlive every node that reads them
+        blobs = self.plugin_manager.runtime.blobs if self.plugin_manager else None
+        if blobs is not None:
+            context.blob_handles.extend(blobs.retain_all(input_data, execution_id))
+        
+        # Run the graph in its own task so DELETE /executions/{id} can cancel it
+        task = asyncio.create_task(self.engine.run(workflow.nodes, workflow.connections, context))
+        self.running_executions[execution_id] = task
         
         try:
-            # Simulate workflow execution
-            # In a real implementation, this would traverse the workflow graph
-            # and execute each node based on its type
-            
-            # Mock execution for demo purposes
-            result = await self._simulate_workflow_execution(workflow, input_data)
+            node_outputs = await task
+            result = self._build_execution_result(workflow, input_data, node_outputs)
             
             execution_end = datetime.now()
             execution_time = (execution_end - execution_start).total_seconds()
@@ -167,16 +341,17 @@ class WorkflowManager:
                 "status": "completed",
                 "end_time": execution_end,
                 "execution_time": execution_time,
-                "result": result
+                "usage": context.usage()
             })
             
             # Store execution result
-            self.execution_results[execution_id] = {
-                "workflow_id": workflow_id,
+            self.execution_results.put(execution_id, {
+                "status": "completed",
                 "result": result,
                 "execution_time": execution_time,
+                "usage": context.usage(),
                 "completed_at": execution_end.isoformat()
-            }
+            })
             
             logger.info(f"Workflow execution completed: {workflow.name}", 
                        workflow_id=workflow_id, execution_id=execution_id)
@@ -186,37 +361,283 @@ class WorkflowManager:
                 "workflow_id": workflow_id,
                 "status": "completed",
                 "result": result,
-                "execution_time": execution_time
+                "execution_time": execution_time,
+                "usage": context.usage()
             }
             
-        except Exception as e:
-            execution_end = datetime.now()
+        except asyncio.CancelledError:
+            self._record_execution_failure(execution_record, "cancelled", "Execution cancelled", context)
+            logger.info(f"Workflow execution cancelled: {workflow.name}",
+                       workflow_id=workflow_id, execution_id=execution_id)
+            if execution_id not in self.cancel_requested:
+                # The caller went away or the server is shutting down; keep a
+                # durable checkpoint so the execution resumes on next startup
+                keep_checkpoint = self.checkpoint_store.durable
+                raise
+            raise HTTPException(status_code=409, detail="Execution cancelled")
+        
+        except WorkflowTimeoutError as e:
+            self._record_execution_failure(execution_record, "timed_out", str(e), context)
+            logger.error(f"Workflow execution timed out: {workflow.name}",
+                        workflow_id=workflow_id, error=str(e))
+            raise HTTPException(status_code=504, detail=f"Execution timed out: {str(e)}")
+        
+        except WorkflowBudgetExceededError as e:
+            self._record_execution_failure(execution_record, "budget_exceeded", str(e), context)
+            logger.error(f"Workflow execution exceeded budget: {workflow.name}",
+                        workflow_id=workflow_id, error=str(e))
+            raise HTTPException(status_code=400, detail=f"Execution budget exceeded: {str(e)}")
             
-            # Update execution record with error
-            execution_record.update({
-                "status": "failed",
-                "end_time": execution_end,
-                "error": str(e)
-            })
+        except Exception as e:
+            self._record_execution_failure(execution_record, "failed", str(e), context)
             
             logger.error(f"Workflow execution failed: {workflow.name}", 
                         workflow_id=workflow_id, error=str(e))
             
             raise HTTPException(status_code=500, detail=f"Execution failed: {str(e)}")
+        
+        finally:
+            execution_analytics.record("workflows", workflow_id, execution_record["status"],
+                                       execution_record.get("execution_time"), execution_start)
+            self.running_executions.pop(execution_id, None)
+            self.cancel_requested.discard(execution_id)
+            self.execution_results.unpin(execution_id)
+            self.response_cache.invalidate(workflow_id)
+            if not keep_checkpoint:
+                await asyncio.to_thread(self.checkpoint_store.complete, execution_id)
+            if blobs is not None:
+                for handle in context.blob_handles:
+                    blobs.release(handle, execution_id)
+    
+    async def resume_incomplete_executions(self) -> List[str]:
+        """Resume executions left incomplete by a restart from their last checkpoint"""
+        resumed = []
+        for checkpoint in await asyncio.to_thread(self.checkpoint_store.list_incomplete):
+            header = checkpoint["header"]
+            workflow = self.get_workflow(header["workflow_id"])
+            if workflow is None:
+                # Workflows live in memory, so rebuild the definition from the snapshot
+                snapshot = header["workflow"]
+                workflow = WorkflowConfig(
+                    id=header["workflow_id"],
+                    name=snapshot["name"],
+                    description=snapshot["description"],
+                    status="active",
+                    nodes=[WorkflowNode(**node) for node in snapshot["nodes"]],
+                    connections=[WorkflowConnection(**c) for c in snapshot["connections"]]
+                )
+                self.workflows[workflow.id] = workflow
+                self.response_cache.invalidate(workflow.id)
+            
+            task = asyncio.create_task(self._resume_execution(checkpoint))
+            self.resume_tasks.add(task)
+            task.add_done_callback(self.resume_tasks.discard)
+            resumed.append(header["execution_id"])
+        
+        if resumed:
+            logger.info("Resuming incomplete workflow executions", count=len(resumed))
+        return resumed
+    
+    async def _resume_execution(self, checkpoint: Dict[str, Any]) -> None:
+        """Run a resumed execution in the background, logging its outcome"""
+        header = checkpoint["header"]
+        try:
+            await self.execute_workflow(
+                header["workflow_id"],
+                header["input_data"],
+                ExecutionBudget(**header["budget"]),
+                checkpoint=checkpoint
+            )
+        except HTTPException as e:
+            logger.error("Resumed workflow execution failed",
+                        execution_id=header["execution_id"], error=e.detail)
+    
+    def _record_execution_failure(self, execution_record: Dict[str, Any], status: str,
+                                  error: str, context: ExecutionContext) -> None:
+        """Update an execution record with a terminal error status"""
+        execution_end = datetime.now()
+        execution_record.update({
+            "status": status,
+            "end_time": execution_end,
+            "execution_time": (execution_end - execution_record["start_time"]).total_seconds(),
+            "usage": context.usage(),
+            "error": error
+        })
+        self.execution_results.put(execution_record["execution_id"], {
+            "status": status,
+            "error": error,
+            "completed_at": execution_end.isoformat()
+        })
+    
+    def _append_history(self, workflow: WorkflowConfig, execution_record: Dict[str, Any]) -> None:
+        """Append an execution summary, enforcing count and age retention"""
+        history = workflow.execution_history
+        history.append(execution_record)
+        workflow.execution_count += 1
+        self.response_cache.invalidate(workflow.id)
+        
+        if len(history) > WORKFLOW_HISTORY_MAX_RECORDS:
+            del history[:len(history) - WORKFLOW_HISTORY_MAX_RECORDS]
+        self._expire_history(workflow)
     
-    async def _simulate_workflow_execution(self, workflow: WorkflowConfig, input_data: Dict[str, Any]) -> Dict[str, Any]:
-        """Simulate workflow execution for demo purposes"""
-        # Simulate processing time
-        await asyncio.sleep(2)
+    def _expire_history(self, workflow: WorkflowConfig) -> None:
+        """Drop execution summaries older than the age limit"""
+        history = workflow.execution_history
+        cutoff = datetime.now().timestamp() - WORKFLOW_HISTORY_MAX_AGE_SECONDS
+        expired = 0
+        while expired < len(history) and history[expired]["start_time"].timestamp() < cutoff:
+            expired += 1
+        if expired:
+            del history[:expired]
+            self.response_cache.invalidate(workflow.id)
+    
+    def cancel_execution(self, execution_id: str) -> bool:
+        """Cancel a running execution.
+
+        Awaited model and plugin calls are cancelled and their results
+        discarded. Plugin code already running in a worker process is not
+        interrupted; it runs until it returns or hits its call time limit.
+        """
+        task = self.running_executions.get(execution_id)
+        if task is None or task.done():
+            return False
+        
+        self.cancel_requested.add(execution_id)
+        task.cancel()
+        logger.info("Workflow execution cancellation requested", execution_id=execution_id)
+        return True
+    
+    async def _execute_node(self, node: WorkflowNode, inputs: Dict[str, Any], context: ExecutionContext) -> Any:
+        """Execute a single workflow node based on its type"""
+        data = node.data
+        
+        if data.get("agent_id"):
+            message = data.get("message") or str(inputs)
+            response = await self.agent_manager.chat_with_agent(data["agent_id"], message, stream=False)
+            self._charge_tokens(context, data, message, response["response"])
+            return response["response"]
+        
+        if node.type == "model" and data.get("model"):
+            config = self.model_manager.get_model_config(data["model"])
+            if not config:
+                raise ValueError(f"Model not found: {data['model']}")
+            prompt = data.get("prompt") or str(inputs)
+            response = await self.model_manager.test_model(config, prompt)
+            if not response["success"]:
+                raise RuntimeError(response["error"])
+            self._charge_tokens(context, data, prompt, response["response"])
+            return response["response"]
         
-        # Mock result based on workflow nodes
+        if node.type == "map":
+            return await self._execute_map_node(node, inputs, context)
+        
+        if node.type == "tool" and data.get("plugin_id") and self.plugin_manager:
+            response = await self.plugin_manager.execute_plugin(
+                data["plugin_id"],
+                data.get("method", "execute"),
+                {**data.get("parameters", {}), "inputs": inputs},
+                {"workflow_id": context.workflow_id, "execution_id": context.execution_id}
+            )
+            context.charge(cost=data.get("cost", 0.0))
+            # Pin blobs the plugin produced so downstream nodes can still read them
+            root = context.root()
+            root.blob_handles.extend(
+                self.plugin_manager.runtime.blobs.retain_all(response["result"], root.execution_id)
+            )
+            return response["result"]
+        
+        # Input, output, conditional and unconfigured nodes pass their inputs through
+        return inputs
+    
+    async def _execute_map_node(self, node: WorkflowNode, inputs: Dict[str, Any], context: ExecutionContext) -> Dict[str, Any]:
+        """Fan a list out across sub-executions of another workflow with bounded parallelism"""
+        data = node.data
+        items_key = data.get("items_key", "items")
+        
+        # Root map nodes read the execution input, others read their upstream outputs
+        items = inputs.get(items_key)
+        if items is None:
+            for upstream_output in inputs.values():
+                if isinstance(upstream_output, dict) and items_key in upstream_output:
+                    items = upstream_output[items_key]
+                    break
+        if not isinstance(items, list):
+            raise ValueError(f"Map node {node.id} expected a list at '{items_key}'")
+        
+        sub_workflow = self.get_workflow(data.get("workflow_id", ""))
+        if not sub_workflow:
+            raise ValueError(f"Map node {node.id} references unknown workflow: {data.get('workflow_id')}")
+        
+        async def run_item(item: Any) -> Dict[str, Any]:
+            item_input = item if isinstance(item, dict) else {"item": item}
+            child = context.child(str(uuid.uuid4()), sub_workflow.id, item_input)
+            node_outputs = await self.engine.run(sub_workflow.nodes, sub_workflow.connections, child)
+            return self._build_execution_result(sub_workflow, item_input, node_outputs)["output"]
+        
+        results = []
+        errors = []
+        # aclosing cancels in-flight siblings as soon as fail_fast stops the loop
+        async with aclosing(map_bounded(
+            items,
+            run_item,
+            concurrency=data.get("concurrency", 8),
+            chunk_size=data.get("chunk_size", 1),
+            ordered=data.get("ordered", True)
+        )) as outcomes:
+            async for index, output, error in outcomes:
+                if error is not None:
+                    if data.get("fail_fast", True):
+                        raise RuntimeError(f"Map item {index} failed: {error}")
+                    errors.append({"index": index, "error": str(error)})
+                else:
+                    results.append({"index": index, "output": output})
+        
+        return {"results": results, "errors": errors, "total": len(items)}
+    
+    async def execute_workflow_batch(self, workflow_id: str, inputs: List[Dict[str, Any]],
+                                     concurrency: int = 8, chunk_size: int = 1, ordered: bool = False,
+                                     budget: Optional[ExecutionBudget] = None):
+        """Execute a workflow once per input record, yielding results as they complete"""
+        completed = 0
+        failed = 0
+        
+        async def run_record(input_data: Dict[str, Any]) -> Dict[str, Any]:
+            return await self.execute_workflow(workflow_id, input_data, budget)
+        
+        async with aclosing(map_bounded(inputs, run_record, concurrency, chunk_size, ordered)) as outcomes:
+            async for index, result, error in outcomes:
+                if error is not None:
+                    failed += 1
+                    detail = error.detail if isinstance(error, HTTPException) else str(error)
+                    yield {"index": index, "status": "failed", "error": detail}
+                else:
+                    completed += 1
+                    yield {"index": index, **result}
+        
+        yield {"status": "batch_completed", "total": len(inputs), "completed": completed, "failed": failed}
+    
+    @staticmethod
+    def _charge_tokens(context: ExecutionContext, data: Dict[str, Any], prompt: str, completion: str) -> None:
+        """Charge an approximate token count (~4 characters per token) to the execution"""
+        tokens = (len(prompt) + len(completion)) // 4
+        context.charge(tokens=tokens, cost=tokens / 1000.0 * data.get("cost_per_1k_tokens", 0.0))
+    
+    def _build_execution_result(self, workflow: WorkflowConfig, input_data: Dict[str, Any],
+                                node_outputs: Dict[str, Any]) -> Dict[str, Any]:
+        """Summarize node outputs into an execution result"""
         node_count = len(workflow.nodes)
         connection_count = len(workflow.connections)
         
+        # Outputs of sink nodes (no downstream connections) form the workflow output
+        sources = {c.sourceId for c in workflow.connections}
+        sources.update(node.id for node in workflow.nodes if node.connections)
+        outputs = {node_id: output for node_id, output in node_outputs.items() if node_id not in sources}
+        
         return {
-            "processed_nodes": node_count,
+            "processed_nodes": len(node_outputs),
             "connections_executed": connection_count,
-            "output": f"Workflow '{workflow.name}' executed successfully with {node_count} nodes",
+            "output": outputs,
+            "node_outputs": node_outputs,
             "input_received": input_data,
             "execution_summary": {
                 "total_nodes": node_count,
@@ -231,6 +652,8 @@ class WorkflowManager:
         if not workflow:
             raise HTTPException(status_code=404, detail="Workflow not found")
         
+        # Age retention also applies to workflows that have stopped running
+        self._expire_history(workflow)
         return workflow.execution_history
     
     def get_execution_result(self, execution_id: str) -> Optional[Dict[str, Any]]:
@@ -267,6 +690,26 @@ class PluginConfig:
         if self.installed_at is None:
             self.installed_at = datetime.now()
 
+# Result key and message for code-less plugins, by category
+CATEGORY_RESULTS = {
+    "workflow": ("workflow_result", "Workflow plugin {name} executed {method}"),
+    "tool": ("tool_result", "Tool plugin {name} performed {method}"),
+    "integration": ("integration_result", "Integration plugin {name} connected to {method}"),
+    "generic": ("result", "Plugin {name} executed {method}"),
+}
+
+@dataclass(eq=False)
+class PluginInstance:
+    """One immutable revision of a running plugin"""
+    revision: int
+    code_hash: str
+    config: Dict[str, Any]
+    metadata: Dict[str, Any]
+    site_dir: Optional[str] = None  # Shared dependency environment, if any
+    methods: Dict[str, MethodSpec] = field(default_factory=dict)  # Dispatch table for this revision
+    in_flight: int = 0
+    retired: bool = False
+
 class PluginManager:
     """Manages ADK plugins and their lifecycle"""
     
@@ -275,9 +718,26 @@ class PluginManager:
         self.agent_manager = agent_manager
         self.workflow_manager = workflow_manager
         self.plugins: Dict[str, PluginConfig] = {}
-        self.plugin_registry: Dict[str, Any] = {}  # Runtime plugin instances
+        self.response_cache = ResponseCache("plugins")
+        self.plugin_registry: Dict[str, PluginInstance] = {}  # Current revision of each running plugin
+        self.draining_instances: List[PluginInstance] = []  # Retired revisions with calls in flight
+        self._builtin_methods = {"configure": self._configure_plugin}  # Platform-handled methods by name
         self.plugin_marketplace: List[Dict[str, Any]] = []
+        self.marketplace_by_id: Dict[str, Dict[str, Any]] = {}
+        self.catalog = CatalogIndex(
+            {"name": 3.0, "category": 2.0, "author": 1.5, "description": 1.0},
+            facet_fields=("category", "status", "author")
+        )
+        self.marketplace_index = CatalogIndex(
+            {"name": 3.0, "tags": 2.0, "category": 2.0, "author": 1.5, "description": 1.0},
+            facet_fields=("category", "author")
+        )
         self.execution_history: List[Dict[str, Any]] = []
+        self.runtime = PluginRuntime()  # Worker pool starts on first use or at startup
+        self.security_analyzer = SecurityAnalyzer()
+        self.environments = PluginEnvironmentManager()
+        self.plugin_limiters: Dict[str, BoundedLimiter] = {}
+        self.category_limiters: Dict[str, BoundedLimiter] = {}
         
     def create_plugin(self, request: PluginCreateRequest) -> PluginConfig:
         """Create a new plugin"""
@@ -297,6 +757,7 @@ class PluginManager:
             )
             
             self.plugins[plugin_config.id] = plugin_config
+            self._plugin_changed(plugin_config.id)
             
             logger.info(f"Created plugin: {plugin_config.name}", 
                        plugin_id=plugin_config.id, 
@@ -310,6 +771,7 @@ class PluginManager:
     
     def install_plugin(self, plugin_data: Dict[str, Any]) -> PluginConfig:
         """Install a plugin from data"""
+        self._check_security(plugin_data.get("code") or "", plugin_data.get("dependencies") or [])
         try:
             plugin_config = PluginConfig(
                 id=str(uuid.uuid4()),
@@ -326,6 +788,7 @@ class PluginManager:
             )
             
             self.plugins[plugin_config.id] = plugin_config
+            self._plugin_changed(plugin_config.id)
             
             logger.info(f"Installed plugin: {plugin_config.name}", 
                        plugin_id=plugin_config.id)
@@ -338,29 +801,84 @@ class PluginManager:
     
     def list_plugins(self, category: Optional[str] = None, status: Optional[str] = None) -> List[Dict[str, Any]]:
         """List all plugins with optional filtering"""
-        plugins = list(self.plugins.values())
-        
-        if category:
-            plugins = [p for p in plugins if p.category == category]
-        if status:
-            plugins = [p for p in plugins if p.status == status]
-            
-        return [asdict(plugin) for plugin in plugins]
+        return self.search_plugins(category=category, status=status)["plugins"]
+    
+    def search_plugins(self, query: str = "", category: Optional[str] = None, status: Optional[str] = None,
+                       author: Optional[str] = None, offset: int = 0, limit: Optional[int] = None) -> Dict[str, Any]:
+        """Search installed plugins by text with facet filters, ranked by relevance and usage"""
+        result = self.catalog.search(
+            query, {"category": category or None, "status": status or None, "author": author or None},
+            offset, limit
+        )
+        return {
+            "plugins": [self.response_cache.get(plugin_id, lambda p: p, self.plugins[plugin_id])
+                        for plugin_id in result["ids"]],
+            "total": result["total"],
+            "facets": result["facets"]
+        }
+    
+    def _plugin_changed(self, plugin_id: str) -> None:
+        """Refresh a plugin's cached representation and search index entry"""
+        self.response_cache.invalidate(plugin_id)
+        plugin = self.plugins.get(plugin_id)
+        if plugin is None:
+            self.catalog.remove(plugin_id)
+            return
+        self.catalog.add(
+            plugin.id,
+            {"name": plugin.name, "description": plugin.description,
+             "category": plugin.category, "author": plugin.author},
+            {"category": plugin.category, "status": plugin.status, "author": plugin.author},
+            rank=plugin.usage_count
+        )
     
     def get_plugin(self, plugin_id: str) -> Optional[PluginConfig]:
         """Get plugin by ID"""
         return self.plugins.get(plugin_id)
     
     def update_plugin(self, plugin_id: str, updates: Dict[str, Any]) -> PluginConfig:
-        """Update plugin configuration"""
+        """Update plugin configuration, hot-swapping a running plugin to a new revision"""
         plugin = self.get_plugin(plugin_id)
         if not plugin:
             raise HTTPException(status_code=404, detail="Plugin not found")
         
+        code_changed = "code" in updates and updates["code"] != plugin.code
+        dependencies_changed = "dependencies" in updates and updates["dependencies"] != plugin.dependencies
+        code = updates["code"] if code_changed else plugin.code
+        if code_changed and code:
+            # Compile before touching the plugin so a bad update changes nothing
+            try:
+                self.runtime.compile(code)
+                build_method_table(code)
+            except SyntaxError as e:
+                raise HTTPException(status_code=400, detail=f"Plugin code does not compile: {e}")
+            except PluginValidationError as e:
+                raise HTTPException(status_code=400, detail=f"Invalid plugin methods: {e}")
+        dependencies = updates["dependencies"] if dependencies_changed else plugin.dependencies
+        if code_changed or dependencies_changed:
+            # New dependencies can make previously denied imports allowed, so recheck either way
+            self._check_security(code, dependencies)
+        
+        enabled = plugin.status == "enabled"
+        if enabled and code and (code_changed or dependencies_changed):
+            self._resolve_environment(code, dependencies)
+        
         for key, value in updates.items():
             if hasattr(plugin, key):
                 setattr(plugin, key, value)
         
+        if "configuration" in updates:
+            # Resized on next use; calls holding the old limiter finish normally
+            self.plugin_limiters.pop(plugin_id, None)
+        
+        # Any code change on an enabled plugin builds a revision, including its first code
+        if enabled and (code_changed or dependencies_changed or "configuration" in updates):
+            if plugin.code:
+                self._initialize_plugin(plugin)
+            elif plugin_id in self.plugin_registry:
+                self._retire_instance(plugin, self.plugin_registry.pop(plugin_id))
+        self._plugin_changed(plugin_id)
+        
         logger.info(f"Updated plugin: {plugin.name}", plugin_id=plugin_id)
         return plugin
     
@@ -370,9 +888,11 @@ class PluginManager:
             plugin = self.plugins[plugin_id]
             # Remove from registry if exists
             if plugin_id in self.plugin_registry:
-                del self.plugin_registry[plugin_id]
+                self._retire_instance(plugin, self.plugin_registry.pop(plugin_id))
+            self.plugin_limiters.pop(plugin_id, None)
             
             del self.plugins[plugin_id]
+            self._plugin_changed(plugin_id)
             logger.info(f"Deleted plugin: {plugin.name}", plugin_id=plugin_id)
             return True
         return False
@@ -382,6 +902,8 @@ class PluginManager:
         plugin = self.get_plugin(plugin_id)
         if not plugin:
             raise HTTPException(status_code=404, detail="Plugin not found")
+        if plugin.code and plugin_id not in self.plugin_registry:
+            self._resolve_environment(plugin.code, plugin.dependencies)
         
         plugin.status = "enabled"
         plugin.last_used = datetime.now()
@@ -393,6 +915,7 @@ class PluginManager:
             except Exception as e:
                 logger.error(f"Failed to initialize plugin {plugin.name}: {e}")
                 plugin.status = "error"
+        self._plugin_changed(plugin_id)
         
         logger.info(f"Enabled plugin: {plugin.name}", plugin_id=plugin_id)
         return plugin
@@ -407,7 +930,8 @@ class PluginManager:
         
         # Remove from registry
         if plugin_id in self.plugin_registry:
-            del self.plugin_registry[plugin_id]
+            self._retire_instance(plugin, self.plugin_registry.pop(plugin_id))
+        self._plugin_changed(plugin_id)
         
         logger.info(f"Disabled plugin: {plugin.name}", plugin_id=plugin_id)
         return plugin
@@ -421,14 +945,247 @@ class PluginManager:
         if plugin.status != "enabled":
             raise HTTPException(status_code=400, detail="Plugin is not enabled")
         
+        # Pin the current revision; an update while this call is queued or
+        # running swaps in a new revision for later calls only
+        plugin_instance = self.plugin_registry.get(plugin_id)
+        if plugin_instance is not None:
+            spec = plugin_instance.methods.get(method)
+            if spec is None:
+                raise HTTPException(
+                    status_code=400,
+                    detail=f"Plugin {plugin.name} has no method {method!r}; available: {sorted(plugin_instance.methods)}"
+                )
+            # Reject bad arguments before they take a slot or reach a worker
+            try:
+                spec.validate(parameters)
+            except PluginValidationError as e:
+                raise HTTPException(status_code=422, detail=str(e))
+            plugin_instance.in_flight += 1
+        
+        # Take the plugin's own slot before the shared category slot so a busy
+        # plugin queues behind itself rather than starving its category
+        try:
+            async with self._plugin_limiter(plugin).slot(), self._category_limiter(plugin.category).slot():
+                return await self._run_plugin_execution(plugin, plugin_instance, method, parameters, context)
+        except QueueFullError as e:
+            logger.warning(f"Plugin execution rejected: {plugin.name}.{method}",
+                          plugin_id=plugin_id, reason=str(e))
+            raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": "1"})
+        finally:
+            if plugin_instance is not None:
+                plugin_instance.in_flight -= 1
+                if plugin_instance.retired and plugin_instance.in_flight == 0:
+                    self._release_instance(plugin, plugin_instance)
+    
+    async def execute_plugin_batch(self, plugin_id: str, method: str, items: List[Dict[str, Any]],
+                                   context: Dict[str, Any], chunk_size: int = 64, ordered: bool = False):
+        """Validate a batch call and return an iterator of per-item results as they complete.
+        
+        Methods with a batch function receive chunks of items in one worker
+        call; the rest run item by item, concurrently up to the plugin's limit.
+        """
+        plugin = self.get_plugin(plugin_id)
+        if not plugin:
+            raise HTTPException(status_code=404, detail="Plugin not found")
+        
+        if plugin.status != "enabled":
+            raise HTTPException(status_code=400, detail="Plugin is not enabled")
+        
+        plugin_instance = self.plugin_registry.get(plugin_id)
+        spec = None
+        if plugin_instance is not None:
+            spec = plugin_instance.methods.get(method)
+            if spec is None:
+                raise HTTPException(
+                    status_code=400,
+                    detail=f"Plugin {plugin.name} has no method {method!r}; available: {sorted(plugin_instance.methods)}"
+                )
+            if spec.builtin:
+                raise HTTPException(status_code=400, detail=f"Built-in method {method!r} cannot be batched")
+            try:
+                for index, parameters in enumerate(items):
+                    spec.validate(parameters, f"items[{index}]")
+            except PluginValidationError as e:
+                raise HTTPException(status_code=422, detail=str(e))
+        
+        return self._run_plugin_batch(plugin, plugin_instance, spec, method, items, context, chunk_size, ordered)
+    
+    async def _run_plugin_batch(self, plugin: PluginConfig, plugin_instance: Optional[PluginInstance],
+                                spec: Optional[MethodSpec], method: str, items: List[Dict[str, Any]],
+                                context: Dict[str, Any], chunk_size: int, ordered: bool):
+        """Run a validated batch, yielding one record per item and then a summary"""
         execution_id = str(uuid.uuid4())
         start_time = datetime.now()
+        timeout = plugin.configuration.get("timeout_seconds", PLUGIN_CALL_TIMEOUT)
+        vectorized = spec is not None and spec.batch is not None
+        outcomes: List[Optional[Dict[str, Any]]] = [None] * len(items)
+        unit_seconds: Dict[int, float] = {}
+        completed = 0
+        failed = 0
+        
+        # One history entry for the whole batch, holding counts and a sample
+        execution_record = {
+            "execution_id": execution_id,
+            "plugin_id": plugin.id,
+            "revision": plugin_instance.revision if plugin_instance else None,
+            "method": method,
+            "parameters": items[:PLUGIN_BATCH_HISTORY_SAMPLE],
+            "batch_size": len(items),
+            "vectorized": vectorized,
+            "context": context,
+            "status": "running",
+            "start_time": start_time
+        }
+        self.execution_history.append(execution_record)
+        
+        async def run_call(indices: range) -> List[Dict[str, Any]]:
+            if vectorized:
+                call = self.runtime.execute(
+                    plugin_instance.code_hash,
+                    spec.batch,
+                    [items[index] for index in indices],
+                    {**context, "configuration": plugin_instance.config},
+                    timeout=plugin_instance.config.get("timeout_seconds"),
+                    site_dir=plugin_instance.site_dir
+                )
+                data = await asyncio.wait_for(call, timeout)
+                if not isinstance(data, list) or len(data) != len(indices):
+                    raise PluginExecutionError(
+                        f"{spec.batch} must return a list with one result per item ({len(indices)})"
+                    )
+                return [{"success": True, "data": item} for item in data]
+            
+            if plugin_instance is not None:
+                call = self._execute_plugin_method(plugin, plugin_instance, method, items[indices[0]], context)
+            else:
+                call = self._execute_plugin_code(plugin, method, items[indices[0]], context)
+            return [await asyncio.wait_for(call, timeout)]
+        
+        async def run_unit(indices: range) -> List[Dict[str, Any]]:
+            if stale:
+                raise PluginExecutionError("Plugin was updated before the batch started; retry the batch")
+            # Each worker call takes its own slot, so a batch shares capacity fairly
+            async with self._plugin_limiter(plugin).slot(), self._category_limiter(plugin.category).slot():
+                started = time.monotonic()
+                try:
+                    return await run_call(indices)
+                finally:
+                    unit_seconds[indices.start] = time.monotonic() - started
+        
+        size = max(1, chunk_size) if vectorized else 1
+        units = [range(start, min(start + size, len(items))) for start in range(0, len(items), size)]
+        
+        # Pinned from the first read until the stream finishes, like a single call, so a
+        # response that is never read holds nothing. A revision retired in between may
+        # already have been released.
+        stale = plugin_instance is not None and plugin_instance.retired
+        if plugin_instance is not None and not stale:
+            plugin_instance.in_flight += 1
+        try:
+            async with aclosing(map_bounded(
+                units, run_unit, self._plugin_limiter(plugin).limit, 1, ordered
+            )) as unit_outcomes:
+                async for unit, results, error in unit_outcomes:
+                    # A vectorized chunk's time is shared evenly by its items
+                    item_seconds = unit_seconds.pop(units[unit].start, 0.0) / len(units[unit])
+                    for position, index in enumerate(units[unit]):
+                        if error is None:
+                            completed += 1
+                            outcome = {"index": index, "status": "completed", "result": results[position]}
+                        elif isinstance(error, (asyncio.TimeoutError, PluginTimeoutError)):
+                            failed += 1
+                            outcome = {"index": index, "status": "timed_out", "error": f"Exceeded {timeout}s time limit"}
+                        else:
+                            failed += 1
+                            detail = error.detail if isinstance(error, HTTPException) else str(error)
+                            outcome = {"index": index, "status": "failed", "error": detail}
+                        outcomes[index] = outcome
+                        execution_analytics.record("plugins", plugin.id, outcome["status"], item_seconds, method=method)
+                        yield outcome
+            
+            end_time = datetime.now()
+            execution_time = (end_time - start_time).total_seconds()
+            execution_record.update({
+                "status": "completed" if not failed else ("failed" if not completed else "partial"),
+                "end_time": end_time,
+                "execution_time": execution_time,
+                "completed": completed,
+                "failed": failed,
+                "results": outcomes[:PLUGIN_BATCH_HISTORY_SAMPLE]
+            })
+            
+            if completed:
+                plugin.usage_count += completed
+                plugin.last_used = end_time
+                self.response_cache.invalidate(plugin.id)
+                self.catalog.update_rank(plugin.id, plugin.usage_count)
+            
+            logger.info(f"Plugin batch completed: {plugin.name}.{method}", plugin_id=plugin.id,
+                       execution_id=execution_id, total=len(items), failed=failed)
+            
+            yield {
+                "status": "batch_completed",
+                "execution_id": execution_id,
+                "total": len(items),
+                "completed": completed,
+                "failed": failed,
+                "execution_time": execution_time
+            }
+        
+        finally:
+            if execution_record["status"] == "running":
+                # The client went away mid-stream
+                execution_record.update({"status": "cancelled", "end_time": datetime.now(),
+                                         "completed": completed, "failed": failed,
+                                         "results": outcomes[:PLUGIN_BATCH_HISTORY_SAMPLE]})
+            if plugin_instance is not None and not stale:
+                plugin_instance.in_flight -= 1
+                if plugin_instance.retired and plugin_instance.in_flight == 0:
+                    self._release_instance(plugin, plugin_instance)
+    
+    def _plugin_limiter(self, plugin: PluginConfig) -> BoundedLimiter:
+        """Concurrency limiter for one plugin, sized from its configuration"""
+        limiter = self.plugin_limiters.get(plugin.id)
+        if limiter is None:
+            limiter = BoundedLimiter(
+                f"Plugin {plugin.name}",
+                plugin.configuration.get("max_concurrency", PLUGIN_MAX_CONCURRENCY),
+                plugin.configuration.get("max_queue", PLUGIN_MAX_QUEUE)
+            )
+            self.plugin_limiters[plugin.id] = limiter
+        return limiter
+    
+    def _category_limiter(self, category: str) -> BoundedLimiter:
+        """Concurrency limiter shared by all plugins of a category"""
+        limiter = self.category_limiters.get(category)
+        if limiter is None:
+            limiter = BoundedLimiter(
+                f"Plugin category {category}", PLUGIN_CATEGORY_MAX_CONCURRENCY, PLUGIN_CATEGORY_MAX_QUEUE
+            )
+            self.category_limiters[category] = limiter
+        return limiter
+    
+    def concurrency_stats(self) -> Dict[str, Any]:
+        """In-flight, queued and rejected counts per plugin and category"""
+        return {
+            "plugins": {plugin_id: limiter.stats() for plugin_id, limiter in self.plugin_limiters.items()},
+            "categories": {category: limiter.stats() for category, limiter in self.category_limiters.items()}
+        }
+    
+    async def _run_plugin_execution(self, plugin: PluginConfig, plugin_instance: Optional[PluginInstance], method: str, parameters: Dict[str, Any], context: Dict[str, Any]) -> Dict[str, Any]:
+        """Execute a plugin method once a concurrency slot is held"""
+        plugin_id = plugin.id
+        
+        execution_id = str(uuid.uuid4())
+        start_time = datetime.now()
+        timeout = plugin.configuration.get("timeout_seconds", PLUGIN_CALL_TIMEOUT)
         
         try:
             # Record execution start
             execution_record = {
                 "execution_id": execution_id,
                 "plugin_id": plugin_id,
+                "revision": plugin_instance.revision if plugin_instance else None,
                 "method": method,
                 "parameters": parameters,
                 "context": context,
@@ -439,12 +1196,12 @@ class PluginManager:
             self.execution_history.append(execution_record)
             
             # Execute plugin
-            if plugin_id in self.plugin_registry:
-                plugin_instance = self.plugin_registry[plugin_id]
-                result = await self._execute_plugin_method(plugin_instance, method, parameters, context)
+            if plugin_instance is not None:
+                call = self._execute_plugin_method(plugin, plugin_instance, method, parameters, context)
             else:
                 # Execute code directly if no instance
-                result = await self._execute_plugin_code(plugin, method, parameters, context)
+                call = self._execute_plugin_code(plugin, method, parameters, context)
+            result = await asyncio.wait_for(call, timeout)
             
             end_time = datetime.now()
             execution_time = (end_time - start_time).total_seconds()
@@ -460,6 +1217,8 @@ class PluginManager:
             # Update plugin usage
             plugin.usage_count += 1
             plugin.last_used = end_time
+            self.response_cache.invalidate(plugin_id)
+            self.catalog.update_rank(plugin_id, plugin.usage_count)
             
             logger.info(f"Plugin execution completed: {plugin.name}.{method}", 
                        plugin_id=plugin_id, execution_id=execution_id)
@@ -471,6 +1230,20 @@ class PluginManager:
                 "status": "completed"
             }
             
+        except (asyncio.TimeoutError, PluginTimeoutError):
+            end_time = datetime.now()
+            execution_record.update({
+                "status": "timed_out",
+                "end_time": end_time,
+                "execution_time": (end_time - start_time).total_seconds(),
+                "error": f"Exceeded {timeout}s time limit"
+            })
+            
+            logger.error(f"Plugin execution timed out: {plugin.name}.{method}",
+                        plugin_id=plugin_id, timeout=timeout)
+            
+            raise HTTPException(status_code=504, detail=f"Plugin execution exceeded its {timeout}s time limit")
+            
         except Exception as e:
             end_time = datetime.now()
             execution_time = (end_time - start_time).total_seconds()
@@ -487,90 +1260,138 @@ class PluginManager:
                         plugin_id=plugin_id, error=str(e))
             
             raise HTTPException(status_code=500, detail=f"Plugin execution failed: {str(e)}")
+        
+        finally:
+            if execution_record["status"] != "running":
+                execution_analytics.record("plugins", plugin_id, execution_record["status"],
+                                           execution_record["execution_time"], start_time, method)
     
     def _initialize_plugin(self, plugin: PluginConfig) -> None:
-        """Initialize a plugin instance"""
+        """Build a new revision of a plugin and atomically make it current"""
         try:
-            # Simple plugin initialization - in a real implementation,
-            # this would use a secure sandbox and proper code execution
             if plugin.code:
-                # Execute plugin code in a controlled environment
-                plugin_instance = {
-                    "config": plugin.configuration,
-                    "metadata": {
+                previous = self.plugin_registry.get(plugin.id)
+                # Compile once here; calls then only dispatch by code hash
+                plugin_instance = PluginInstance(
+                    revision=previous.revision + 1 if previous else 1,
+                    code_hash=self.runtime.compile(plugin.code),
+                    site_dir=self._resolve_environment(plugin.code, plugin.dependencies),
+                    methods=build_method_table(plugin.code),
+                    config=dict(plugin.configuration),
+                    metadata={
                         "id": plugin.id,
                         "name": plugin.name,
                         "version": plugin.version
                     }
-                }
+                )
                 self.plugin_registry[plugin.id] = plugin_instance
+                if previous is not None:
+                    self._retire_instance(plugin, previous)
                 
         except Exception as e:
             logger.error(f"Failed to initialize plugin {plugin.name}: {e}")
             raise
     
-    async def _execute_plugin_method(self, plugin_instance: Dict[str, Any], method: str, parameters: Dict[str, Any], context: Dict[str, Any]) -> Dict[str, Any]:
+    def _retire_instance(self, plugin: PluginConfig, plugin_instance: PluginInstance) -> None:
+        """Stop routing calls to a revision, releasing it once its in-flight calls drain"""
+        plugin_instance.retired = True
+        if plugin_instance.in_flight == 0:
+            self._release_instance(plugin, plugin_instance)
+        else:
+            self.draining_instances.append(plugin_instance)
+    
+    def _release_instance(self, plugin: PluginConfig, plugin_instance: PluginInstance) -> None:
+        """Drop a drained revision's bytecode unless a live revision shares it"""
+        if plugin_instance in self.draining_instances:
+            self.draining_instances.remove(plugin_instance)
+        live = list(self.plugin_registry.values()) + self.draining_instances
+        if not any(i.code_hash == plugin_instance.code_hash for i in live):
+            self.runtime.discard(plugin_instance.code_hash)
+        logger.info(f"Retired plugin revision: {plugin.name}",
+                   plugin_id=plugin.id, revision=plugin_instance.revision)
+    
+    async def _execute_plugin_method(self, plugin: PluginConfig, plugin_instance: PluginInstance, method: str, parameters: Dict[str, Any], context: Dict[str, Any]) -> Dict[str, Any]:
         """Execute a method on plugin instance"""
-        # This is a simplified implementation
-        # In reality, this would handle proper plugin method calls
+        if plugin_instance.methods[method].builtin:
+            return await self._builtin_methods[method](plugin, parameters)
         
-        if method == "execute":
-            return {
-                "success": True,
-                "data": f"Plugin {plugin_instance['metadata']['name']} executed with params: {parameters}",
-                "context": context
-            }
-        elif method == "configure":
-            plugin_instance["config"].update(parameters)
-            return {"success": True, "configuration": plugin_instance["config"]}
-        else:
-            raise ValueError(f"Unknown plugin method: {method}")
+        # Declared methods run the plugin's own code in the plugin worker pool
+        data = await self.runtime.execute(
+            plugin_instance.code_hash,
+            method,
+            parameters,
+            {**context, "configuration": plugin_instance.config},
+            timeout=plugin_instance.config.get("timeout_seconds"),
+            site_dir=plugin_instance.site_dir
+        )
+        return {"success": True, "data": data}
+    
+    async def _configure_plugin(self, plugin: PluginConfig, parameters: Dict[str, Any]) -> Dict[str, Any]:
+        """Built-in configure method"""
+        # Reconfiguring rolls out a new revision like any other update
+        await self.prepare_dependencies(plugin.dependencies)
+        self.update_plugin(plugin.id, {"configuration": {**plugin.configuration, **parameters}})
+        return {"success": True, "configuration": plugin.configuration}
+    
+    def get_plugin_methods(self, plugin_id: str) -> List[Dict[str, Any]]:
+        """Describe the methods the current revision of a plugin exposes"""
+        plugin = self.get_plugin(plugin_id)
+        if not plugin:
+            raise HTTPException(status_code=404, detail="Plugin not found")
+        plugin_instance = self.plugin_registry.get(plugin_id)
+        if plugin_instance is None:
+            return []
+        return [spec.describe() for spec in plugin_instance.methods.values()]
     
     async def _execute_plugin_code(self, plugin: PluginConfig, method: str, parameters: Dict[str, Any], context: Dict[str, Any]) -> Dict[str, Any]:
         """Execute plugin code directly"""
-        # This is a simplified implementation
-        # In reality, this would use a secure sandbox for code execution
+        if plugin.code:
+            data = await self.runtime.execute(
+                self.runtime.compile(plugin.code),
+                method,
+                parameters,
+                {**context, "configuration": plugin.configuration},
+                timeout=plugin.configuration.get("timeout_seconds")
+            )
+            return {"success": True, "data": data}
         
-        if plugin.category == "workflow":
-            # Workflow plugin execution
-            return {
-                "success": True,
-                "workflow_result": f"Workflow plugin {plugin.name} executed {method}",
-                "parameters": parameters,
-                "context": context
-            }
-        elif plugin.category == "tool":
-            # Tool plugin execution
-            return {
-                "success": True,
-                "tool_result": f"Tool plugin {plugin.name} performed {method}",
-                "parameters": parameters,
-                "context": context
-            }
-        elif plugin.category == "integration":
-            # Integration plugin execution
-            return {
-                "success": True,
-                "integration_result": f"Integration plugin {plugin.name} connected to {method}",
-                "parameters": parameters,
-                "context": context
-            }
-        else:
-            # Generic plugin execution
-            return {
-                "success": True,
-                "result": f"Plugin {plugin.name} executed {method}",
-                "parameters": parameters,
-                "context": context
-            }
+        # Code-less plugins fall back to a descriptive result by category
+        key, template = CATEGORY_RESULTS.get(plugin.category, CATEGORY_RESULTS["generic"])
+        return {
+            "success": True,
+            key: template.format(name=plugin.name, method=method),
+            "parameters": parameters,
+            "context": context
+        }
     
-    def get_plugin_marketplace(self) -> List[Dict[str, Any]]:
-        """Get available plugins from marketplace"""
-        return self.plugin_marketplace
+    def get_plugin_marketplace(self, query: str = "", category: Optional[str] = None, author: Optional[str] = None,
+                               offset: int = 0, limit: Optional[int] = None) -> Dict[str, Any]:
+        """Search available plugins from marketplace"""
+        result = self.marketplace_index.search(
+            query, {"category": category or None, "author": author or None}, offset, limit
+        )
+        return {
+            "plugins": [self.marketplace_by_id[entry_id] for entry_id in result["ids"]],
+            "total": result["total"],
+            "facets": result["facets"],
+            "categories": self.marketplace_index.facet_values("category")
+        }
     
     def add_to_marketplace(self, plugin_data: Dict[str, Any]) -> None:
         """Add plugin to marketplace"""
+        entry_id = plugin_data.setdefault("id", str(uuid.uuid4()))
+        previous = self.marketplace_by_id.get(entry_id)
+        if previous is not None:
+            self.plugin_marketplace.remove(previous)
         self.plugin_marketplace.append(plugin_data)
+        self.marketplace_by_id[entry_id] = plugin_data
+        
+        self.marketplace_index.add(
+            entry_id,
+            plugin_data,
+            {"category": plugin_data.get("category"), "author": plugin_data.get("author")},
+            rank=plugin_data.get("usage_count", plugin_data.get("downloads", 0))
+        )
     
     def get_execution_history(self, plugin_id: Optional[str] = None) -> List[Dict[str, Any]]:
         """Get plugin execution history"""
@@ -579,29 +1400,45 @@ class PluginManager:
                    if exec_record["plugin_id"] == plugin_id]
         return self.execution_history
     
-    def validate_plugin_security(self, plugin_code: str) -> Dict[str, Any]:
-        """Validate plugin code for security issues"""
-        security_issues = []
-        
-        # Basic security checks
-        dangerous_functions = ["eval", "exec", "open", "import", "__import__"]
-        for func in dangerous_functions:
-            if func in plugin_code:
-                security_issues.append(f"Potentially dangerous function: {func}")
+    def validate_plugin_security(self, plugin_code: str, dependencies: Optional[List[str]] = None) -> Dict[str, Any]:
+        """Validate plugin code for security issues before its dependencies are installed.
         
-        # Check for file system access
-        if "file" in plugin_code.lower() or "path" in plugin_code.lower():
-            security_issues.append("File system access detected")
-        
-        # Check for network access
-        if "http" in plugin_code.lower() or "socket" in plugin_code.lower():
-            security_issues.append("Network access detected")
+        Imports outside the policy are reported as unresolved_imports when the
+        plugin declares dependencies; _resolve_environment checks them against
+        what those dependencies actually install.
+        """
+        return self.security_analyzer.analyze(plugin_code, pending=bool(dependencies))
+    
+    async def prepare_dependencies(self, dependencies: List[str]) -> None:
+        """Install a dependency environment in a thread so pip never blocks the event loop.
         
-        return {
-            "is_safe": len(security_issues) == 0,
-            "issues": security_issues,
-            "warnings": ["Always review plugin code before installation"] if security_issues else []
-        }
+        Async callers await this before enable_plugin/update_plugin, which then
+        find the environment ready instead of installing it inline.
+        """
+        try:
+            await asyncio.to_thread(self.environments.ensure, dependencies)
+        except PluginDependencyError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+    
+    def _resolve_environment(self, plugin_code: str, dependencies: List[str]) -> Optional[str]:
+        """Install a plugin's dependencies and reject imports they do not provide"""
+        try:
+            site_dir = self.environments.ensure(dependencies)
+            modules = self.environments.modules(site_dir)
+        except PluginDependencyError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        security_check = self.security_analyzer.analyze(plugin_code, modules)
+        if not security_check["is_safe"]:
+            raise HTTPException(status_code=400, detail=f"Plugin security validation failed: {security_check['issues']}")
+        return site_dir
+    
+    def _check_security(self, plugin_code: str, dependencies: List[str]) -> None:
+        """Reject plugin code that fails security validation"""
+        if not plugin_code:
+            return
+        security_check = self.validate_plugin_security(plugin_code, dependencies)
+        if not security_check["is_safe"]:
+            raise HTTPException(status_code=400, detail=f"Plugin security validation failed: {security_check['issues']}")
 
 # Model Integration Imports
 try:
@@ -632,8 +1469,11 @@ class ModelConfig:
     parameters: Dict[str, Any] = None
     capabilities: List[str] = None
     status: str = "inactive"  # "active", "inactive", "error"
+    hedging: Optional[Dict[str, Any]] = None  # opt-in HedgePolicy settings for latency-critical models
     
     def __post_init__(self):
+        if self.hedging is not None:
+            HedgePolicy(**self.hedging)  # reject bad settings when the config is created
         if self.parameters is None:
             self.parameters = {
                 "temperature": 1.0,
@@ -750,10 +1590,24 @@ class WorkflowCreateRequest(BaseModel):
 class WorkflowExecutionRequest(BaseModel):
     workflow_id: str
     input_data: Dict[str, Any] = {}
+    timeout_seconds: Optional[float] = None  # whole-execution deadline
+    node_timeout_seconds: Optional[float] = None  # default per-node deadline
+    max_tokens: Optional[int] = None
+    max_cost: Optional[float] = None
+
+class WorkflowBatchExecutionRequest(BaseModel):
+    inputs: List[Dict[str, Any]]
+    concurrency: int = 8
+    chunk_size: int = 1
+    ordered: bool = False  # stream in completion order by default
+    timeout_seconds: Optional[float] = None
+    node_timeout_seconds: Optional[float] = None
+    max_tokens: Optional[int] = None
+    max_cost: Optional[float] = None
 
 # Plugin Management Models
-class PluginConfig(BaseModel):
-    """Plugin configuration schema"""
+class PluginManifest(BaseModel):
+    """Plugin manifest schema"""
     name: str
     version: str
     author: str
@@ -790,19 +1644,31 @@ class PluginExecutionRequest(BaseModel):
     parameters: Dict[str, Any] = {}
     context: Dict[str, Any] = {}
 
+class PluginBatchExecutionRequest(BaseModel):
+    """Request to execute one plugin method over many parameter sets"""
+    method: str
+    items: List[Dict[str, Any]]
+    context: Dict[str, Any] = {}
+    chunk_size: int = 64  # items per worker call for vectorized methods
+    ordered: bool = False  # stream in completion order by default
+
 # Model Manager
 class ModelManager:
     """Manages different model types and configurations"""
     
     def __init__(self):
         self.model_configs: Dict[str, ModelConfig] = {}
+        self.response_cache = ResponseCache("models")
         self.active_sessions: Dict[str, Dict] = {}
         self.performance_metrics: Dict[str, Dict] = {}
+        self.hedgers: Dict[str, Hedger] = {}  # per model, holding its TTFT history and hedge budget
         
     def add_model_config(self, config: ModelConfig) -> bool:
         """Add or update model configuration"""
         try:
             self.model_configs[config.name] = config
+            self.response_cache.invalidate(config.name)
+            self.hedgers.pop(config.name, None)
             logger.info(f"Added model config: {config.name}", 
                        model_type=config.type, provider=config.provider)
             return True
@@ -816,35 +1682,31 @@ class ModelManager:
     
     def list_models(self) -> List[Dict[str, Any]]:
         """List all available model configurations"""
-        return [asdict(config) for config in self.model_configs.values()]
+        return [
+            self.response_cache.get(name, lambda c: c, config)
+            for name, config in self.model_configs.items()
+        ]
     
     async def test_model(self, config: ModelConfig, test_prompt: str) -> Dict[str, Any]:
         """Test a model configuration"""
         start_time = datetime.now()
         
         try:
-            if config.type == "local" and LITE_LLM_AVAILABLE:
-                # Test local model via LiteLLM
-                response = await self._test_local_model(config, test_prompt)
-            elif config.type == "api":
-                # Test API model
-                response = await self._test_api_model(config, test_prompt)
-            else:
-                raise ValueError(f"Unsupported model type: {config.type}")
+            with energy_sampler.attribute("inference", model=config.name):
+                if config.type == "local" and LITE_LLM_AVAILABLE:
+                    # Test local model via LiteLLM
+                    response = await self._test_local_model(config, test_prompt)
+                elif config.type == "api":
+                    # Test API model
+                    response = await self._test_api_model(config, test_prompt)
+                else:
+                    raise ValueError(f"Unsupported model type: {config.type}")
             
             end_time = datetime.now()
             latency = (end_time - start_time).total_seconds()
             
             # Update performance metrics
-            if config.name not in self.performance_metrics:
-                self.performance_metrics[config.name] = {
-                    "total_requests": 0,
-                    "total_latency": 0.0,
-                    "success_count": 0,
-                    "error_count": 0
-                }
-            
-            metrics = self.performance_metrics[config.name]
+            metrics = self._model_metrics(config.name)
             metrics["total_requests"] += 1
             metrics["total_latency"] += latency
             metrics["success_count"] += 1
@@ -867,6 +1729,115 @@ class ModelManager:
                 "model_name": config.name
             }
     
+    def _model_metrics(self, name: str) -> Dict[str, Any]:
+        metrics = self.performance_metrics.get(name)
+        if metrics is None:
+            metrics = self.performance_metrics[name] = {
+                "total_requests": 0,
+                "total_latency": 0.0,
+                "success_count": 0,
+                "error_count": 0,
+                "input_tokens": 0,
+                "cached_input_tokens": 0,
+                "cache_write_tokens": 0,
+                "output_tokens": 0,
+                "cached_input_ratio": 0.0,
+                "hedged_requests": 0,
+                "hedge_wins": 0
+            }
+        return metrics
+    
+    def _record_usage(self, name: str, usage: Dict[str, int]) -> None:
+        """Accumulate token usage, split into cached and uncached input"""
+        metrics = self._model_metrics(name)
+        for key in ("input_tokens", "cached_input_tokens", "cache_write_tokens", "output_tokens"):
+            metrics[key] += usage[key]
+        if metrics["input_tokens"]:
+            metrics["cached_input_ratio"] = metrics["cached_input_tokens"] / metrics["input_tokens"]
+    
+    def _hedger(self, config: ModelConfig) -> Optional[Hedger]:
+        if not config.hedging:
+            return None
+        hedger = self.hedgers.get(config.name)
+        if hedger is None:
+            policy = HedgePolicy(**config.hedging)
+            if not policy.enabled:
+                return None
+            hedger = self.hedgers[config.name] = Hedger(policy)
+        return hedger
+    
+    async def complete(self, config: ModelConfig, messages: List[Dict[str, Any]],
+                       tools: Optional[List[Dict[str, Any]]] = None) -> Dict[str, Any]:
+        """Run one chat completion, returning its text and any tool calls the model made.
+        
+        Models with a hedging policy race a duplicate request against a slow
+        first token; see Hedger.
+        """
+        hedger = self._hedger(config)
+        if hedger is None:
+            return await self._complete_once(config, messages, tools)
+        
+        alternate = self.get_model_config(hedger.policy.alternate) if hedger.policy.alternate else None
+        if hedger.policy.alternate and alternate is None:
+            logger.warning(f"Hedge model not found: {hedger.policy.alternate}", model=config.name)
+        result, race = await hedger.run(
+            lambda first_token: self._complete_once(config, messages, tools, first_token),
+            lambda first_token: self._complete_once(alternate or config, messages, tools, first_token)
+        )
+        metrics = self._model_metrics(config.name)
+        metrics["hedged_requests"] += race["hedged"]
+        metrics["hedge_wins"] += race["winner"] == "hedge"
+        return {**result, "hedge": race}
+    
+    async def _complete_once(self, config: ModelConfig, messages: List[Dict[str, Any]],
+                             tools: Optional[List[Dict[str, Any]]] = None,
+                             first_token: Optional[asyncio.Event] = None) -> Dict[str, Any]:
+        """One completion request; with first_token set, streamed so the event fires on the first chunk"""
+        target = self._litellm_target(config) if LITE_LLM_AVAILABLE else None
+        if target is None:
+            # Providers without a function-calling integration answer the latest user message
+            prompt = next((m["content"] for m in reversed(messages) if m["role"] == "user"), "")
+            return {"content": await self._test_api_model(config, prompt), "tool_calls": []}
+        
+        model, options = target
+        messages, tools = apply_cache_control(config.provider, messages, tools)
+        if tools:
+            options["tools"] = tools
+        if first_token is None:
+            response = await litellm.acompletion(model=model, messages=messages, **options, **config.parameters)
+        else:
+            stream = await litellm.acompletion(model=model, messages=messages, stream=True,
+                                               stream_options={"include_usage": True}, **options, **config.parameters)
+            chunks = []
+            async for chunk in stream:
+                first_token.set()
+                chunks.append(chunk)
+            response = litellm.stream_chunk_builder(chunks, messages=messages)
+        usage = cache_usage(getattr(response, "usage", None))
+        self._record_usage(config.name, usage)
+        message = response.choices[0].message
+        return {"content": message.content or "", "usage": usage,
+                "tool_calls": parse_tool_calls(getattr(message, "tool_calls", None))}
+    
+    async def probe(self, config: ModelConfig) -> None:
+        """One-token completion that opens the provider connection and loads the model"""
+        probe_config = replace(config, parameters={**config.parameters, "max_tokens": 1}, hedging=None)
+        await self._complete_once(probe_config, [{"role": "user", "content": "ping"}])
+    
+    def _litellm_target(self, config: ModelConfig) -> Optional[Tuple[str, Dict[str, Any]]]:
+        """LiteLLM model name and connection options for providers that support tool calling"""
+        if config.type == "local" and config.provider == "vllm":
+            return "openai/placeholder", {"api_base": config.api_base or "http://localhost:8000/v1",
+                                          "api_key": config.api_key or "dummy"}
+        if config.type == "local" and config.provider == "ollama":
+            return f"ollama_chat/{config.model_id}", {"api_base": config.api_base or "http://localhost:11434",
+                                                      "api_key": "dummy"}
+        if config.provider == "openai":
+            return config.model_id, {"api_key": config.api_key}
+        if config.provider == "anthropic":
+            return f"anthropic/{config.model_id}", {"api_key": config.api_key}
+        return None
+    
     async def _test_local_model(self, config: ModelConfig, test_prompt: str) -> str:
         """Test local model via LiteLLM"""
         if not LITE_LLM_AVAILABLE:
@@ -953,7 +1924,9 @@ class AgentManager:
     def __init__(self, model_manager: ModelManager):
         self.model_manager = model_manager
         self.agents: Dict[str, AgentConfig] = {}
+        self.response_cache = ResponseCache("agents")
         self.active_conversations: Dict[str, List[ChatMessage]] = {}
+        self.plugin_manager = None  # Wired up once the PluginManager exists; supplies agent tools
         
     def create_agent(self, request: AgentCreateRequest) -> AgentConfig:
         """Create a new ADK agent"""
@@ -972,6 +1945,7 @@ class AgentManager:
             )
             
             self.agents[agent_config.id] = agent_config
+            self.response_cache.invalidate(agent_config.id)
             
             logger.info(f"Created agent: {agent_config.name}", 
                        agent_id=agent_config.id, 
@@ -985,50 +1959,91 @@ class AgentManager:
     
     def list_agents(self) -> List[Dict[str, Any]]:
         """List all agents"""
-        return [asdict(agent) for agent in self.agents.values()]
+        return [self.response_cache.get(agent.id, lambda a: a, agent) for agent in self.agents.values()]
     
     def get_agent(self, agent_id: str) -> Optional[AgentConfig]:
         """Get agent by ID"""
         return self.agents.get(agent_id)
     
-    async def chat_with_agent(self, agent_id: str, message: str, stream: bool = True) -> Dict[str, Any]:
-        """Chat with an agent"""
+    def _agent_tools(self, agent: AgentConfig) -> List[Tool]:
+        """One tool per method of each enabled plugin the agent lists, by id or name"""
+        if self.plugin_manager is None:
+            return []
+        tools: List[Tool] = []
+        for ref in agent.tools:
+            plugin = self.plugin_manager.get_plugin(ref) or next(
+                (p for p in self.plugin_manager.plugins.values() if p.name == ref), None
+            )
+            if plugin is None or plugin.status != "enabled":
+                logger.warning(f"Agent tool unavailable: {ref}", agent_id=agent.id)
+                continue
+            for method in self.plugin_manager.get_plugin_methods(plugin.id):
+                if method["builtin"] or any(t.plugin_id == plugin.id and t.method == method["name"] for t in tools):
+                    continue
+                tools.append(Tool(
+                    name=tool_name(plugin.name, method["name"], {tool.name for tool in tools}),
+                    description=method["description"] or plugin.description,
+                    parameters=method["parameters"] or {"type": "object", "properties": {}},
+                    plugin_id=plugin.id,
+                    method=method["name"]
+                ))
+        return tools
+    
+    def run_agent(self, agent_id: str, message: str):
+        """Validate a chat turn and return an iterator of its steps, ending with the final answer"""
         agent = self.get_agent(agent_id)
         if not agent:
             raise HTTPException(status_code=404, detail="Agent not found")
+        return self._run_agent(agent, message)
+    
+    async def _run_agent(self, agent: AgentConfig, message: str):
+        conversation = self.active_conversations.setdefault(agent.id, [])
+        request = ChatMessage(role="user", content=message)
         
-        # Add user message to conversation
-        if agent_id not in self.active_conversations:
-            self.active_conversations[agent_id] = []
+        # System prompt, then history trimmed in blocks, so consecutive turns
+        # share a byte-identical prefix that provider prompt caches can reuse.
+        # Tool calls and results stay within the turn; history keeps only the exchange
+        messages = [{"role": "system", "content": agent.system_prompt}]
+        for msg in stable_history_window(conversation + [request]):
+            messages.append({"role": msg.role, "content": msg.content})
         
-        user_message = ChatMessage(role="user", content=message)
-        self.active_conversations[agent_id].append(user_message)
+        async def complete(messages: List[Dict[str, Any]], tools: List[Dict[str, Any]]) -> Dict[str, Any]:
+            with energy_sampler.attribute("inference", agent=agent.id, model=agent.model_config.name):
+                return await self.model_manager.complete(agent.model_config, messages, tools)
         
-        # Prepare messages for model
-        messages = [
-            {"role": "system", "content": agent.system_prompt}
-        ]
+        async def invoke(tool: Tool, arguments: Dict[str, Any]) -> Any:
+            response = await self.plugin_manager.execute_plugin(
+                tool.plugin_id, tool.method, arguments, {"agent_id": agent.id}
+            )
+            return response["result"]
         
-        # Add conversation history
-        for msg in self.active_conversations[agent_id][-10:]:  # Keep last 10 messages
-            messages.append({"role": msg.role, "content": msg.content})
+        executor = AgentExecutor(complete, invoke, self._agent_tools(agent), agent.max_iterations)
+        async for step in executor.run(messages):
+            if step["type"] == "final":
+                # Recorded only once answered, so a failed turn leaves no unpaired user message
+                if step["response"]:
+                    conversation.extend([request, ChatMessage(role="assistant", content=step["response"])])
+                step.update({"agent_id": agent.id, "model_used": agent.model_config.name})
+            yield step
+    
+    async def chat_with_agent(self, agent_id: str, message: str, stream: bool = True) -> Dict[str, Any]:
+        """Chat with an agent, running its tool calls until it answers"""
+        steps = self.run_agent(agent_id, message)
         
         try:
-            # Get model response
-            response = await self.model_manager._test_api_model(
-                agent.model_config, 
-                f"Based on conversation context, respond to: {message}"
-            )
-            
-            # Add assistant response to conversation
-            assistant_message = ChatMessage(role="assistant", content=response)
-            self.active_conversations[agent_id].append(assistant_message)
-            
+            trace = [step async for step in steps]
+            final = trace.pop()
             return {
                 "success": True,
-                "response": response,
+                "response": final["response"],
                 "agent_id": agent_id,
-                "model_used": agent.model_config.name
+                "model_used": final["model_used"],
+                "finish_reason": final["finish_reason"],
+                "iterations": final["iterations"],
+                "tool_calls": final["tool_calls"],
+                "cached_tool_calls": final["cached_tool_calls"],
+                "usage": final["usage"],
+                "steps": trace
             }
             
         except Exception as e:
@@ -1046,6 +2061,28 @@ class IntegralAIManager:
         self.capabilities: List[IntegralAICapability] = []
         self.execution_history: List[Dict[str, Any]] = []
         
+        # Aggregates updated as results are stored so metrics never rescan them
+        self.successful_learning = 0
+        self.skills_acquired_stats = RunningStats()
+        self.safety_score_stats = RunningStats()
+        self.failure_rate_stats = RunningStats()
+        self.efficiency_stats = RunningStats()
+        self.recent_energy_profiles: Deque[str] = deque(maxlen=METRICS_WINDOW_SIZE)
+        
+        # Time-indexed run history with minute and hour rollups
+        self.history = TimeSeriesStore()
+        
+        # Safety checks evaluated against live platform telemetry
+        self.compliance = register_default_checks(ComplianceRegistry())
+        
+        # Learning, safety and energy runs execute as background jobs
+        self.jobs = JobScheduler()
+        self._job_runners = {
+            "autonomous_skill_learning": self.autonomous_skill_learning,
+            "safe_mastery_assessment": self.safe_mastery_assessment,
+            "energy_efficiency_monitoring": self.energy_efficiency_monitoring
+        }
+        
     def register_capability(self, capability: IntegralAICapability) -> bool:
         """Register an Integral AI capability"""
         try:
@@ -1057,7 +2094,27 @@ class IntegralAIManager:
             logger.error(f"Failed to register capability {capability.name}: {e}")
             return False
     
-    async def autonomous_skill_learning(self, request: AutonomousLearningRequest) -> Dict[str, Any]:
+    def submit_job(self, kind: str, request: BaseModel) -> Dict[str, Any]:
+        """Start a learning, safety or energy run in the background and return its job"""
+        runner = self._job_runners[kind]
+        try:
+            job = self.jobs.submit(kind, lambda job: runner(request, job), metadata=request.dict())
+        except QueueFullError as e:
+            raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": "1"})
+        logger.info(f"Submitted Integral AI job: {kind}", job_id=job.job_id)
+        return job.to_dict()
+    
+    def get_job(self, job_id: str) -> Job:
+        job = self.jobs.get(job_id)
+        if job is None:
+            raise HTTPException(status_code=404, detail="Job not found")
+        return job
+    
+    def cancel_job(self, job_id: str) -> Job:
+        self.get_job(job_id)
+        return self.jobs.cancel(job_id)
+    
+    async def autonomous_skill_learning(self, request: AutonomousLearningRequest, job: Optional[Job] = None) -> Dict[str, Any]:
         """Perform autonomous skill learning"""
         learning_id = str(uuid.uuid4())
         start_time = datetime.now()
@@ -1076,10 +2133,15 @@ class IntegralAIManager:
             }
             
             # Simulate learning phases
-            for phase in range(10):
-                learning_result["progress"] = (phase + 1) * 10.0
-                learning_result["skills_acquired"].append(f"sub_skill_{phase+1}")
-                await asyncio.sleep(0.1)  # Simulate learning time
+            # Label by skill domain so totals stay bounded; the run's own energy comes from its window
+            with energy_sampler.attribute("learning", agent=f"skill:{request.skill_domain}") as window:
+                for phase in range(10):
+                    learning_result["progress"] = (phase + 1) * 10.0
+                    learning_result["skills_acquired"].append(f"sub_skill_{phase+1}")
+                    if job is not None:
+                        job.progress = learning_result["progress"]
+                    await asyncio.sleep(0.1)  # Simulate learning time
+            learning_result["energy_consumption"] = window.joules
             
             learning_result["status"] = "completed"
             learning_result["skills_acquired"].append(f"master_{request.skill_domain}")
@@ -1093,6 +2155,13 @@ class IntegralAIManager:
                 "execution_time": execution_time,
                 "completed_at": end_time.isoformat()
             }
+            self.successful_learning += 1
+            self.skills_acquired_stats.add(len(learning_result["skills_acquired"]))
+            self.history.append(
+                "learning", self.autonomous_skills[learning_id],
+                {"skills_acquired": len(learning_result["skills_acquired"]), "execution_time": execution_time},
+                {"skill_domain": request.skill_domain}
+            )
             
             # Record execution history
             self.execution_history.append({
@@ -1122,9 +2191,12 @@ class IntegralAIManager:
                 "error": str(e),
                 "timestamp": end_time.isoformat()
             }
+            self.skills_acquired_stats.add(0)
+            self.history.append("learning", self.autonomous_skills[learning_id], {"skills_acquired": 0},
+                                {"skill_domain": request.skill_domain})
             raise HTTPException(status_code=500, detail=str(e))
     
-    async def safe_mastery_assessment(self, request: SafetyMasteryRequest) -> Dict[str, Any]:
+    async def safe_mastery_assessment(self, request: SafetyMasteryRequest, job: Optional[Job] = None) -> Dict[str, Any]:
         """Assess and ensure safe mastery of tasks"""
         mastery_id = str(uuid.uuid4())
         start_time = datetime.now()
@@ -1143,25 +2215,18 @@ class IntegralAIManager:
                 "risk_assessments": []
             }
             
-            # Simulate safety checks
-            compliance_checks = [
-                "catastrophic_failure_prevention",
-                "skill_acquisition_safety", 
-                "energy_threshold_monitoring",
-                "learning_boundaries_adherence"
-            ]
-            
-            for check in compliance_checks:
-                safety_assessment["compliance_checks"].append({
-                    "check": check,
-                    "passed": True,
-                    "score": 0.95 + (hash(check) % 10) / 100.0
-                })
-                await asyncio.sleep(0.05)  # Simulate check time
+            # Run every registered check concurrently against current telemetry
+            compliance_checks = await self.compliance.run(CheckContext(
+                task_type=request.task_type,
+                safety_level=request.safety_level,
+                failure_threshold=request.failure_threshold,
+                collect_telemetry=self._collect_telemetry
+            ))
+            safety_assessment["compliance_checks"] = compliance_checks
             
             # Calculate safety metrics
-            passed_checks = sum(1 for c in safety_assessment["compliance_checks"] if c["passed"])
-            safety_assessment["safety_score"] = passed_checks / len(compliance_checks) * 100.0
+            passed_checks = sum(1 for c in compliance_checks if c["passed"])
+            safety_assessment["safety_score"] = passed_checks / max(1, len(compliance_checks)) * 100.0
             safety_assessment["failure_rate"] = max(0.001, (1.0 - safety_assessment["safety_score"] / 100.0) * 0.1)
             
             safety_assessment["status"] = "completed"
@@ -1175,6 +2240,14 @@ class IntegralAIManager:
                 "execution_time": execution_time,
                 "completed_at": end_time.isoformat()
             }
+            self.safety_score_stats.add(safety_assessment["safety_score"])
+            self.failure_rate_stats.add(safety_assessment["failure_rate"])
+            self.history.append(
+                "safety", self.safety_metrics[mastery_id],
+                {"safety_score": safety_assessment["safety_score"], "failure_rate": safety_assessment["failure_rate"],
+                 "execution_time": execution_time},
+                {"task_type": request.task_type}
+            )
             
             # Record execution history
             self.execution_history.append({
@@ -1201,7 +2274,43 @@ class IntegralAIManager:
             logger.error(f"Safety mastery assessment failed: {e}")
             raise HTTPException(status_code=500, detail=str(e))
     
-    async def energy_efficiency_monitoring(self, request: EnergyEfficiencyRequest) -> Dict[str, Any]:
+    def _collect_telemetry(self) -> Dict[str, Any]:
+        """Snapshot of model, plugin, workflow, learning and energy outcomes for compliance checks"""
+        model_stats = model_manager.performance_metrics.values()
+        plugin_statuses = [record["status"] for record in plugin_manager.execution_history]
+        workflow_statuses = [record["status"] for workflow in workflow_manager.workflows.values()
+                             for record in workflow.execution_history]
+        
+        phase_energy: Dict[str, List[float]] = {}
+        for row in energy_sampler.summary()["breakdown"]:
+            totals = phase_energy.setdefault(row["phase"], [0.0, 0.0])
+            totals[0] += row["joules"]
+            totals[1] += row["seconds"]
+        
+        return {
+            "models": {
+                # total_requests only counts successes
+                "requests": sum(m["total_requests"] + m["error_count"] for m in model_stats),
+                "errors": sum(m["error_count"] for m in model_stats)
+            },
+            "plugins": {
+                "executions": len(plugin_statuses),
+                "failed": plugin_statuses.count("failed"),
+                "timed_out": plugin_statuses.count("timed_out")
+            },
+            "workflows": {
+                "executions": len(workflow_statuses),
+                "budget_exceeded": workflow_statuses.count("budget_exceeded"),
+                "timed_out": workflow_statuses.count("timed_out")
+            },
+            "learning": {
+                "sessions": len(self.autonomous_skills),
+                "failed": len(self.autonomous_skills) - self.successful_learning
+            },
+            "energy": {phase: joules / seconds for phase, (joules, seconds) in phase_energy.items() if seconds > 0}
+        }
+    
+    async def energy_efficiency_monitoring(self, request: EnergyEfficiencyRequest, job: Optional[Job] = None) -> Dict[str, Any]:
         """Monitor and optimize energy efficiency"""
         monitoring_id = str(uuid.uuid4())
         start_time = datetime.now()
@@ -1217,20 +2326,34 @@ class IntegralAIManager:
                 "current_efficiency": 0.0,
                 "energy_consumption": {},
                 "optimization_suggestions": [],
-                "efficiency_score": 0.0
+                "efficiency_score": 0.0,
+                "energy_source": energy_sampler.source.name,
+                "measured": energy_sampler.source.measured
             }
             
-            # Simulate energy measurements for each phase
+            # Measure each phase: its attributed history when the node has run it, else a live window
             for phase in request.consumption_phases:
                 base_consumption = {"learning": 15.0, "inference": 5.0, "idle": 1.0}.get(phase, 10.0)
-                current_consumption = base_consumption * (0.8 + (hash(monitoring_id + phase) % 40) / 100.0)
+                with energy_sampler.attribute(phase, agent=ENERGY_MONITOR_AGENT) as window:
+                    await asyncio.sleep(0.05)
+                attributed = energy_sampler.summary(phase=phase)["breakdown"]
+                history = [row for row in attributed if row["agent"] != ENERGY_MONITOR_AGENT and row["seconds"] > 0]
+                if history:
+                    joules = sum(row["joules"] for row in history)
+                    current_consumption = joules / sum(row["seconds"] for row in history)
+                    measurement = "attributed"
+                else:
+                    current_consumption = window.watts
+                    measurement = "window"
                 
                 energy_profile["energy_consumption"][phase] = {
                     "current_watts": current_consumption,
                     "baseline_watts": base_consumption,
-                    "efficiency_ratio": base_consumption / current_consumption
+                    "efficiency_ratio": base_consumption / current_consumption if current_consumption > 0 else 1.0,
+                    "measurement": measurement
                 }
-                await asyncio.sleep(0.05)  # Simulate measurement time
+                if job is not None:
+                    job.progress = len(energy_profile["energy_consumption"]) / len(request.consumption_phases) * 100.0
             
             # Calculate overall efficiency
             total_efficiency = sum(e["efficiency_ratio"] for e in energy_profile["energy_consumption"].values()) / len(energy_profile["energy_consumption"])
@@ -1257,6 +2380,12 @@ class IntegralAIManager:
                 "execution_time": execution_time,
                 "completed_at": end_time.isoformat()
             }
+            self.efficiency_stats.add(energy_profile["efficiency_score"])
+            self.recent_energy_profiles.append(monitoring_id)
+            self.history.append(
+                "energy", self.energy_profiles[monitoring_id],
+                {"efficiency_score": energy_profile["efficiency_score"], "execution_time": execution_time}
+            )
             
             # Record execution history
             self.execution_history.append({
@@ -1289,66 +2418,69 @@ class IntegralAIManager:
         return [capability.dict() for capability in self.capabilities]
     
     def get_learning_history(self, skill_domain: Optional[str] = None) -> List[Dict[str, Any]]:
-        """Get autonomous learning history"""
-        history = list(self.autonomous_skills.values())
-        if skill_domain:
-            history = [h for h in history if h.get("skill_domain") == skill_domain]
-        return sorted(history, key=lambda x: x.get("timestamp", ""), reverse=True)
+        """Get autonomous learning history, newest first"""
+        return self.query_history("learning", "skill_domain", skill_domain, limit=None)["history"]
     
     def get_safety_history(self, task_type: Optional[str] = None) -> List[Dict[str, Any]]:
-        """Get safety mastery history"""
-        history = list(self.safety_metrics.values())
-        if task_type:
-            history = [h for h in history if h.get("task_type") == task_type]
-        return sorted(history, key=lambda x: x.get("timestamp", ""), reverse=True)
+        """Get safety mastery history, newest first"""
+        return self.query_history("safety", "task_type", task_type, limit=None)["history"]
     
     def get_energy_history(self) -> List[Dict[str, Any]]:
-        """Get energy efficiency history"""
-        return sorted(self.energy_profiles.values(), key=lambda x: x.get("timestamp", ""), reverse=True)
+        """Get energy efficiency history, newest first"""
+        return self.query_history("energy", limit=None)["history"]
     
-    def get_integral_ai_metrics(self) -> Dict[str, Any]:
-        """Get comprehensive Integral AI metrics"""
-        # Calculate aggregate metrics
-        if self.autonomous_skills:
-            avg_skills_acquired = sum(len(h.get("skills_acquired", [])) for h in self.autonomous_skills.values()) / len(self.autonomous_skills)
-            successful_learning = len([h for h in self.autonomous_skills.values() if h.get("status") == "completed"])
+    def query_history(self, series: str, tag: Optional[str] = None, value: Optional[str] = None,
+                      window_seconds: Optional[float] = None, limit: Optional[int] = 100,
+                      resolution: str = "raw") -> Dict[str, Any]:
+        """Windowed history of one series: raw records newest first, or minute/hour rollups"""
+        if not value:
+            tag = value = None
+        start = time.time() - window_seconds if window_seconds else None
+        if resolution == "raw":
+            history = self.history.range(series, start, limit=limit, tag=tag, value=value)
         else:
-            avg_skills_acquired = 0.0
-            successful_learning = 0
-        
-        if self.safety_metrics:
-            avg_safety_score = sum(h.get("safety_score", 0.0) for h in self.safety_metrics.values()) / len(self.safety_metrics)
-            avg_failure_rate = sum(h.get("failure_rate", 0.0) for h in self.safety_metrics.values()) / len(self.safety_metrics)
-        else:
-            avg_safety_score = 0.0
-            avg_failure_rate = 0.0
-        
-        if self.energy_profiles:
-            avg_efficiency = sum(h.get("efficiency_score", 0.0) for h in self.energy_profiles.values()) / len(self.energy_profiles)
-        else:
-            avg_efficiency = 0.0
+            try:
+                history = self.history.rollup(series, resolution, start, tag=tag, value=value)
+            except ValueError as e:
+                raise HTTPException(status_code=400, detail=str(e))
+        return {
+            "history": history,
+            "total": self.history.count(series, start, tag=tag, value=value),
+            "resolution": resolution
+        }
+    
+    def get_integral_ai_metrics(self) -> Dict[str, Any]:
+        """Get comprehensive Integral AI metrics from the running aggregates"""
+        avg_safety_score = self.safety_score_stats.mean
+        avg_failure_rate = self.failure_rate_stats.mean
+        avg_efficiency = self.efficiency_stats.mean
         
         return {
             "autonomous_skill_learning": {
                 "total_sessions": len(self.autonomous_skills),
-                "successful_sessions": successful_learning,
-                "avg_skills_acquired": avg_skills_acquired,
-                "success_rate": successful_learning / max(1, len(self.autonomous_skills))
+                "successful_sessions": self.successful_learning,
+                "avg_skills_acquired": self.skills_acquired_stats.mean,
+                "success_rate": self.successful_learning / max(1, len(self.autonomous_skills)),
+                "skills_acquired": self.skills_acquired_stats.snapshot()
             },
             "safe_mastery": {
                 "total_assessments": len(self.safety_metrics),
                 "avg_safety_score": avg_safety_score,
                 "avg_failure_rate": avg_failure_rate,
-                "compliance_rate": (100.0 - avg_failure_rate * 100.0) / 100.0
+                "compliance_rate": (100.0 - avg_failure_rate * 100.0) / 100.0,
+                "safety_score": self.safety_score_stats.snapshot(),
+                "failure_rate": self.failure_rate_stats.snapshot()
             },
             "energy_efficiency": {
                 "total_monitoring_sessions": len(self.energy_profiles),
                 "avg_efficiency_score": avg_efficiency,
-                "energy_profiles": list(self.energy_profiles.keys())
+                "energy_profiles": list(self.recent_energy_profiles),  # most recent window only
+                "efficiency_score": self.efficiency_stats.snapshot()
             },
             "overall": {
                 "capabilities_registered": len(self.capabilities),
                 "total_executions": len(self.execution_history),
+                "jobs": self.jobs.stats(),
                 "integral_ai_status": "active" if avg_safety_score > 80 and avg_efficiency > 70 else "needs_optimization"
             }
         }
@@ -1358,6 +2490,8 @@ model_manager = ModelManager()
 agent_manager = AgentManager(model_manager)
 workflow_manager = WorkflowManager(model_manager, agent_manager)
 plugin_manager = PluginManager(model_manager, agent_manager, workflow_manager)
+workflow_manager.plugin_manager = plugin_manager
+agent_manager.plugin_manager = plugin_manager
 integral_ai_manager = IntegralAIManager()
 
 # Register default Integral AI capabilities
@@ -1511,6 +2645,9 @@ DEFAULT_MODELS = [
 for model in DEFAULT_MODELS:
     model_manager.add_model_config(model)
 
+# Probes models at startup; /ready stays 503 until the critical ones answer
+model_warmer = ModelWarmer(model_manager.probe)
+
 # Application lifecycle management
 @asynccontextmanager
 async def lifespan(app: FastAPI):
@@ -1519,14 +2656,17 @@ async def lifespan(app: FastAPI):
     
     # Initialize any required services
     try:
-        # Test model connectivity
-        for model in DEFAULT_MODELS:
-            if model.type == "local":
-                logger.info(f"Checking local model: {model.name}")
-                # Could test local model availability here
-            elif model.type == "api":
-                logger.info(f"Checking API model: {model.name}")
-                # Could test API connectivity here
+        energy_sampler.start()
+        
+        # Fork plugin workers before traffic arrives
+        await plugin_manager.runtime.warm_up()
+        
+        # Pick up workflow executions interrupted by a restart
+        await workflow_manager.resume_incomplete_executions()
+        
+        # Probe every configured model concurrently in the background so a
+        # cold vLLM server or connection pool is warmed before traffic arrives
+        model_warmer.start(list(model_manager.model_configs.values()))
         
         logger.info("API startup complete")
         
@@ -1537,6 +2677,11 @@ async def lifespan(app: FastAPI):
     
     # Shutdown
     logger.info("Shutting down Google ADK Agent Platform API")
+    await model_warmer.stop()
+    await integral_ai_manager.jobs.shutdown()
+    await energy_sampler.stop()
+    plugin_manager.runtime.shutdown()
+    plugin_manager.runtime.blobs.close()
 
 # FastAPI application
 app = FastAPI(
@@ -1597,14 +2742,20 @@ async def health_check():
         }
     }
 
+@app.get("/ready")
+async def readiness_check():
+    """Readiness for traffic: 503 until critical models have answered a warm-up probe"""
+    report = model_warmer.report()
+    return JSONResponse(status_code=200 if report["ready"] else 503, content=to_jsonable(report))
+
 # Model Management Routes
 @app.get("/models")
-async def list_models():
+async def list_models(request: Request):
     """List all available models"""
-    return {
+    return cached_json_response(request, model_manager.response_cache, lambda: {
         "models": model_manager.list_models(),
         "total": len(model_manager.model_configs)
-    }
+    })
 
 @app.post("/models/test")
 async def test_model(request: ModelTestRequest):
@@ -1619,19 +2770,19 @@ async def test_model(request: ModelTestRequest):
 
 # Agent Management Routes
 @app.get("/agents")
-async def list_agents():
+async def list_agents(request: Request):
     """List all agents"""
-    return {
+    return cached_json_response(request, agent_manager.response_cache, lambda: {
         "agents": agent_manager.list_agents(),
         "total": len(agent_manager.agents)
-    }
+    })
 
 @app.post("/agents")
 async def create_agent(request: AgentCreateRequest):
     """Create a new agent"""
     agent = agent_manager.create_agent(request)
     return {
-        "agent": asdict(agent),
+        "agent": to_jsonable(agent),
         "message": f"Agent '{agent.name}' created successfully"
     }
 
@@ -1642,7 +2793,7 @@ async def get_agent(agent_id: str):
     if not agent:
         raise HTTPException(status_code=404, detail="Agent not found")
     
-    return asdict(agent)
+    return to_jsonable(agent)
 
 # Chat Routes
 @app.post("/chat")
@@ -1655,6 +2806,21 @@ async def chat_with_agent(request: ChatRequest):
     )
     return result
 
+@app.post("/chat/stream")
+async def stream_chat_with_agent(request: ChatRequest):
+    """Chat with an agent, streaming model responses, tool calls and tool results as NDJSON"""
+    steps = agent_manager.run_agent(request.agent_id, request.message)
+    
+    async def stream_steps():
+        try:
+            async for step in steps:
+                yield json.dumps(step, default=str) + "\n"
+        except Exception as e:
+            logger.error(f"Agent chat failed for {request.agent_id}: {e}")
+            yield json.dumps({"type": "error", "error": getattr(e, "detail", None) or str(e)}) + "\n"
+    
+    return StreamingResponse(stream_steps(), media_type="application/x-ndjson")
+
 # WebSocket for real-time chat
 @app.websocket("/ws/chat/{agent_id}")
 async def websocket_chat(websocket: WebSocket, agent_id: str):
@@ -1689,21 +2855,20 @@ async def websocket_chat(websocket: WebSocket, agent_id: str):
                 "message": f"{agent.name} is thinking..."
             })
             
-            # Process with agent
+            # Process with agent, forwarding tool steps as they happen
             try:
-                result = await agent_manager.chat_with_agent(
-                    agent_id=agent_id,
-                    message=message,
-                    stream=False
-                )
-                
-                # Send response
-                await websocket.send_json({
-                    "type": "response",
-                    "message": result["response"],
-                    "model": result["model_used"],
-                    "timestamp": datetime.now().isoformat()
-                })
+                async for step in agent_manager.run_agent(agent_id, message):
+                    if step["type"] in ("tool_call", "tool_result"):
+                        await websocket.send_json(to_jsonable(step))
+                    elif step["type"] == "final":
+                        # Send response
+                        await websocket.send_json({
+                            "type": "response",
+                            "message": step["response"],
+                            "model": step["model_used"],
+                            "tool_calls": step["tool_calls"],
+                            "timestamp": datetime.now().isoformat()
+                        })
                 
             except Exception as e:
                 await websocket.send_json({
@@ -1719,18 +2884,18 @@ async def websocket_chat(websocket: WebSocket, agent_id: str):
 
 # Workflow Management APIs
 @app.get("/workflows")
-async def list_workflows():
+async def list_workflows(request: Request):
     """List all workflows"""
-    return {
+    return cached_json_response(request, workflow_manager.response_cache, lambda: {
         "workflows": workflow_manager.list_workflows(),
         "total": len(workflow_manager.workflows)
-    }
+    })
 
 @app.post("/workflows")
 async def create_workflow(request: WorkflowCreateRequest):
     """Create a new workflow"""
     workflow = workflow_manager.create_workflow(request)
-    return asdict(workflow)
+    return to_jsonable(workflow)
 
 @app.get("/workflows/{workflow_id}")
 async def get_workflow(workflow_id: str):
@@ -1738,13 +2903,13 @@ async def get_workflow(workflow_id: str):
     workflow = workflow_manager.get_workflow(workflow_id)
     if not workflow:
         raise HTTPException(status_code=404, detail="Workflow not found")
-    return asdict(workflow)
+    return to_jsonable(workflow)
 
 @app.put("/workflows/{workflow_id}")
 async def update_workflow(workflow_id: str, request: WorkflowCreateRequest):
     """Update an existing workflow"""
     workflow = workflow_manager.update_workflow(workflow_id, request)
-    return asdict(workflow)
+    return to_jsonable(workflow)
 
 @app.delete("/workflows/{workflow_id}")
 async def delete_workflow(workflow_id: str):
@@ -1758,7 +2923,13 @@ async def delete_workflow(workflow_id: str):
 async def execute_workflow(workflow_id: str, request: WorkflowExecutionRequest):
     """Execute a workflow"""
     try:
-        result = await workflow_manager.execute_workflow(workflow_id, request.input_data)
+        budget = ExecutionBudget(
+            execution_timeout=request.timeout_seconds or WORKFLOW_EXECUTION_TIMEOUT,
+            node_timeout=request.node_timeout_seconds or WORKFLOW_NODE_TIMEOUT,
+            max_tokens=request.max_tokens,
+            max_cost=request.max_cost
+        )
+        result = await workflow_manager.execute_workflow(workflow_id, request.input_data, budget)
         return result
     except HTTPException:
         raise
@@ -1766,6 +2937,35 @@ async def execute_workflow(workflow_id: str, request: WorkflowExecutionRequest):
         logger.error(f"Workflow execution error: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/workflows/{workflow_id}/execute-batch")
+async def execute_workflow_batch(workflow_id: str, request: WorkflowBatchExecutionRequest):
+    """Execute a workflow over many input records, streaming NDJSON results as they complete"""
+    workflow = workflow_manager.get_workflow(workflow_id)
+    if not workflow:
+        raise HTTPException(status_code=404, detail="Workflow not found")
+    if workflow.status != "active":
+        raise HTTPException(status_code=400, detail="Workflow is not active")
+    
+    budget = ExecutionBudget(
+        execution_timeout=request.timeout_seconds or WORKFLOW_EXECUTION_TIMEOUT,
+        node_timeout=request.node_timeout_seconds or WORKFLOW_NODE_TIMEOUT,
+        max_tokens=request.max_tokens,
+        max_cost=request.max_cost
+    )
+    
+    async def stream_results():
+        async for record in workflow_manager.execute_workflow_batch(
+            workflow_id,
+            request.inputs,
+            concurrency=request.concurrency,
+            chunk_size=request.chunk_size,
+            ordered=request.ordered,
+            budget=budget
+        ):
+            yield json.dumps(record, default=str) + "\n"
+    
+    return StreamingResponse(stream_results(), media_type="application/x-ndjson")
+
 @app.get("/workflows/{workflow_id}/history")
 async def get_workflow_history(workflow_id: str):
     """Get execution history for a workflow"""
@@ -1786,6 +2986,13 @@ async def get_execution_result(execution_id: str):
         raise HTTPException(status_code=404, detail="Execution not found")
     return result
 
+@app.delete("/executions/{execution_id}")
+async def cancel_execution(execution_id: str):
+    """Cancel a running workflow execution"""
+    if not workflow_manager.cancel_execution(execution_id):
+        raise HTTPException(status_code=404, detail="Running execution not found")
+    return {"message": "Execution cancellation requested", "execution_id": execution_id}
+
 @app.get("/workflows/{workflow_id}/status")
 async def get_workflow_status(workflow_id: str):
     """Get workflow status and summary"""
@@ -1800,21 +3007,23 @@ async def get_workflow_status(workflow_id: str):
         "status": workflow.status,
         "node_count": len(workflow.nodes),
         "connection_count": len(workflow.connections),
-        "execution_count": len(workflow.execution_history),
+        "execution_count": workflow.execution_count,
         "recent_executions": recent_executions,
         "last_execution": recent_executions[-1] if recent_executions else None
     }
 
 # Plugin Management APIs
 @app.get("/plugins")
-async def list_plugins(category: Optional[str] = None, status: Optional[str] = None):
-    """List all plugins with optional filtering"""
+async def list_plugins(request: Request, q: str = "", category: Optional[str] = None, status: Optional[str] = None,
+                       author: Optional[str] = None, offset: int = Query(0, ge=0),
+                       limit: int = Query(50, ge=1, le=500)):
+    """Search plugins with optional facet filters and pagination"""
     try:
-        plugins = plugin_manager.list_plugins(category, status)
-        return {
-            "plugins": plugins,
-            "total": len(plugins)
-        }
+        def build():
+            result = plugin_manager.search_plugins(q, category, status, author, offset, limit)
+            return {**result, "offset": offset, "limit": limit}
+        return cached_json_response(request, plugin_manager.response_cache, build,
+                                    query_key=f"{q}:{category or ''}:{status or ''}:{author or ''}:{offset}:{limit}")
     except Exception as e:
         logger.error(f"Error listing plugins: {e}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -1824,18 +3033,40 @@ async def create_plugin(request: PluginCreateRequest):
     """Create a new plugin"""
     try:
         # Validate plugin code security
-        security_check = plugin_manager.validate_plugin_security(request.code)
+        security_check = plugin_manager.validate_plugin_security(request.code, request.dependencies)
         if not security_check["is_safe"]:
             raise HTTPException(status_code=400, detail=f"Plugin security validation failed: {security_check['issues']}")
         
         plugin = plugin_manager.create_plugin(request)
-        return asdict(plugin)
+        return to_jsonable(plugin)
     except HTTPException:
         raise
     except Exception as e:
         logger.error(f"Error creating plugin: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+# Registered before /plugins/{plugin_id} so "marketplace" is not taken as an id
+@app.get("/plugins/marketplace")
+async def get_plugin_marketplace(q: str = "", category: Optional[str] = None, author: Optional[str] = None,
+                                 offset: int = Query(0, ge=0), limit: int = Query(50, ge=1, le=500)):
+    """Search available plugins from marketplace"""
+    try:
+        result = plugin_manager.get_plugin_marketplace(q, category, author, offset, limit)
+        return {**result, "offset": offset, "limit": limit}
+    except Exception as e:
+        logger.error(f"Error getting marketplace: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.post("/plugins/marketplace")
+async def add_to_marketplace(plugin_data: Dict[str, Any]):
+    """Add plugin to marketplace"""
+    try:
+        plugin_manager.add_to_marketplace(plugin_data)
+        return {"message": "Plugin added to marketplace successfully"}
+    except Exception as e:
+        logger.error(f"Error adding to marketplace: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
 @app.get("/plugins/{plugin_id}")
 async def get_plugin(plugin_id: str):
     """Get plugin by ID"""
@@ -1843,7 +3074,7 @@ async def get_plugin(plugin_id: str):
         plugin = plugin_manager.get_plugin(plugin_id)
         if not plugin:
             raise HTTPException(status_code=404, detail="Plugin not found")
-        return asdict(plugin)
+        return to_jsonable(plugin)
     except HTTPException:
         raise
     except Exception as e:
@@ -1854,8 +3085,14 @@ async def get_plugin(plugin_id: str):
 async def update_plugin(plugin_id: str, updates: Dict[str, Any]):
     """Update plugin configuration"""
     try:
+        plugin = plugin_manager.get_plugin(plugin_id)
+        if plugin and plugin.status == "enabled" and {"code", "dependencies", "configuration"} & updates.keys():
+            # Never install dependencies for code that would be rejected anyway
+            dependencies = updates.get("dependencies", plugin.dependencies)
+            plugin_manager._check_security(updates.get("code", plugin.code), dependencies)
+            await plugin_manager.prepare_dependencies(dependencies)
         plugin = plugin_manager.update_plugin(plugin_id, updates)
-        return asdict(plugin)
+        return to_jsonable(plugin)
     except HTTPException:
         raise
     except Exception as e:
@@ -1880,8 +3117,11 @@ async def delete_plugin(plugin_id: str):
 async def enable_plugin(plugin_id: str):
     """Enable a plugin"""
     try:
+        plugin = plugin_manager.get_plugin(plugin_id)
+        if plugin and plugin.code:
+            await plugin_manager.prepare_dependencies(plugin.dependencies)
         plugin = plugin_manager.enable_plugin(plugin_id)
-        return asdict(plugin)
+        return to_jsonable(plugin)
     except HTTPException:
         raise
     except Exception as e:
@@ -1893,7 +3133,7 @@ async def disable_plugin(plugin_id: str):
     """Disable a plugin"""
     try:
         plugin = plugin_manager.disable_plugin(plugin_id)
-        return asdict(plugin)
+        return to_jsonable(plugin)
     except HTTPException:
         raise
     except Exception as e:
@@ -1917,6 +3157,29 @@ async def execute_plugin(plugin_id: str, request: PluginExecutionRequest):
         logger.error(f"Error executing plugin {plugin_id}: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/plugins/{plugin_id}/execute-batch")
+async def execute_plugin_batch(plugin_id: str, request: PluginBatchExecutionRequest):
+    """Execute a plugin method over many items, streaming NDJSON results as they complete"""
+    results = await plugin_manager.execute_plugin_batch(
+        plugin_id,
+        request.method,
+        request.items,
+        request.context,
+        chunk_size=request.chunk_size,
+        ordered=request.ordered
+    )
+    
+    async def stream_results():
+        async for record in results:
+            yield json.dumps(record, default=str) + "\n"
+    
+    return StreamingResponse(stream_results(), media_type="application/x-ndjson")
+
+@app.get("/plugins/{plugin_id}/methods")
+async def get_plugin_methods(plugin_id: str):
+    """List the methods a plugin exposes and their parameter schemas"""
+    return {"methods": plugin_manager.get_plugin_methods(plugin_id)}
+
 @app.get("/plugins/{plugin_id}/history")
 async def get_plugin_history(plugin_id: str):
     """Get execution history for a plugin"""
@@ -1929,31 +3192,11 @@ async def get_plugin_history(plugin_id: str):
         logger.error(f"Error getting plugin history {plugin_id}: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
-@app.get("/plugins/marketplace")
-async def get_plugin_marketplace():
-    """Get available plugins from marketplace"""
-    try:
-        marketplace = plugin_manager.get_plugin_marketplace()
-        return {"plugins": marketplace}
-    except Exception as e:
-        logger.error(f"Error getting marketplace: {e}")
-        raise HTTPException(status_code=500, detail=str(e))
-
-@app.post("/plugins/marketplace")
-async def add_to_marketplace(plugin_data: Dict[str, Any]):
-    """Add plugin to marketplace"""
-    try:
-        plugin_manager.add_to_marketplace(plugin_data)
-        return {"message": "Plugin added to marketplace successfully"}
-    except Exception as e:
-        logger.error(f"Error adding to marketplace: {e}")
-        raise HTTPException(status_code=500, detail=str(e))
-
 @app.post("/plugins/validate")
-async def validate_plugin_security(plugin_code: str):
+async def validate_plugin_security(plugin_code: str, dependencies: List[str] = Query([])):
     """Validate plugin code for security issues"""
     try:
-        validation_result = plugin_manager.validate_plugin_security(plugin_code)
+        validation_result = plugin_manager.validate_plugin_security(plugin_code, dependencies)
         return validation_result
     except Exception as e:
         logger.error(f"Error validating plugin security: {e}")
@@ -1974,13 +3217,68 @@ async def install_plugin(request: PluginInstallRequest):
             raise HTTPException(status_code=400, detail="Either plugin_url or plugin_file must be provided")
         
         plugin = plugin_manager.install_plugin(plugin_data)
-        return asdict(plugin)
+        return to_jsonable(plugin)
     except HTTPException:
         raise
     except Exception as e:
         logger.error(f"Error installing plugin: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+# Blob APIs: large payloads are uploaded once and passed to workflows and plugins by handle
+@app.post("/blobs")
+async def upload_blob(request: Request):
+    """Store a binary payload in shared memory and return its handle"""
+    data = await request.body()
+    content_type = request.headers.get("content-type", "application/octet-stream")
+    try:
+        return plugin_manager.runtime.blobs.put(data, content_type)
+    except BlobStoreFullError as e:
+        raise HTTPException(status_code=507, detail=str(e))
+
+@app.get("/blobs/{blob_id}")
+async def download_blob(blob_id: str):
+    """Get a blob's bytes"""
+    blobs = plugin_manager.runtime.blobs
+    try:
+        handle = blobs.handle(blob_id)
+        with blobs.view(handle) as view:
+            data = bytes(view)
+    except BlobNotFoundError:
+        raise HTTPException(status_code=404, detail="Blob not found")
+    return Response(content=data, media_type=handle["content_type"])
+
+@app.delete("/blobs/{blob_id}")
+async def delete_blob(blob_id: str):
+    """Release an uploaded blob; it is freed once no execution still holds it"""
+    if not plugin_manager.runtime.blobs.drop(blob_id):
+        raise HTTPException(status_code=404, detail="Blob not found")
+    return {"message": "Blob released", "blob_id": blob_id}
+
+# Analytics APIs: aggregates over finished plugin and workflow executions
+@app.get("/analytics")
+async def get_analytics_overview():
+    """Rows held per execution source"""
+    return {"sources": execution_analytics.stats()}
+
+@app.get("/analytics/{source}")
+async def query_analytics(source: str, group_by: str = "entity", percentiles: str = "50,95,99",
+                          window_seconds: Optional[float] = None, entity: Optional[str] = None,
+                          limit: int = Query(1000, ge=1, le=10000)):
+    """Count, failure rate and latency percentiles for plugins or workflows, grouped by a
+    comma-separated list of entity, method, status, minute, hour or day"""
+    if source not in execution_analytics.logs:
+        raise HTTPException(status_code=404, detail=f"Unknown analytics source: {source}")
+    try:
+        quantiles = [float(q) for q in percentiles.split(",") if q.strip()]
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Percentiles must be comma-separated numbers")
+    start = time.time() - window_seconds if window_seconds is not None else None
+    try:
+        return execution_analytics.query(source, [key.strip() for key in group_by.split(",") if key.strip()],
+                                         quantiles, start=start, entity=entity, limit=limit)
+    except AnalyticsQueryError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
 # Integral AI Management APIs
 @app.get("/integral-ai/capabilities")
 async def get_integral_ai_capabilities():
@@ -1992,71 +3290,68 @@ async def get_integral_ai_capabilities():
         logger.error(f"Error getting Integral AI capabilities: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
-@app.post("/integral-ai/autonomous-learning")
+@app.post("/integral-ai/autonomous-learning", status_code=202)
 async def start_autonomous_skill_learning(request: AutonomousLearningRequest):
-    """Start autonomous skill learning session"""
-    try:
-        result = await integral_ai_manager.autonomous_skill_learning(request)
-        return result
-    except HTTPException:
-        raise
-    except Exception as e:
-        logger.error(f"Error starting autonomous skill learning: {e}")
-        raise HTTPException(status_code=500, detail=str(e))
+    """Start autonomous skill learning session in the background"""
+    return integral_ai_manager.submit_job("autonomous_skill_learning", request)
 
 @app.get("/integral-ai/autonomous-learning/history")
-async def get_autonomous_learning_history(skill_domain: Optional[str] = None):
-    """Get autonomous learning history"""
-    try:
-        history = integral_ai_manager.get_learning_history(skill_domain)
-        return {"history": history, "total": len(history)}
-    except Exception as e:
-        logger.error(f"Error getting learning history: {e}")
-        raise HTTPException(status_code=500, detail=str(e))
+async def get_autonomous_learning_history(skill_domain: Optional[str] = None, window_seconds: Optional[float] = None,
+                                          limit: int = Query(100, ge=1, le=1000), resolution: str = "raw"):
+    """Get autonomous learning history: raw records newest first, or minute/hour rollups"""
+    return integral_ai_manager.query_history("learning", "skill_domain", skill_domain, window_seconds=window_seconds,
+                                             limit=limit, resolution=resolution)
 
-@app.post("/integral-ai/safe-mastery")
+@app.post("/integral-ai/safe-mastery", status_code=202)
 async def assess_safe_mastery(request: SafetyMasteryRequest):
-    """Assess safe mastery of tasks"""
-    try:
-        result = await integral_ai_manager.safe_mastery_assessment(request)
-        return result
-    except HTTPException:
-        raise
-    except Exception as e:
-        logger.error(f"Error assessing safe mastery: {e}")
-        raise HTTPException(status_code=500, detail=str(e))
+    """Assess safe mastery of tasks in the background"""
+    return integral_ai_manager.submit_job("safe_mastery_assessment", request)
 
 @app.get("/integral-ai/safe-mastery/history")
-async def get_safe_mastery_history(task_type: Optional[str] = None):
-    """Get safety mastery history"""
-    try:
-        history = integral_ai_manager.get_safety_history(task_type)
-        return {"history": history, "total": len(history)}
-    except Exception as e:
-        logger.error(f"Error getting safety history: {e}")
-        raise HTTPException(status_code=500, detail=str(e))
+async def get_safe_mastery_history(task_type: Optional[str] = None, window_seconds: Optional[float] = None,
+                                   limit: int = Query(100, ge=1, le=1000), resolution: str = "raw"):
+    """Get safety mastery history: raw records newest first, or minute/hour rollups"""
+    return integral_ai_manager.query_history("safety", "task_type", task_type, window_seconds=window_seconds,
+                                             limit=limit, resolution=resolution)
 
-@app.post("/integral-ai/energy-efficiency")
+@app.post("/integral-ai/energy-efficiency", status_code=202)
 async def monitor_energy_efficiency(request: EnergyEfficiencyRequest):
-    """Monitor and optimize energy efficiency"""
-    try:
-        result = await integral_ai_manager.energy_efficiency_monitoring(request)
-        return result
-    except HTTPException:
-        raise
-    except Exception as e:
-        logger.error(f"Error monitoring energy efficiency: {e}")
-        raise HTTPException(status_code=500, detail=str(e))
+    """Monitor and optimize energy efficiency in the background"""
+    return integral_ai_manager.submit_job("energy_efficiency_monitoring", request)
 
 @app.get("/integral-ai/energy-efficiency/history")
-async def get_energy_efficiency_history():
-    """Get energy efficiency monitoring history"""
-    try:
-        history = integral_ai_manager.get_energy_history()
-        return {"history": history, "total": len(history)}
-    except Exception as e:
-        logger.error(f"Error getting energy history: {e}")
-        raise HTTPException(status_code=500, detail=str(e))
+async def get_energy_efficiency_history(window_seconds: Optional[float] = None,
+                                        limit: int = Query(100, ge=1, le=1000), resolution: str = "raw"):
+    """Get energy efficiency monitoring history: raw records newest first, or minute/hour rollups"""
+    return integral_ai_manager.query_history("energy", window_seconds=window_seconds,
+                                             limit=limit, resolution=resolution)
+
+@app.get("/integral-ai/energy/summary")
+async def get_energy_summary(phase: Optional[str] = None, agent: Optional[str] = None, model: Optional[str] = None):
+    """Energy and CPU time attributed per phase, agent and model"""
+    return energy_sampler.summary(phase, agent, model)
+
+@app.get("/integral-ai/energy/samples")
+async def get_energy_samples(limit: int = Query(60, ge=1, le=3600)):
+    """Most recent raw energy samples"""
+    return {"source": energy_sampler.source.name, "interval": energy_sampler.interval,
+            "samples": energy_sampler.recent(limit)}
+
+@app.get("/integral-ai/jobs")
+async def list_integral_ai_jobs(kind: Optional[str] = None, status: Optional[str] = None):
+    """List Integral AI jobs, newest first"""
+    jobs = [job.to_dict() for job in integral_ai_manager.jobs.list(kind, status)]
+    return {"jobs": jobs, "total": len(jobs)}
+
+@app.get("/integral-ai/jobs/{job_id}")
+async def get_integral_ai_job(job_id: str):
+    """Get an Integral AI job's status, progress and result"""
+    return integral_ai_manager.get_job(job_id).to_dict()
+
+@app.post("/integral-ai/jobs/{job_id}/cancel")
+async def cancel_integral_ai_job(job_id: str):
+    """Cancel a queued or running Integral AI job"""
+    return integral_ai_manager.cancel_job(job_id).to_dict()
 
 @app.get("/integral-ai/metrics")
 async def get_integral_ai_metrics():
@@ -2102,6 +3397,7 @@ async def get_metrics():
     """Get performance metrics"""
     return {
         "models": model_manager.performance_metrics,
+        "hedging": {name: hedger.stats() for name, hedger in model_manager.hedgers.items()},
         "agents": {
             "total": len(agent_manager.agents),
             "active_conversations": len(agent_manager.active_conversations)
@@ -2109,14 +3405,16 @@ async def get_metrics():
         "workflows": {
             "total": len(workflow_manager.workflows),
             "active": len([w for w in workflow_manager.workflows.values() if w.status == "active"]),
-            "total_executions": sum(len(w.execution_history) for w in workflow_manager.workflows.values())
+            "total_executions": sum(w.execution_count for w in workflow_manager.workflows.values())
         },
         "plugins": {
             "total": len(plugin_manager.plugins),
             "enabled": len([p for p in plugin_manager.plugins.values() if p.status == "enabled"]),
             "total_executions": len(plugin_manager.execution_history),
-            "marketplace": len(plugin_manager.plugin_marketplace)
+            "marketplace": len(plugin_manager.plugin_marketplace),
+            "concurrency": plugin_manager.concurrency_stats()
         },
+        "blobs": plugin_manager.runtime.blobs.stats(),
         "integral_ai": integral_ai_manager.get_integral_ai_metrics(),
         "system": {
             "cpu_percent": psutil.cpu_percent(),
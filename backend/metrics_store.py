@@ -0,0 +1,105 @@
+"""
+Running metric aggregates for Google ADK Agent Platform
+Constant-time count, sum, mean, variance and windowed statistics maintained as samples arrive
+"""
+
+import math
+import os
+from collections import deque
+from typing import Any, Deque, Dict, Optional
+
+METRICS_WINDOW_SIZE = int(os.getenv("METRICS_WINDOW_SIZE", "100"))
+
+
+class RunningStats:
+    """Aggregates over every sample seen plus the most recent `window` samples.
+
+    The lifetime mean and variance use Welford's update, which stays accurate
+    over long runs. The window keeps running sums that are recomputed from the
+    buffer once per window's worth of samples so rounding error cannot build up.
+    """
+
+    def __init__(self, window: int = METRICS_WINDOW_SIZE):
+        self.count = 0
+        self.total = 0.0
+        self.mean = 0.0
+        self.min: Optional[float] = None
+        self.max: Optional[float] = None
+        self._m2 = 0.0
+        self._window: Deque[float] = deque(maxlen=max(1, window))
+        self._window_sum = 0.0
+        self._window_squares = 0.0
+        self._since_resum = 0
+
+    def add(self, value: float) -> None:
+        value = float(value)
+        self.count += 1
+        self.total += value
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self._m2 += delta * (value - self.mean)
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+
+        if len(self._window) == self._window.maxlen:
+            oldest = self._window[0]
+            self._window_sum -= oldest
+            self._window_squares -= oldest * oldest
+        self._window.append(value)
+        self._window_sum += value
+        self._window_squares += value * value
+
+        self._since_resum += 1
+        if self._since_resum >= self._window.maxlen:
+            self._window_sum = math.fsum(self._window)
+            self._window_squares = math.fsum(v * v for v in self._window)
+            self._since_resum = 0
+
+    @property
+    def variance(self) -> float:
+        """Population variance of every sample"""
+        return self._m2 / self.count if self.count else 0.0
+
+    @property
+    def stddev(self) -> float:
+        return math.sqrt(self.variance)
+
+    @property
+    def window_count(self) -> int:
+        return len(self._window)
+
+    @property
+    def window_mean(self) -> float:
+        return self._window_sum / len(self._window) if self._window else 0.0
+
+    @property
+    def window_stddev(self) -> float:
+        if not self._window:
+            return 0.0
+        mean = self.window_mean
+        return math.sqrt(max(0.0, self._window_squares / len(self._window) - mean * mean))
+
+    def window_percentile(self, q: float) -> Optional[float]:
+        """Linear-interpolated q-th percentile (0-100) of the window"""
+        if not self._window:
+            return None
+        ordered = sorted(self._window)
+        position = (len(ordered) - 1) * q / 100.0
+        low = int(position)
+        high = min(low + 1, len(ordered) - 1)
+        return ordered[low] + (ordered[high] - ordered[low]) * (position - low)
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "count": self.count,
+            "sum": self.total,
+            "mean": self.mean,
+            "stddev": self.stddev,
+            "min": self.min,
+            "max": self.max,
+            "window": {
+                "count": len(self._window),
+                "mean": self.window_mean,
+                "stddev": self.window_stddev
+            }
+        }
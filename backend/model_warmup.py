@@ -0,0 +1,127 @@
+"""
+Model warm-up for Google ADK Agent Platform
+Sends tiny probe completions to configured models at startup and tracks which are ready to serve traffic
+"""
+
+import asyncio
+import os
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional
+
+import structlog
+
+logger = structlog.get_logger(__name__)
+
+MODEL_WARMUP_ENABLED = os.getenv("MODEL_WARMUP_ENABLED", "true").lower() == "true"
+MODEL_WARMUP_TIMEOUT = float(os.getenv("MODEL_WARMUP_TIMEOUT", "30"))
+MODEL_WARMUP_RETRY_INTERVAL = float(os.getenv("MODEL_WARMUP_RETRY_INTERVAL", "10"))
+# Models that must answer a probe before the instance reports ready
+CRITICAL_MODELS = [name.strip() for name in os.getenv("CRITICAL_MODELS", "").split(",") if name.strip()]
+
+
+@dataclass
+class ModelReadiness:
+    name: str
+    critical: bool = False
+    status: str = "pending"  # pending, warming, ready, failed
+    attempts: int = 0
+    latency: Optional[float] = None
+    error: Optional[str] = None
+    checked_at: Optional[datetime] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "critical": self.critical,
+            "status": self.status,
+            "attempts": self.attempts,
+            "latency": self.latency,
+            "error": self.error,
+            "checked_at": self.checked_at
+        }
+
+
+class ModelWarmer:
+    """Probes models concurrently in the background and records their readiness.
+
+    Every model gets one probe at startup; critical models that fail are
+    probed again every `retry_interval` seconds until they answer. The
+    instance is ready once the first round has finished and every critical
+    model has answered.
+    """
+
+    def __init__(self, probe: Callable[[Any], Awaitable[Any]], critical: Iterable[str] = CRITICAL_MODELS,
+                 timeout: float = MODEL_WARMUP_TIMEOUT, retry_interval: float = MODEL_WARMUP_RETRY_INTERVAL,
+                 enabled: bool = MODEL_WARMUP_ENABLED):
+        self.probe = probe
+        self.critical = set(critical)
+        self.timeout = timeout
+        self.retry_interval = retry_interval
+        self.enabled = enabled
+        self.models: Dict[str, ModelReadiness] = {}
+        self.first_round_done = False
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def ready(self) -> bool:
+        if not self.enabled:
+            return True
+        return self.first_round_done and all(
+            readiness.status == "ready" for readiness in self.models.values() if readiness.critical
+        )
+
+    def start(self, configs: List[Any]) -> None:
+        """Begin warming the given model configs without blocking startup"""
+        if not self.enabled or self._task is not None:
+            return
+        for name in self.critical - {config.name for config in configs}:
+            # A critical model that is not configured can never become ready; say so
+            self.models[name] = ModelReadiness(name, critical=True, status="failed", error="Model not configured")
+        self._task = asyncio.ensure_future(self._run(configs))
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _run(self, configs: List[Any]) -> None:
+        for config in configs:
+            self.models[config.name] = ModelReadiness(config.name, critical=config.name in self.critical)
+        await asyncio.gather(*(self._probe(config) for config in configs))
+        self.first_round_done = True
+        logger.info("Model warm-up complete", ready=[n for n, r in self.models.items() if r.status == "ready"],
+                    failed=[n for n, r in self.models.items() if r.status == "failed"])
+
+        retry = [config for config in configs if self.models[config.name].critical]
+        while any(self.models[config.name].status != "ready" for config in retry):
+            await asyncio.sleep(self.retry_interval)
+            await asyncio.gather(*(self._probe(config) for config in retry
+                                   if self.models[config.name].status != "ready"))
+
+    async def _probe(self, config: Any) -> None:
+        readiness = self.models[config.name]
+        readiness.status = "warming"
+        readiness.attempts += 1
+        started = time.monotonic()
+        try:
+            await asyncio.wait_for(self.probe(config), self.timeout)
+            readiness.status, readiness.error = "ready", None
+        except asyncio.TimeoutError:
+            readiness.status, readiness.error = "failed", f"Probe timed out after {self.timeout}s"
+        except Exception as e:
+            readiness.status, readiness.error = "failed", str(e)
+        readiness.latency = time.monotonic() - started
+        readiness.checked_at = datetime.now()
+        if readiness.status == "failed":
+            logger.warning(f"Model warm-up failed: {config.name}", error=readiness.error, critical=readiness.critical)
+
+    def report(self) -> Dict[str, Any]:
+        return {
+            "ready": self.ready,
+            "warmup_enabled": self.enabled,
+            "warmup_complete": self.first_round_done,
+            "models": [readiness.to_dict() for readiness in self.models.values()]
+        }
@@ -0,0 +1,185 @@
+"""
+Plugin dependency environments for Google ADK Agent Platform
+Installs plugin dependency sets once from a local wheelhouse into shared, content-addressed directories
+"""
+
+import hashlib
+import os
+import re
+import shutil
+import subprocess
+import sys
+import threading
+from typing import Dict, FrozenSet, List, Optional
+
+import structlog
+
+logger = structlog.get_logger(__name__)
+
+PLUGIN_WHEELHOUSE = os.getenv("PLUGIN_WHEELHOUSE")
+PLUGIN_ENV_DIR = os.getenv("PLUGIN_ENV_DIR", "./plugin_envs")
+PLUGIN_ENV_INSTALL_TIMEOUT = float(os.getenv("PLUGIN_ENV_INSTALL_TIMEOUT", "300"))
+
+_NAME_RE = re.compile(r"^\s*([A-Za-z0-9][A-Za-z0-9._-]*)(.*)$")
+
+
+class PluginDependencyError(Exception):
+    """Raised when a plugin's dependencies cannot be installed"""
+
+
+def normalize_requirement(requirement: str) -> str:
+    """Canonical form of a requirement string (PEP 503 name, no whitespace)"""
+    match = _NAME_RE.match(requirement)
+    if not match:
+        raise PluginDependencyError(f"Invalid requirement: {requirement!r}")
+    name, rest = match.groups()
+    return re.sub(r"[-_.]+", "-", name).lower() + re.sub(r"\s+", "", rest)
+
+
+def installed_modules(site_dir: str) -> FrozenSet[str]:
+    """Top-level import names provided by the distributions installed in a directory.
+
+    Read from each dist-info's top_level.txt, or from the files its RECORD
+    lists when a wheel does not ship one, so pyyaml yields yaml and
+    beautifulsoup4 yields bs4.
+    """
+    modules = set()
+    for entry in os.listdir(site_dir):
+        if not entry.endswith(".dist-info"):
+            continue
+        dist_info = os.path.join(site_dir, entry)
+        top_level = os.path.join(dist_info, "top_level.txt")
+        if os.path.isfile(top_level):
+            with open(top_level) as f:
+                modules.update(line.strip().replace("/", ".").split(".")[0] for line in f if line.strip())
+            continue
+        record = os.path.join(dist_info, "RECORD")
+        if not os.path.isfile(record):
+            continue
+        with open(record) as f:
+            for line in f:
+                path = line.split(",", 1)[0]
+                first, _, rest = path.partition("/")
+                if rest and not first.endswith((".dist-info", ".data")) and first not in ("bin", "__pycache__", ".."):
+                    modules.add(first)
+                elif not rest and first.endswith(".py"):
+                    modules.add(first[:-len(".py")])
+                elif not rest and first.endswith((".so", ".pyd")):
+                    modules.add(first.split(".")[0])
+    return frozenset(module for module in modules if module.isidentifier())
+
+
+def lock_key(requirements: List[str]) -> str:
+    """Hash identifying an environment: the normalized requirement set and interpreter"""
+    lines = [f"# python {sys.version_info[0]}.{sys.version_info[1]} {sys.platform}"] + requirements
+    return hashlib.sha256("\n".join(lines).encode()).hexdigest()[:16]
+
+
+class PluginEnvironmentManager:
+    """Builds and reuses dependency directories for plugins.
+
+    Each distinct dependency set is installed once with pip --target from the
+    wheelhouse (never the network) into ENV_DIR/<lock hash>. Plugins with the
+    same set share that directory, and a directory that exists on disk is
+    reused as-is after a restart.
+    """
+
+    LOCK_FILE = "requirements.lock"
+
+    def __init__(self, wheelhouse: Optional[str] = PLUGIN_WHEELHOUSE, root: str = PLUGIN_ENV_DIR,
+                 install_timeout: float = PLUGIN_ENV_INSTALL_TIMEOUT):
+        self.wheelhouse = wheelhouse
+        self.root = root
+        self.install_timeout = install_timeout
+        self.environments: Dict[str, str] = {}  # lock hash -> directory
+        self._modules: Dict[str, FrozenSet[str]] = {}  # directory -> importable top-level modules
+        self._locks: Dict[str, threading.Lock] = {}
+        self._locks_guard = threading.Lock()
+
+    def ensure(self, dependencies: List[str]) -> Optional[str]:
+        """Return the directory providing these dependencies, installing it on first use.
+
+        Returns None when there is nothing to install or no wheelhouse is
+        configured. Plugins then have no dependency modules: host packages are
+        never importable by plugin code.
+        """
+        requirements = sorted({normalize_requirement(d) for d in dependencies if d.strip()})
+        if not requirements:
+            return None
+        if not self.wheelhouse:
+            logger.warning("No PLUGIN_WHEELHOUSE configured; plugin dependencies are not installed",
+                           dependencies=requirements)
+            return None
+
+        key = lock_key(requirements)
+        path = self.environments.get(key)
+        if path is not None:
+            return path
+
+        with self._key_lock(key):
+            path = os.path.join(self.root, key)
+            if not os.path.isfile(os.path.join(path, self.LOCK_FILE)):
+                self._install(key, path, requirements)
+            self.environments[key] = path
+            return path
+
+    def modules(self, site_dir: Optional[str]) -> FrozenSet[str]:
+        """Modules plugin code may import from an environment, cached per directory"""
+        if site_dir is None:
+            return frozenset()
+        modules = self._modules.get(site_dir)
+        if modules is None:
+            modules = installed_modules(site_dir)
+            # Environments go first on the worker's path, so these would replace the real modules
+            shadowed = sorted(modules & sys.stdlib_module_names)
+            if shadowed:
+                raise PluginDependencyError(f"Dependencies provide standard library modules: {shadowed}")
+            self._modules[site_dir] = modules
+        return modules
+
+    def _key_lock(self, key: str) -> threading.Lock:
+        with self._locks_guard:
+            return self._locks.setdefault(key, threading.Lock())
+
+    def _install(self, key: str, path: str, requirements: List[str]) -> None:
+        """Install into a scratch directory and rename it into place once complete"""
+        if not os.path.isdir(self.wheelhouse):
+            raise PluginDependencyError(f"Wheelhouse not found: {self.wheelhouse}")
+
+        os.makedirs(self.root, exist_ok=True)
+        tmp_path = f"{path}.tmp-{os.getpid()}"
+        shutil.rmtree(tmp_path, ignore_errors=True)
+
+        command = [
+            sys.executable, "-m", "pip", "install",
+            "--no-index", "--find-links", self.wheelhouse,
+            "--target", tmp_path,
+            "--disable-pip-version-check", "--no-input", "--quiet",
+            *requirements
+        ]
+        logger.info("Installing plugin dependencies", env=key, requirements=requirements)
+        try:
+            result = subprocess.run(command, capture_output=True, text=True, timeout=self.install_timeout)
+        except subprocess.TimeoutExpired:
+            shutil.rmtree(tmp_path, ignore_errors=True)
+            raise PluginDependencyError(f"Installing {requirements} timed out")
+        if result.returncode != 0:
+            shutil.rmtree(tmp_path, ignore_errors=True)
+            raise PluginDependencyError(f"Installing {requirements} failed: {result.stderr.strip()}")
+
+        # Record what was actually resolved, including transitive dependencies
+        resolved = []
+        for entry in sorted(os.listdir(tmp_path)):
+            if entry.endswith(".dist-info"):
+                name, _, version = entry[:-len(".dist-info")].rpartition("-")
+                resolved.append(f"{normalize_requirement(name)}=={version}")
+        with open(os.path.join(tmp_path, self.LOCK_FILE), "w") as f:
+            f.write("\n".join(["# requested: " + " ".join(requirements)] + resolved) + "\n")
+
+        try:
+            os.rename(tmp_path, path)
+        except OSError:
+            # Another process finished the same environment first
+            shutil.rmtree(tmp_path, ignore_errors=True)
+            if not os.path.isfile(os.path.join(path, self.LOCK_FILE)):
+                raise
@@ -0,0 +1,251 @@
+"""
+Plugin method registry for Google ADK Agent Platform
+Reads the methods a plugin declares and compiles their parameter schemas into validators once per revision
+"""
+
+import ast
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional
+
+Validator = Callable[[Any, str], None]
+
+# Built-in methods handled by the platform rather than plugin code
+BUILTIN_METHODS = ("configure",)
+
+_TYPE_CHECKS: Dict[str, Callable[[Any], bool]] = {
+    "string": lambda v: isinstance(v, str),
+    "integer": lambda v: isinstance(v, int) and not isinstance(v, bool),
+    "number": lambda v: isinstance(v, (int, float)) and not isinstance(v, bool),
+    "boolean": lambda v: isinstance(v, bool),
+    "object": lambda v: isinstance(v, dict),
+    "array": lambda v: isinstance(v, list),
+    "null": lambda v: v is None,
+    # Shared-memory blob handles arrive as dicts, inline payloads as bytes
+    "binary": lambda v: isinstance(v, (bytes, bytearray)) or (isinstance(v, dict) and "$blob" in v),
+}
+
+
+class PluginValidationError(ValueError):
+    """Raised for invalid method declarations or arguments"""
+
+
+def compile_schema(schema: Dict[str, Any]) -> Validator:
+    """Compile a JSON Schema subset into a validator closure.
+
+    Supports type, properties, required, additionalProperties, items, enum,
+    minimum/maximum and minLength/maxLength. All schema interpretation
+    happens here so validating a call only runs the prebuilt checks.
+    Malformed schemas raise PluginValidationError here rather than failing
+    later on a call.
+    """
+    if not isinstance(schema, dict):
+        raise PluginValidationError(f"Schema must be an object, got {type(schema).__name__}")
+    checks: List[Validator] = []
+
+    types = schema.get("type")
+    if types is not None:
+        type_names = [types] if isinstance(types, str) else types
+        if not isinstance(type_names, list) or not all(isinstance(t, str) for t in type_names):
+            raise PluginValidationError("Schema type must be a string or a list of strings")
+        unknown = [t for t in type_names if t not in _TYPE_CHECKS]
+        if unknown:
+            raise PluginValidationError(f"Unsupported schema type: {unknown[0]}")
+        type_checks = [_TYPE_CHECKS[t] for t in type_names]
+        expected = " or ".join(type_names)
+
+        def check_type(value: Any, path: str) -> None:
+            if not any(check(value) for check in type_checks):
+                raise PluginValidationError(f"{path}: expected {expected}, got {type(value).__name__}")
+        checks.append(check_type)
+
+    if "enum" in schema:
+        if not isinstance(schema["enum"], list):
+            raise PluginValidationError("Schema enum must be a list")
+        allowed = list(schema["enum"])
+
+        def check_enum(value: Any, path: str) -> None:
+            if value not in allowed:
+                raise PluginValidationError(f"{path}: must be one of {allowed}")
+        checks.append(check_enum)
+
+    minimum, maximum = schema.get("minimum"), schema.get("maximum")
+    min_length, max_length = schema.get("minLength"), schema.get("maxLength")
+    for key, bound, kinds, kind in (("minimum", minimum, (int, float), "a number"),
+                                    ("maximum", maximum, (int, float), "a number"),
+                                    ("minLength", min_length, int, "an integer"),
+                                    ("maxLength", max_length, int, "an integer")):
+        if bound is not None and (not isinstance(bound, kinds) or isinstance(bound, bool)):
+            raise PluginValidationError(f"Schema {key} must be {kind}")
+    if minimum is not None or maximum is not None:
+        def check_range(value: Any, path: str) -> None:
+            if isinstance(value, (int, float)):
+                if minimum is not None and value < minimum:
+                    raise PluginValidationError(f"{path}: must be >= {minimum}")
+                if maximum is not None and value > maximum:
+                    raise PluginValidationError(f"{path}: must be <= {maximum}")
+        checks.append(check_range)
+
+    if min_length is not None or max_length is not None:
+        def check_length(value: Any, path: str) -> None:
+            if isinstance(value, str):
+                if min_length is not None and len(value) < min_length:
+                    raise PluginValidationError(f"{path}: must be at least {min_length} characters")
+                if max_length is not None and len(value) > max_length:
+                    raise PluginValidationError(f"{path}: must be at most {max_length} characters")
+        checks.append(check_length)
+
+    raw_properties = schema.get("properties", {})
+    if not isinstance(raw_properties, dict):
+        raise PluginValidationError("Schema properties must be an object")
+    properties = {name: compile_schema(sub) for name, sub in raw_properties.items()}
+    required = schema.get("required", [])
+    if not isinstance(required, list) or not all(isinstance(name, str) for name in required):
+        raise PluginValidationError("Schema required must be a list of property names")
+    closed = schema.get("additionalProperties") is False
+    if properties or required or closed:
+        def check_object(value: Any, path: str) -> None:
+            if not isinstance(value, dict):
+                return
+            for name in required:
+                if name not in value:
+                    raise PluginValidationError(f"{path}.{name}: is required")
+            for name, item in value.items():
+                validator = properties.get(name)
+                if validator is not None:
+                    validator(item, f"{path}.{name}")
+                elif closed:
+                    raise PluginValidationError(f"{path}.{name}: is not allowed")
+        checks.append(check_object)
+
+    if "items" in schema:
+        item_validator = compile_schema(schema["items"])
+
+        def check_items(value: Any, path: str) -> None:
+            if isinstance(value, list):
+                for index, item in enumerate(value):
+                    item_validator(item, f"{path}[{index}]")
+        checks.append(check_items)
+
+    if len(checks) == 1:
+        return checks[0]
+
+    def validate(value: Any, path: str) -> None:
+        for check in checks:
+            check(value, path)
+    return validate
+
+
+@dataclass
+class MethodSpec:
+    """A callable plugin method and its compiled parameter validator"""
+    name: str
+    description: str = ""
+    schema: Dict[str, Any] = field(default_factory=dict)
+    validator: Optional[Validator] = None
+    builtin: bool = False
+    batch: Optional[str] = None  # Function taking a list of parameter sets, if vectorized
+
+    def validate(self, parameters: Dict[str, Any], path: str = "parameters") -> None:
+        if self.validator is not None:
+            self.validator(parameters, path)
+
+    def describe(self) -> Dict[str, Any]:
+        return {"name": self.name, "description": self.description,
+                "parameters": self.schema, "builtin": self.builtin, "batch": self.batch is not None}
+
+
+def _literal_assignment(tree: ast.Module, name: str) -> Optional[Any]:
+    for node in tree.body:
+        if isinstance(node, ast.Assign) and any(isinstance(t, ast.Name) and t.id == name for t in node.targets):
+            try:
+                return ast.literal_eval(node.value)
+            except (ValueError, TypeError, SyntaxError, MemoryError, RecursionError):
+                raise PluginValidationError(f"{name} must be a literal")
+    return None
+
+
+def _check_callable(functions: Dict[str, ast.AST], name: str, declared_by: str) -> None:
+    if name not in functions:
+        raise PluginValidationError(f"{declared_by} declares {name} but the plugin does not define it")
+    if isinstance(functions[name], ast.AsyncFunctionDef):
+        raise PluginValidationError(f"{name} must be a regular function, not async")
+
+
+def build_method_table(code: str) -> Dict[str, MethodSpec]:
+    """Dispatch table for a plugin revision, read statically from its source.
+
+    Plugins declare methods with a module-level literal:
+
+        METHODS = {"execute": {"description": "...", "parameters": {<JSON schema>},
+                               "batch": "execute_batch"}}
+
+    A batch function takes (items, context) and returns one result per item.
+    Without METHODS every public top-level function taking (parameters,
+    context) is a method with unvalidated parameters, vectorized by a sibling
+    <name>_batch function if there is one. CONFIG_SCHEMA, when present,
+    validates the built-in configure method.
+    """
+    tree = ast.parse(code)
+    functions = {
+        node.name: node for node in tree.body
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef))
+    }
+
+    declared = _literal_assignment(tree, "METHODS")
+    methods: Dict[str, MethodSpec] = {}
+    if declared is not None:
+        if not isinstance(declared, dict):
+            raise PluginValidationError("METHODS must be a dict of method name to declaration")
+        for name, declaration in declared.items():
+            if not isinstance(name, str):
+                raise PluginValidationError(f"METHODS keys must be function names, got {name!r}")
+            if name in BUILTIN_METHODS:
+                raise PluginValidationError(f"{name} is a built-in method")
+            _check_callable(functions, name, "METHODS")
+            declaration = declaration or {}
+            if not isinstance(declaration, dict):
+                raise PluginValidationError(f"METHODS[{name!r}] must be a dict, got {type(declaration).__name__}")
+            batch = declaration.get("batch")
+            if batch is not None:
+                if not isinstance(batch, str):
+                    raise PluginValidationError(f"METHODS[{name!r}] batch must be a function name")
+                _check_callable(functions, batch, name)
+            description = declaration.get("description", "")
+            if not isinstance(description, str):
+                raise PluginValidationError(f"METHODS[{name!r}] description must be a string")
+            schema = declaration.get("parameters", {})
+            if not isinstance(schema, dict):
+                raise PluginValidationError(f"METHODS[{name!r}] parameters must be a schema object")
+            methods[name] = MethodSpec(
+                name=name,
+                description=description,
+                schema=schema,
+                validator=compile_schema(schema) if schema else None,
+                batch=batch
+            )
+    else:
+        candidates = [
+            name for name, node in functions.items()
+            if not name.startswith("_") and name not in BUILTIN_METHODS
+            and isinstance(node, ast.FunctionDef) and len(node.args.args) == 2
+        ]
+        batch_functions = {f"{name}_batch" for name in candidates} & set(candidates)
+        for name in candidates:
+            if name in batch_functions:
+                continue
+            batch = f"{name}_batch" if f"{name}_batch" in batch_functions else None
+            methods[name] = MethodSpec(name=name, description=ast.get_docstring(functions[name]) or "", batch=batch)
+
+    config_schema = _literal_assignment(tree, "CONFIG_SCHEMA")
+    if config_schema is None:
+        config_schema = {}
+    elif not isinstance(config_schema, dict):
+        raise PluginValidationError("CONFIG_SCHEMA must be a schema object")
+    methods["configure"] = MethodSpec(
+        name="configure",
+        description="Update the plugin's configuration",
+        schema=config_schema,
+        validator=compile_schema(config_schema) if config_schema else None,
+        builtin=True
+    )
+    return methods
@@ -0,0 +1,453 @@
+"""
+Plugin runtime for Google ADK Agent Platform
+Runs plugin code in a pool of pre-forked, resource-limited worker processes
+"""
+
+import asyncio
+import hashlib
+import importlib.util
+import marshal
+import multiprocessing
+import os
+import resource
+import signal
+import socket
+import sys
+import uuid
+from collections import OrderedDict
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Collection, Dict, List, Optional, Tuple
+
+import structlog
+
+from blob_store import (
+    BLOB_INLINE_THRESHOLD_BYTES, HANDLE_KEY, SharedBlobStore, attach, create_detached, discard_detached, is_handle,
+    iter_handles
+)
+
+logger = structlog.get_logger(__name__)
+
+PLUGIN_WORKERS = int(os.getenv("PLUGIN_WORKERS", str(os.cpu_count() or 2)))
+PLUGIN_CPU_SECONDS = int(os.getenv("PLUGIN_CPU_SECONDS", "30"))
+PLUGIN_MEMORY_MB = int(os.getenv("PLUGIN_MEMORY_MB", "512"))
+PLUGIN_CALL_TIMEOUT = float(os.getenv("PLUGIN_CALL_TIMEOUT", "30"))
+PLUGIN_ALLOW_NETWORK = os.getenv("PLUGIN_ALLOW_NETWORK", "false").lower() == "true"
+PLUGIN_BYTECODE_DIR = os.getenv("PLUGIN_BYTECODE_DIR")
+
+
+class PluginExecutionError(Exception):
+    """Raised when plugin code fails, times out or kills its worker"""
+
+
+class PluginTimeoutError(PluginExecutionError):
+    """Raised when a plugin call runs past its wall-clock limit"""
+
+
+def code_hash(code: str) -> str:
+    """Content hash identifying a version of plugin code"""
+    return hashlib.sha256(code.encode()).hexdigest()
+
+
+# ---------------------------------------------------------------------------
+# Worker side. Everything below runs inside the pool processes.
+# ---------------------------------------------------------------------------
+
+# Plugin module namespaces loaded in this worker, keyed by code hash
+_worker_modules: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+_MAX_WORKER_MODULES = 128
+_bytecode_dir: Optional[str] = None
+# Modules imported from each dependency environment, kept out of sys.modules between calls
+_env_modules: Dict[str, Dict[str, Any]] = {}
+
+
+def _bytecode_path(directory: str, digest: str) -> str:
+    return os.path.join(directory, f"{digest}.pyc")
+
+
+def _read_bytecode(directory: str, digest: str) -> Optional[bytes]:
+    """Read cached bytecode, ignoring files written by another Python version"""
+    try:
+        with open(_bytecode_path(directory, digest), "rb") as f:
+            data = f.read()
+    except OSError:
+        return None
+    magic = importlib.util.MAGIC_NUMBER
+    if not data.startswith(magic):
+        return None
+    return data[len(magic):]
+
+
+class _CPULimitExceeded(BaseException):
+    """Raised in a worker on SIGXCPU; a BaseException so plugin `except Exception` cannot swallow it"""
+
+
+def _deny_network(*args: Any, **kwargs: Any) -> None:
+    raise PermissionError("Network access is disabled for plugins")
+
+
+def _on_cpu_limit(signum: int, frame: Any) -> None:
+    raise _CPULimitExceeded()
+
+
+def _init_worker(memory_mb: int, allow_network: bool, bytecode_dir: Optional[str]) -> None:
+    """Apply process-wide limits once when a worker starts"""
+    global _bytecode_dir
+    _bytecode_dir = bytecode_dir
+
+    memory_bytes = memory_mb * 1024 * 1024
+    _, hard = resource.getrlimit(resource.RLIMIT_AS)
+    if hard == resource.RLIM_INFINITY or memory_bytes < hard:
+        resource.setrlimit(resource.RLIMIT_AS, (memory_bytes, hard))
+
+    # The soft CPU limit delivers SIGXCPU; failing the call here keeps the
+    # worker, and the other calls in the pool, alive
+    signal.signal(signal.SIGXCPU, _on_cpu_limit)
+
+    if not allow_network:
+        # Best effort only, not isolation: this replaces the public socket
+        # helpers, but code reaching the `_socket` extension module, native
+        # libraries or a subprocess still has the network. Enforce isolation
+        # at the OS level (network namespace, firewall) where it matters.
+        socket.socket = _deny_network
+        socket.create_connection = _deny_network
+        socket.getaddrinfo = _deny_network
+
+
+def _on_alarm(signum: int, frame: Any) -> None:
+    raise TimeoutError("Plugin call exceeded its time limit")
+
+
+def _warmup() -> int:
+    """No-op task used to start workers ahead of the first real call"""
+    return os.getpid()
+
+
+def _load_module(digest: str, bytecode: Optional[bytes]) -> Optional[Dict[str, Any]]:
+    """Return the plugin's module namespace, executing its bytecode on first use"""
+    namespace = _worker_modules.get(digest)
+    if namespace is not None:
+        _worker_modules.move_to_end(digest)
+        return namespace
+
+    if bytecode is None and _bytecode_dir is not None:
+        bytecode = _read_bytecode(_bytecode_dir, digest)
+    if bytecode is None:
+        return None
+
+    namespace = {"__name__": f"plugin_{digest[:12]}"}
+    exec(marshal.loads(bytecode), namespace)
+    _worker_modules[digest] = namespace
+    if len(_worker_modules) > _MAX_WORKER_MODULES:
+        _worker_modules.popitem(last=False)
+    return namespace
+
+
+def _resolve_blobs(value: Any, segments: List[Any], views: List[memoryview], allowed: Collection[str]) -> Any:
+    """Replace blob handles with zero-copy views of their shared memory.
+
+    Only segments the parent issued for this call may be attached, so a handle
+    cannot be used to read arbitrary shared memory by name.
+    """
+    if is_handle(value):
+        if value[HANDLE_KEY] not in allowed:
+            raise PermissionError(f"Blob not available to this call: {value[HANDLE_KEY]}")
+        segment = attach(value[HANDLE_KEY])
+        view = segment.buf[:value["size"]]
+        segments.append(segment)
+        views.append(view)
+        return view
+    if isinstance(value, dict):
+        return {key: _resolve_blobs(item, segments, views, allowed) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_resolve_blobs(item, segments, views, allowed) for item in value]
+    return value
+
+
+def _offload_blobs(value: Any, threshold: int, created: List[Dict[str, Any]]) -> Any:
+    """Move large binary results into shared memory so they are not pickled back"""
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        if len(value) >= threshold:
+            handle = create_detached(bytes(value) if isinstance(value, memoryview) else value)
+            created.append(handle)
+            return handle
+        return bytes(value)
+    if isinstance(value, dict):
+        return {key: _offload_blobs(item, threshold, created) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_offload_blobs(item, threshold, created) for item in value]
+    return value
+
+
+def _enter_environment(site_dir: str) -> None:
+    """Put a dependency environment and the modules already loaded from it in scope"""
+    sys.path.insert(0, site_dir)
+    sys.modules.update(_env_modules.get(site_dir, {}))
+
+
+def _exit_environment(site_dir: str) -> None:
+    """Take the environment back out so the next call cannot see its package versions.
+
+    Modules stay cached per environment, so a dependency is imported once per
+    worker rather than once per call. Modules the worker loaded from its own
+    interpreter environment are shared by every plugin.
+    """
+    try:
+        sys.path.remove(site_dir)
+    except ValueError:
+        pass
+    prefix = os.path.join(os.path.abspath(site_dir), "")
+    loaded = {}
+    for name, module in list(sys.modules.items()):
+        location = getattr(module, "__file__", None) or next(iter(getattr(module, "__path__", None) or []), "")
+        if location and os.path.abspath(location).startswith(prefix):
+            loaded[name] = sys.modules.pop(name)
+    _env_modules[site_dir] = loaded
+
+
+def _release_blobs(segments: List[Any], views: List[memoryview]) -> None:
+    for view in views:
+        try:
+            view.release()
+        except BufferError:
+            pass  # The plugin kept a slice; the mapping outlives this call
+    for segment in segments:
+        try:
+            segment.close()
+        except BufferError:
+            pass
+
+
+def _run_plugin(digest: str, bytecode: Optional[bytes], method: str, parameters: Dict[str, Any],
+                context: Dict[str, Any], cpu_seconds: int, timeout: float,
+                site_dir: Optional[str] = None, blob_ids: Collection[str] = (),
+                blob_threshold: int = BLOB_INLINE_THRESHOLD_BYTES) -> Tuple[Any, ...]:
+    """Execute one plugin call.
+
+    Returns ("ok", result, created_blob_handles), ("error", message), or ("missing",) when this worker
+    has not seen the code yet and the caller must resend it with its bytecode.
+    """
+    # CPU time is cumulative per process, so grant this call a fresh allowance
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    used = int(usage.ru_utime + usage.ru_stime) + 1
+    _, hard = resource.getrlimit(resource.RLIMIT_CPU)
+    soft = used + cpu_seconds
+    if hard != resource.RLIM_INFINITY:
+        soft = min(soft, hard)
+    resource.setrlimit(resource.RLIMIT_CPU, (soft, hard))
+
+    if site_dir:
+        _enter_environment(site_dir)
+
+    signal.signal(signal.SIGALRM, _on_alarm)
+    signal.setitimer(signal.ITIMER_REAL, timeout)
+    segments: List[Any] = []
+    views: List[memoryview] = []
+    created: List[Dict[str, Any]] = []
+    try:
+        namespace = _load_module(digest, bytecode)
+        if namespace is None:
+            return ("missing",)
+        func = namespace.get(method)
+        if not callable(func):
+            return ("error", f"Plugin does not define method: {method}")
+        parameters = _resolve_blobs(parameters, segments, views, frozenset(blob_ids))
+        result = func(parameters, context)
+        try:
+            return ("ok", _offload_blobs(result, blob_threshold, created), created)
+        except BaseException:
+            # Nobody will adopt segments from a result that never got back
+            for handle in created:
+                discard_detached(handle)
+            raise
+    except TimeoutError as e:
+        return ("timeout", str(e))
+    except _CPULimitExceeded:
+        return ("error", f"Plugin exceeded its {cpu_seconds}s CPU time limit")
+    except MemoryError:
+        return ("error", "Plugin exceeded its memory limit")
+    except Exception as e:
+        return ("error", f"{type(e).__name__}: {e}")
+    finally:
+        signal.setitimer(signal.ITIMER_REAL, 0)
+        # Lift the allowance while idle so a spent limit cannot signal between calls
+        resource.setrlimit(resource.RLIMIT_CPU, (hard, hard))
+        _release_blobs(segments, views)
+        if site_dir:
+            _exit_environment(site_dir)
+
+
+def _discard_outcome(future: Future) -> None:
+    """Unlink the segments of a result whose caller is gone"""
+    if future.cancelled() or future.exception() is not None:
+        return
+    outcome = future.result()
+    if outcome[0] == "ok":
+        for handle in outcome[2]:
+            discard_detached(handle)
+
+
+# ---------------------------------------------------------------------------
+# Parent side
+# ---------------------------------------------------------------------------
+
+class PluginRuntime:
+    """Pool of resource-limited worker processes executing plugin code off the event loop"""
+
+    def __init__(self, workers: int = PLUGIN_WORKERS, cpu_seconds: int = PLUGIN_CPU_SECONDS,
+                 memory_mb: int = PLUGIN_MEMORY_MB, call_timeout: float = PLUGIN_CALL_TIMEOUT,
+                 allow_network: bool = PLUGIN_ALLOW_NETWORK,
+                 bytecode_dir: Optional[str] = PLUGIN_BYTECODE_DIR):
+        self.workers = workers
+        self.cpu_seconds = cpu_seconds
+        self.memory_mb = memory_mb
+        self.call_timeout = call_timeout
+        self.allow_network = allow_network
+        self.bytecode_dir = bytecode_dir
+        self.bytecode: Dict[str, bytes] = {}  # Marshalled code objects by code hash
+        self.blobs = SharedBlobStore()  # Large payloads shared with workers by handle
+        self.executor: Optional[ProcessPoolExecutor] = None
+        if bytecode_dir:
+            os.makedirs(bytecode_dir, exist_ok=True)
+
+    def start(self) -> None:
+        """Create the worker pool"""
+        if self.executor is not None:
+            return
+        # forkserver workers fork from a small clean process rather than the API
+        # server, so memory limits apply to plugin code rather than our heap
+        method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+        self.executor = ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=multiprocessing.get_context(method),
+            initializer=_init_worker,
+            initargs=(self.memory_mb, self.allow_network, self.bytecode_dir)
+        )
+        logger.info("Started plugin runtime", workers=self.workers, start_method=method)
+
+    async def warm_up(self) -> None:
+        """Start every worker process now instead of on the first plugin call"""
+        self.start()
+        loop = asyncio.get_running_loop()
+        await asyncio.gather(*[
+            loop.run_in_executor(self.executor, _warmup) for _ in range(self.workers)
+        ])
+
+    def shutdown(self) -> None:
+        if self.executor is not None:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+            self.executor = None
+
+    def _restart(self, broken: ProcessPoolExecutor) -> None:
+        """Replace a pool broken by a worker dying, unless another call already has"""
+        if self.executor is not broken:
+            return
+        broken.shutdown(wait=False, cancel_futures=True)
+        self.executor = None
+        self.start()
+
+    def compile(self, code: str) -> str:
+        """Compile plugin code once and return the code hash used to execute it.
+
+        Bytecode is cached in memory and, when a bytecode directory is configured,
+        on disk so workers and later processes can load it without recompiling.
+        Raises SyntaxError for invalid code.
+        """
+        digest = code_hash(code)
+        if digest in self.bytecode:
+            return digest
+
+        bytecode = _read_bytecode(self.bytecode_dir, digest) if self.bytecode_dir else None
+        if bytecode is None:
+            bytecode = marshal.dumps(compile(code, f"<plugin {digest[:12]}>", "exec"))
+            if self.bytecode_dir:
+                self._write_bytecode(digest, bytecode)
+            logger.debug("Compiled plugin code", code_hash=digest)
+
+        self.bytecode[digest] = bytecode
+        return digest
+
+    def _write_bytecode(self, digest: str, bytecode: bytes) -> None:
+        path = _bytecode_path(self.bytecode_dir, digest)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        try:
+            with open(tmp_path, "wb") as f:
+                f.write(importlib.util.MAGIC_NUMBER + bytecode)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.warning("Failed to write plugin bytecode cache", code_hash=digest, error=str(e))
+
+    def discard(self, digest: str) -> None:
+        """Forget bytecode no longer referenced by any plugin"""
+        self.bytecode.pop(digest, None)
+
+    async def execute(self, digest: str, method: str, parameters: Dict[str, Any],
+                      context: Dict[str, Any], timeout: Optional[float] = None,
+                      site_dir: Optional[str] = None) -> Any:
+        """Run a method of compiled plugin code in a worker process"""
+        if digest not in self.bytecode:
+            raise PluginExecutionError("Plugin code has not been compiled")
+        timeout = timeout or self.call_timeout
+
+        # Hold every blob passed in for the length of the call; the worker may attach only these
+        holder = f"call:{uuid.uuid4().hex}"
+        handles = list(iter_handles(parameters))
+        retained = []
+        try:
+            for handle in handles:
+                if handle[HANDLE_KEY] not in self.blobs:
+                    raise PluginExecutionError(f"Blob not found: {handle[HANDLE_KEY]}")
+                self.blobs.retain(handle, holder)
+                retained.append(handle)
+            blob_ids = tuple(handle[HANDLE_KEY] for handle in handles)
+
+            # Workers keep loaded plugins, so normally only the hash is sent
+            outcome = await self._submit(
+                digest, None, method, parameters, context, self.cpu_seconds, timeout, site_dir, blob_ids
+            )
+            if outcome[0] == "missing":
+                outcome = await self._submit(
+                    digest, self.bytecode[digest], method, parameters, context, self.cpu_seconds, timeout,
+                    site_dir, blob_ids
+                )
+        finally:
+            for handle in retained:
+                self.blobs.release(handle, holder)
+
+        if outcome[0] == "timeout":
+            raise PluginTimeoutError(outcome[1])
+        if outcome[0] == "error":
+            raise PluginExecutionError(outcome[1])
+        self._adopt_all(outcome[2])
+        return outcome[1]
+
+    def _adopt_all(self, created: List[Dict[str, Any]]) -> None:
+        """Take ownership of the segments a worker created, unlinking any that cannot be adopted.
+
+        Only segments the worker reports creating are adopted; a handle-shaped
+        dict the plugin returned itself is just data.
+        """
+        adopted = 0
+        try:
+            for handle in created:
+                self.blobs.adopt(handle)
+                adopted += 1
+        finally:
+            for handle in created[adopted:]:
+                discard_detached(handle)
+
+    async def _submit(self, *args: Any) -> Tuple[Any, ...]:
+        self.start()
+        executor = self.executor
+        try:
+            future = executor.submit(_run_plugin, *args)
+            return await asyncio.wrap_future(future)
+        except BrokenProcessPool:
+            # Every call in flight on the pool fails with it; restart it only once
+            self._restart(executor)
+            raise PluginExecutionError("Plugin worker died (hard resource limit or crash)")
+        except asyncio.CancelledError:
+            # The worker keeps running; unlink whatever it hands back once it finishes
+            future.add_done_callback(_discard_outcome)
+            raise
+
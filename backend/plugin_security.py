@@ -0,0 +1,543 @@
+"""
+Plugin security analysis for Google ADK Agent Platform
+Single-pass AST analysis of plugin code against an allow/deny policy, with verdicts cached by code hash
+"""
+
+import ast
+import importlib
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from types import ModuleType
+from typing import Any, Dict, FrozenSet, Iterable, List, Optional, Set
+
+import structlog
+
+from plugin_runtime import code_hash
+
+logger = structlog.get_logger(__name__)
+
+
+@dataclass(frozen=True)
+class SecurityPolicy:
+    """What plugin code may import, call and access.
+
+    Modules are matched by their top-level package, so denying "os" also
+    denies "os.path". Modules in neither set are denied too, unless the
+    plugin's installed dependencies provide them.
+    """
+    denied_modules: Dict[str, str] = field(default_factory=lambda: {
+        "os": "file system access",
+        "posix": "file system access",
+        "nt": "file system access",
+        "pathlib": "file system access",
+        "shutil": "file system access",
+        "tempfile": "file system access",
+        "glob": "file system access",
+        "io": "file system access",
+        "mmap": "file system access",
+        "subprocess": "process execution",
+        "_posixsubprocess": "process execution",
+        "multiprocessing": "process execution",
+        "asyncio": "process execution and network access",
+        "pty": "process execution",
+        "signal": "process control",
+        "sys": "interpreter access",
+        "gc": "interpreter access",
+        "inspect": "interpreter access",
+        "ctypes": "native code access",
+        "importlib": "dynamic imports",
+        "builtins": "interpreter access",
+        "pickle": "unsafe deserialization",
+        "marshal": "unsafe deserialization",
+        "socket": "network access",
+        "_socket": "network access",
+        "ssl": "network access",
+        "http": "network access",
+        "urllib": "network access",
+        "ftplib": "network access",
+        "smtplib": "network access",
+        "telnetlib": "network access",
+        "requests": "network access",
+        "httpx": "network access",
+        "aiohttp": "network access",
+    })
+    allowed_modules: FrozenSet[str] = frozenset({
+        "math", "cmath", "statistics", "decimal", "fractions", "random", "json", "re",
+        "string", "textwrap", "datetime", "time", "calendar", "collections", "itertools",
+        "functools", "operator", "heapq", "bisect", "copy", "enum", "dataclasses",
+        "typing", "uuid", "hashlib", "hmac", "base64", "binascii", "zlib", "difflib",
+        "unicodedata", "csv", "struct", "abc", "numbers", "pprint",
+    })
+    denied_builtins: Dict[str, str] = field(default_factory=lambda: {
+        "eval": "dynamic code execution",
+        "exec": "dynamic code execution",
+        "compile": "dynamic code execution",
+        "__import__": "dynamic imports",
+        "__builtins__": "interpreter access",
+        "open": "file system access",
+        "input": "interactive input",
+        "breakpoint": "debugger access",
+        "globals": "interpreter access",
+        "locals": "interpreter access",
+        "vars": "interpreter access",
+    })
+    # Dunder attributes used to escape to interpreter internals
+    denied_attributes: FrozenSet[str] = frozenset({
+        "__subclasses__", "__globals__", "__builtins__", "__code__", "__closure__",
+        "__class__", "__base__", "__bases__", "__mro__", "__getattribute__", "__dict__",
+        "__loader__", "__spec__",
+        "f_globals", "f_locals", "f_back", "gi_frame", "cr_frame", "tb_frame",
+    })
+    # Dunder attributes ordinary code uses; every other underscore-prefixed attribute is denied
+    # except private attributes of the plugin's own objects (self._x, cls._x)
+    allowed_dunders: FrozenSet[str] = frozenset({
+        "__init__", "__post_init__", "__name__", "__qualname__", "__doc__", "__module__", "__version__",
+        "__len__", "__iter__", "__next__", "__contains__", "__getitem__", "__setitem__", "__delitem__",
+        "__enter__", "__exit__", "__eq__", "__ne__", "__lt__", "__le__", "__gt__", "__ge__", "__hash__",
+        "__repr__", "__str__", "__call__", "__bool__", "__add__", "__sub__", "__mul__",
+    })
+    reflective_builtins: FrozenSet[str] = frozenset({"getattr", "setattr", "delattr"})
+    # Callables that look attributes up by name, and how many leading arguments are names
+    reflective_calls: Dict[str, Optional[int]] = field(default_factory=lambda: {
+        "operator.attrgetter": None,  # every argument, each a dotted path
+        "operator.methodcaller": 1,
+    })
+    # String methods whose format fields can read attributes: "{0.__class__}".format(x)
+    format_methods: FrozenSet[str] = frozenset({"format", "format_map", "vformat"})
+
+
+_COMPREHENSIONS = (ast.ListComp, ast.SetComp, ast.DictComp, ast.GeneratorExp)
+
+
+class _Bindings(ast.NodeVisitor):
+    """Names a block binds, without descending into nested function, class or comprehension scopes"""
+
+    def __init__(self):
+        self.names: Set[str] = set()
+        self.global_names: Set[str] = set()
+
+    @classmethod
+    def of(cls, nodes: Iterable[ast.AST]) -> "_Bindings":
+        bindings = cls()
+        for node in nodes:
+            bindings.visit(node)
+        return bindings
+
+    def visit_Name(self, node: ast.Name) -> None:
+        if not isinstance(node.ctx, ast.Load):
+            self.names.add(node.id)
+
+    def visit_FunctionDef(self, node: ast.FunctionDef) -> None:
+        self.names.add(node.name)
+        for child in node.decorator_list + node.args.defaults + [d for d in node.args.kw_defaults if d]:
+            self.visit(child)
+
+    visit_AsyncFunctionDef = visit_FunctionDef
+
+    def visit_Lambda(self, node: ast.Lambda) -> None:
+        for child in node.args.defaults + [d for d in node.args.kw_defaults if d]:
+            self.visit(child)
+
+    def visit_ClassDef(self, node: ast.ClassDef) -> None:
+        self.names.add(node.name)
+        for child in node.decorator_list + node.bases + node.keywords:
+            self.visit(child)
+
+    def _visit_comprehension(self, node: ast.AST) -> None:
+        # Only walrus targets leak out of a comprehension
+        for child in ast.walk(node):
+            if isinstance(child, ast.NamedExpr):
+                self.names.add(child.target.id)
+
+    visit_ListComp = visit_SetComp = visit_DictComp = visit_GeneratorExp = _visit_comprehension
+
+    def visit_Import(self, node: ast.Import) -> None:
+        for alias in node.names:
+            self.names.add(alias.asname or alias.name.split(".")[0])
+
+    def visit_ImportFrom(self, node: ast.ImportFrom) -> None:
+        self.names.update(alias.asname or alias.name for alias in node.names if alias.name != "*")
+
+    def visit_ExceptHandler(self, node: ast.ExceptHandler) -> None:
+        if node.name:
+            self.names.add(node.name)
+        self.generic_visit(node)
+
+    def visit_MatchAs(self, node: ast.MatchAs) -> None:
+        if node.name:
+            self.names.add(node.name)
+        self.generic_visit(node)
+
+    def visit_MatchStar(self, node: ast.MatchStar) -> None:
+        if node.name:
+            self.names.add(node.name)
+
+    def visit_MatchMapping(self, node: ast.MatchMapping) -> None:
+        if node.rest:
+            self.names.add(node.rest)
+        self.generic_visit(node)
+
+    def visit_Global(self, node: ast.Global) -> None:
+        self.global_names.update(node.names)
+
+
+@dataclass
+class _Scope:
+    kind: str  # module, class, function or comprehension
+    parent: Optional["_Scope"]
+    names: Set[str] = field(default_factory=set)  # function/comprehension: every local name
+    bound: Set[str] = field(default_factory=set)  # module/class: names bound unconditionally so far
+    global_names: Set[str] = field(default_factory=set)
+
+
+class _PolicyVisitor(ast.NodeVisitor):
+    """Walks a module once, resolving names to the modules they were imported from.
+
+    A builtin counts as shadowed only where Python would resolve the name to
+    something else: a local of an enclosing function (locals never fall back
+    to builtins), or a module or class level binding that is unconditional
+    and made before the use runs. Module bindings are visible to every
+    function body, since those run after the module has loaded; module and
+    class level code sees them in order. Binding a name to the builtin
+    itself (`exec = exec`) is not shadowing.
+
+    Attribute names are checked wherever they appear: in chains, in from
+    imports and as literal names given to reflective calls. Modules may only
+    be used through attribute access, so a chain rooted at an import is
+    always resolvable and can be followed to any module it reaches.
+    """
+
+    def __init__(self, policy: SecurityPolicy, extra_modules: FrozenSet[str] = frozenset(),
+                 pending: bool = False):
+        self.policy = policy
+        self.extra_modules = extra_modules  # import names the plugin's installed environment provides
+        self.pending = pending  # environment not installed yet: other imports are unresolved, not denied
+        self.unresolved: Set[str] = set()
+        self.aliases: Dict[str, str] = {}  # imported name -> dotted module path
+        self.module_aliases: Set[str] = set()  # imported names bound to modules
+        self._module_reads: Set[int] = set()  # names read only to look an attribute up
+        self.scope: Optional[_Scope] = None
+        self.module_names: Set[str] = set()  # unconditional module bindings, for function bodies
+        self.issues: List[str] = []
+        self.warnings: List[str] = []
+
+    def _check_module(self, module: str, node: ast.AST) -> None:
+        root = module.split(".")[0]
+        reason = self.policy.denied_modules.get(root)
+        if reason:
+            self.issues.append(f"Line {node.lineno}: import of '{module}' ({reason})")
+        elif root in self.policy.allowed_modules or root in self.extra_modules:
+            return
+        elif self.pending:
+            self.unresolved.add(root)
+            self.warnings.append(f"Line {node.lineno}: import of '{module}' must be provided by a declared dependency")
+        else:
+            self.issues.append(f"Line {node.lineno}: import of '{module}' (not an allowed module or installed dependency)")
+
+    def _module_path(self, node: ast.AST) -> Optional[str]:
+        """Dotted path of an expression that starts at an imported name, else None"""
+        root = node
+        while isinstance(root, ast.Attribute):
+            root = root.value
+        if isinstance(root, ast.Name) and root.id in self.aliases and not self._shadowed_import(root.id):
+            return self._resolve(node)
+        return None
+
+    def _shadowed_import(self, name: str) -> bool:
+        scope = self.scope
+        while scope is not None and scope.kind != "module":
+            if name in scope.names:
+                return True
+            scope = scope.parent
+        return False
+
+    def _lookup(self, path: str) -> Iterable[Any]:
+        """Values along an allowed module's attribute chain, as far as modules lead.
+
+        Only policy-allowed standard library modules are imported here to look;
+        dependency code never runs in this process.
+        """
+        parts = path.split(".")
+        if parts[0] not in self.policy.allowed_modules:
+            return
+        try:
+            value: Any = importlib.import_module(parts[0])
+        except ImportError:
+            return
+        for part in parts[1:]:
+            if not isinstance(value, ModuleType):
+                return
+            value = getattr(value, part, None)
+            yield value
+
+    def _is_module(self, path: str) -> bool:
+        return isinstance(next(reversed(list(self._lookup(path))), None), ModuleType)
+
+    def _module_valued(self, path: str) -> Optional[str]:
+        """Name of a module outside the policy that an allowed module's attribute chain reaches"""
+        for value in self._lookup(path):
+            if isinstance(value, ModuleType) and value.__name__.split(".")[0] not in self.policy.allowed_modules:
+                return value.__name__
+        return None
+
+    def _check_attribute(self, attr: str, node: ast.AST, owner: Optional[ast.AST] = None,
+                         owner_path: Optional[str] = None) -> None:
+        """Flag an attribute that reaches interpreter internals, private state or another module"""
+        line = f"Line {node.lineno}: access to '{attr}'"
+        module = attr.lstrip("_")
+        if attr in self.policy.denied_attributes:
+            self.issues.append(f"{line} (interpreter internals)")
+        elif module in self.policy.denied_modules:
+            self.issues.append(f"{line} (module '{module}': {self.policy.denied_modules[module]})")
+        elif attr.startswith("__") and attr.endswith("__"):
+            if attr not in self.policy.allowed_dunders:
+                self.issues.append(f"{line} (interpreter internals)")
+        elif attr.startswith("_"):
+            if not (isinstance(owner, ast.Name) and owner.id in ("self", "cls") and owner_path is None):
+                self.issues.append(f"{line} (private attribute)")
+        elif owner_path is not None:
+            reached = self._module_valued(f"{owner_path}.{attr}")
+            if reached:
+                self.issues.append(f"{line} (reaches module '{reached}', which is not allowed)")
+
+    def _resolve(self, node: ast.AST) -> Optional[str]:
+        """Dotted path of a name or attribute chain, with imported aliases expanded"""
+        parts = []
+        while isinstance(node, ast.Attribute):
+            parts.append(node.attr)
+            node = node.value
+        if not isinstance(node, ast.Name):
+            return None
+        parts.append(self.aliases.get(node.id, node.id))
+        return ".".join(reversed(parts))
+
+    def _shadowed(self, name: str) -> bool:
+        """Whether `name`, read in the current scope, resolves to something other than the builtin"""
+        scope = self.scope
+        deferred = False  # inside a function body, which runs after the module has loaded
+        while scope is not None:
+            if scope.kind in ("function", "comprehension"):
+                if name in scope.global_names:
+                    return name in self.module_names
+                if name in scope.names:
+                    return True
+                deferred = deferred or scope.kind == "function"
+            elif scope.kind == "class":
+                # Class namespaces are only visible to code directly in the class body
+                if scope is self.scope and name in scope.bound:
+                    return True
+            else:
+                return name in (self.module_names if deferred else scope.bound)
+            scope = scope.parent
+        return False
+
+    def _binds_builtin(self, value: Optional[ast.AST]) -> bool:
+        return (isinstance(value, ast.Name) and value.id in self.policy.denied_builtins
+                and not self._shadowed(value.id))
+
+    def _unconditional(self, statement: ast.stmt) -> Set[str]:
+        """Names a module or class level statement always binds to something other than a builtin"""
+        if isinstance(statement, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef,
+                                  ast.Import, ast.ImportFrom)):
+            return _Bindings.of([statement]).names
+        if isinstance(statement, (ast.Assign, ast.AnnAssign)) and statement.value is not None:
+            if self._binds_builtin(statement.value):
+                return set()
+            targets = statement.targets if isinstance(statement, ast.Assign) else [statement.target]
+            return {node.id for target in targets for node in ast.walk(target)
+                    if isinstance(node, ast.Name) and isinstance(node.ctx, ast.Store)}
+        return set()
+
+    def _visit_block(self, scope: _Scope, body: List[ast.stmt]) -> None:
+        """Visit module or class level statements in order, binding names as they run"""
+        self.scope = scope
+        for statement in body:
+            self.visit(statement)
+            scope.bound |= self._unconditional(statement)
+        self.scope = scope.parent
+
+    def visit_Module(self, node: ast.Module) -> None:
+        deleted = {n.id for n in ast.walk(node) if isinstance(n, ast.Name) and isinstance(n.ctx, ast.Del)}
+        module = _Scope("module", None)
+        for statement in node.body:
+            self.module_names |= self._unconditional(statement)
+        self.module_names -= deleted
+        self._visit_block(module, node.body)
+
+    def visit_Import(self, node: ast.Import) -> None:
+        for alias in node.names:
+            self._check_module(alias.name, node)
+            if alias.asname:
+                self.aliases[alias.asname] = alias.name
+            else:
+                root = alias.name.split(".")[0]
+                self.aliases[root] = root
+            self.module_aliases.add(alias.asname or alias.name.split(".")[0])
+
+    def visit_ImportFrom(self, node: ast.ImportFrom) -> None:
+        if node.level:
+            self.issues.append(f"Line {node.lineno}: relative import is not allowed")
+            return
+        module = node.module or ""
+        self._check_module(module, node)
+        for alias in node.names:
+            if alias.name != "*":
+                self._check_attribute(alias.name, node, owner_path=module)
+            self.aliases[alias.asname or alias.name] = f"{module}.{alias.name}"
+            if self._is_module(f"{module}.{alias.name}"):
+                self.module_aliases.add(alias.asname or alias.name)
+
+    def _visit_function(self, node: ast.AST, body: List[ast.AST]) -> None:
+        # Decorators and defaults run in the enclosing scope
+        for child in getattr(node, "decorator_list", []) + node.args.defaults:
+            self.visit(child)
+        for child in node.args.kw_defaults:
+            if child is not None:
+                self.visit(child)
+        for arg in node.args.posonlyargs + node.args.args + node.args.kwonlyargs:
+            if arg.annotation is not None:
+                self.visit(arg.annotation)
+
+        bindings = _Bindings.of(body)
+        params = {arg.arg for arg in node.args.posonlyargs + node.args.args + node.args.kwonlyargs}
+        params.update(arg.arg for arg in (node.args.vararg, node.args.kwarg) if arg is not None)
+        self.scope = _Scope("function", self.scope, names=(params | bindings.names) - bindings.global_names,
+                            global_names=bindings.global_names)
+        for child in body:
+            self.visit(child)
+        self.scope = self.scope.parent
+
+    def visit_FunctionDef(self, node: ast.FunctionDef) -> None:
+        if node.returns is not None:
+            self.visit(node.returns)
+        self._visit_function(node, node.body)
+
+    visit_AsyncFunctionDef = visit_FunctionDef
+
+    def visit_Lambda(self, node: ast.Lambda) -> None:
+        self._visit_function(node, [node.body])
+
+    def visit_ClassDef(self, node: ast.ClassDef) -> None:
+        for child in node.decorator_list + node.bases + node.keywords:
+            self.visit(child)
+        self._visit_block(_Scope("class", self.scope), node.body)
+
+    def _visit_comprehension(self, node: ast.AST) -> None:
+        # The first iterable is evaluated in the enclosing scope, the rest inside
+        generators = node.generators
+        self.visit(generators[0].iter)
+        targets = _Bindings()
+        for generator in generators:
+            targets.visit(generator.target)
+        self.scope = _Scope("comprehension", self.scope, names=targets.names)
+        for index, generator in enumerate(generators):
+            self.visit(generator.target)
+            if index:
+                self.visit(generator.iter)
+            for condition in generator.ifs:
+                self.visit(condition)
+        for child in ([node.key, node.value] if isinstance(node, ast.DictComp) else [node.elt]):
+            self.visit(child)
+        self.scope = self.scope.parent
+
+    visit_ListComp = visit_SetComp = visit_DictComp = visit_GeneratorExp = _visit_comprehension
+
+    def visit_Name(self, node: ast.Name) -> None:
+        if isinstance(node.ctx, ast.Load) and not self._shadowed(node.id):
+            reason = self.policy.denied_builtins.get(node.id)
+            if reason:
+                self.issues.append(f"Line {node.lineno}: use of '{node.id}' ({reason})")
+        if (isinstance(node.ctx, ast.Load) and node.id in self.module_aliases
+                and id(node) not in self._module_reads and not self._shadowed_import(node.id)):
+            # A module passed around as a value escapes the attribute chain checks
+            self.issues.append(f"Line {node.lineno}: module '{node.id}' used as a value")
+
+    def visit_Attribute(self, node: ast.Attribute) -> None:
+        self._module_reads.add(id(node.value))
+        self._check_attribute(node.attr, node, node.value, self._module_path(node.value))
+        self.generic_visit(node)
+
+    def _check_names(self, name: str, node: ast.Call, names: List[ast.AST], owner: Optional[ast.AST] = None,
+                     dotted: bool = False) -> None:
+        """Attribute names passed to a reflective call must be literals that pass the attribute checks"""
+        owner_path = self._module_path(owner) if owner is not None else None
+        for arg in names:
+            if not (isinstance(arg, ast.Constant) and isinstance(arg.value, str)):
+                self.issues.append(f"Line {node.lineno}: {name}() with a computed attribute name")
+                continue
+            path = owner_path
+            for attr in arg.value.split(".") if dotted else [arg.value]:
+                self._check_attribute(attr, node, owner, path)
+                path = f"{path}.{attr}" if path else None
+
+    def visit_Call(self, node: ast.Call) -> None:
+        name = self._resolve(node.func)
+        if name in self.policy.reflective_builtins and not self._shadowed(name):
+            if node.args:
+                self._module_reads.add(id(node.args[0]))
+            self._check_names(name, node, node.args[1:2] or [node], node.args[0] if node.args else None)
+        elif name in self.policy.reflective_calls:
+            count = self.policy.reflective_calls[name]
+            self._check_names(name, node, node.args if count is None else node.args[:count], dotted=count is None)
+
+        func = node.func
+        if isinstance(func, ast.Attribute) and func.attr in self.policy.format_methods:
+            for template in [func.value] + node.args[:1]:
+                if isinstance(template, ast.Constant) and isinstance(template.value, str) and ".__" in template.value:
+                    self.issues.append(f"Line {node.lineno}: format string reads dunder attributes")
+                    break
+        self.generic_visit(node)
+
+
+class SecurityAnalyzer:
+    """Analyzes plugin code and caches verdicts by code hash"""
+
+    MAX_CACHED_VERDICTS = 4096
+
+    def __init__(self, policy: Optional[SecurityPolicy] = None):
+        self.policy = policy or SecurityPolicy()
+        self.verdicts: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+
+    def analyze(self, code: str, modules: Iterable[str] = (), pending: bool = False) -> Dict[str, Any]:
+        """Return {"is_safe", "issues", "warnings", "unresolved_imports"} for plugin code.
+
+        modules are the import names its installed dependencies provide. With
+        pending set, the dependencies are not installed yet, so imports outside
+        the policy are reported as unresolved rather than denied; they must be
+        checked again against the installed environment.
+        """
+        extra_modules = frozenset(modules)
+        key = f"{code_hash(code)}|{int(pending)}|{','.join(sorted(extra_modules))}"
+        verdict = self.verdicts.get(key)
+        if verdict is not None:
+            self.verdicts.move_to_end(key)
+            return dict(verdict)
+
+        verdict = self._analyze(code, extra_modules, pending)
+        self.verdicts[key] = verdict
+        if len(self.verdicts) > self.MAX_CACHED_VERDICTS:
+            self.verdicts.popitem(last=False)
+        return dict(verdict)
+
+    def _analyze(self, code: str, extra_modules: FrozenSet[str], pending: bool) -> Dict[str, Any]:
+        try:
+            tree = ast.parse(code)
+        except SyntaxError as e:
+            return {
+                "is_safe": False,
+                "issues": [f"Line {e.lineno}: syntax error: {e.msg}"],
+                "warnings": [],
+                "unresolved_imports": []
+            }
+
+        visitor = _PolicyVisitor(self.policy, extra_modules, pending)
+        visitor.visit(tree)
+        logger.debug("Analyzed plugin code", issues=len(visitor.issues), warnings=len(visitor.warnings))
+        if visitor.issues:
+            visitor.warnings.append("Always review plugin code before installation")
+        return {
+            "is_safe": not visitor.issues,
+            "issues": visitor.issues,
+            "warnings": visitor.warnings,
+            "unresolved_imports": sorted(visitor.unresolved)
+        }
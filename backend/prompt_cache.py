@@ -0,0 +1,100 @@
+"""
+Prompt caching for Google ADK Agent Platform
+Keeps agent prompt prefixes stable, marks cache breakpoints for providers that need them and reads cached-token usage
+"""
+
+import os
+from typing import Any, Dict, List, Optional, Tuple
+
+PROMPT_CACHE_ENABLED = os.getenv("PROMPT_CACHE_ENABLED", "true").lower() == "true"
+AGENT_HISTORY_MESSAGES = int(os.getenv("AGENT_HISTORY_MESSAGES", "10"))
+
+# Providers that only cache up to explicitly marked breakpoints. OpenAI and
+# vLLM (with --enable-prefix-caching) match the longest cached prefix on
+# their own, so for them a stable prefix is all that is needed.
+EXPLICIT_CACHE_PROVIDERS = {"anthropic"}
+EPHEMERAL = {"type": "ephemeral"}
+
+
+def stable_history_window(history: List[Any], size: int = AGENT_HISTORY_MESSAGES) -> List[Any]:
+    """The recent part of a conversation, dropped from the front in whole blocks of `size`.
+
+    A sliding window of the last `size` messages changes the first message
+    after the system prompt on every turn, invalidating any cached prefix
+    beyond it. Trimming in blocks keeps between `size` and 2*`size` - 1
+    messages and only moves the start once every `size` messages. The start
+    then moves forward to the first user message, since providers such as
+    Anthropic reject a conversation that opens with an assistant turn.
+    """
+    size = max(1, size)
+    start = max(0, (len(history) - size) // size * size)
+    while start < len(history) and _role(history[start]) not in (None, "user"):
+        start += 1
+    return history[start:]
+
+
+def _role(message: Any) -> Optional[str]:
+    return message.get("role") if isinstance(message, dict) else getattr(message, "role", None)
+
+
+def _as_blocks(content: Any) -> List[Dict[str, Any]]:
+    if isinstance(content, list):
+        return [dict(block) for block in content]
+    return [{"type": "text", "text": content}]
+
+
+def apply_cache_control(provider: str, messages: List[Dict[str, Any]],
+                        tools: Optional[List[Dict[str, Any]]] = None
+                        ) -> Tuple[List[Dict[str, Any]], Optional[List[Dict[str, Any]]]]:
+    """Copies of messages and tools with cache breakpoints for providers that need them.
+
+    Breakpoints go after the tool definitions, after the system prompt and
+    on the latest user or assistant message, so each request reads the
+    prefix the previous one wrote.
+    """
+    if not PROMPT_CACHE_ENABLED or provider not in EXPLICIT_CACHE_PROVIDERS:
+        return messages, tools
+
+    messages = [dict(message) for message in messages]
+    if tools:
+        tools = [dict(tool) for tool in tools]
+        tools[-1]["cache_control"] = EPHEMERAL
+
+    marked = set()
+    for index, message in enumerate(messages):
+        if message["role"] == "system" and message.get("content"):
+            marked.add(index)
+            break
+    for index in range(len(messages) - 1, -1, -1):
+        if messages[index]["role"] in ("user", "assistant") and messages[index].get("content"):
+            marked.add(index)
+            break
+
+    for index in marked:
+        blocks = _as_blocks(messages[index]["content"])
+        blocks[-1]["cache_control"] = EPHEMERAL
+        messages[index]["content"] = blocks
+    return messages, tools
+
+
+def _field(obj: Any, name: str) -> Any:
+    if obj is None:
+        return None
+    return obj.get(name) if isinstance(obj, dict) else getattr(obj, name, None)
+
+
+def cache_usage(usage: Any) -> Dict[str, int]:
+    """Input tokens split into cached, newly cached and uncached, from an OpenAI- or Anthropic-style usage"""
+    input_tokens = _field(usage, "prompt_tokens") or 0
+    output_tokens = _field(usage, "completion_tokens") or 0
+    # OpenAI and vLLM report cache hits in prompt_tokens_details; Anthropic via LiteLLM in cache_read_input_tokens
+    cached = (_field(_field(usage, "prompt_tokens_details"), "cached_tokens")
+              or _field(usage, "cache_read_input_tokens") or 0)
+    written = _field(usage, "cache_creation_input_tokens") or 0
+    return {
+        "input_tokens": int(input_tokens),
+        "cached_input_tokens": int(cached),
+        "cache_write_tokens": int(written),
+        "uncached_input_tokens": max(0, int(input_tokens) - int(cached)),
+        "output_tokens": int(output_tokens)
+    }
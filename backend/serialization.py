@@ -0,0 +1,115 @@
+"""
+Response serialization helpers for Google ADK Agent Platform
+Cached per-entity representations, orjson encoding and ETag handling for list endpoints
+"""
+
+import json
+import uuid
+import zlib
+from dataclasses import fields, is_dataclass
+from datetime import datetime
+from typing import Any, Callable, Dict, Tuple
+
+from fastapi import Request, Response
+
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+# Distinguishes ETags issued by this process from those of earlier processes or other pods
+_BOOT_ID = uuid.uuid4().hex[:8]
+
+_field_names_cache: Dict[type, Tuple[str, ...]] = {}
+
+
+def _field_names(cls: type) -> Tuple[str, ...]:
+    names = _field_names_cache.get(cls)
+    if names is None:
+        names = tuple(f.name for f in fields(cls))
+        _field_names_cache[cls] = names
+    return names
+
+
+def to_jsonable(obj: Any) -> Any:
+    """Convert dataclasses, pydantic models and datetimes into plain JSON types.
+
+    Unlike dataclasses.asdict this does not deep-copy leaf values, and it knows
+    how to serialize pydantic models nested inside dataclasses.
+    """
+    if obj is None or isinstance(obj, (str, int, float, bool)):
+        return obj
+    if isinstance(obj, datetime):
+        return obj.isoformat()
+    if isinstance(obj, dict):
+        return {key: to_jsonable(value) for key, value in obj.items()}
+    if isinstance(obj, (list, tuple, set)):
+        return [to_jsonable(item) for item in obj]
+    if is_dataclass(obj) and not isinstance(obj, type):
+        return {name: to_jsonable(getattr(obj, name)) for name in _field_names(type(obj))}
+    if hasattr(obj, "dict"):
+        return to_jsonable(obj.dict())
+    return str(obj)
+
+
+def dumps(content: Any) -> bytes:
+    """Encode JSON-ready content to bytes, using orjson when available"""
+    if ORJSON_AVAILABLE:
+        return orjson.dumps(content)
+    return json.dumps(content, separators=(",", ":")).encode()
+
+
+class ResponseCache:
+    """Cached JSON representations for one kind of entity.
+
+    Managers call invalidate() whenever an entity changes; every invalidation
+    bumps the version, which is what list ETags and encoded bodies are keyed on.
+    """
+
+    MAX_ENCODED_QUERIES = 256
+
+    def __init__(self, name: str):
+        self.name = name
+        self.version = 0
+        self.entities: Dict[str, Any] = {}
+        self.encoded: Dict[str, Tuple[int, bytes]] = {}
+
+    def get(self, entity_id: str, build: Callable[..., Any], *args: Any) -> Any:
+        """Return the cached representation of an entity, building it on a miss"""
+        representation = self.entities.get(entity_id)
+        if representation is None:
+            representation = to_jsonable(build(*args))
+            self.entities[entity_id] = representation
+        return representation
+
+    def invalidate(self, entity_id: str) -> None:
+        """Drop an entity's cached representation after it changes"""
+        self.entities.pop(entity_id, None)
+        self.version += 1
+
+    def etag(self, query_key: str = "") -> str:
+        query_hash = format(zlib.crc32(query_key.encode()), "x")
+        return f'W/"{self.name}-{_BOOT_ID}-{self.version}-{query_hash}"'
+
+    def encode(self, query_key: str, build: Callable[[], Any]) -> bytes:
+        """Return the encoded body for a list query, re-encoding only after a change"""
+        cached = self.encoded.get(query_key)
+        if cached is not None and cached[0] == self.version:
+            return cached[1]
+        body = dumps(build())
+        if len(self.encoded) >= self.MAX_ENCODED_QUERIES:
+            self.encoded.clear()
+        self.encoded[query_key] = (self.version, body)
+        return body
+
+
+def cached_json_response(request: Request, cache: ResponseCache, build: Callable[[], Any],
+                         query_key: str = "") -> Response:
+    """Serve a list body from the cache, answering 304 when the client's ETag is current"""
+    etag = cache.etag(query_key)
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers={"ETag": etag})
+
+    body = cache.encode(query_key, build)
+    return Response(content=body, media_type="application/json", headers={"ETag": etag})
@@ -4,10 +4,14 @@ Backend tests for Google ADK Agent Platform
 
 import pytest
 import asyncio
+import ast
+import json
+from datetime import datetime
 from fastapi.testclient import TestClient
 from unittest.mock import Mock, patch
 import sys
 import os
+import time
 
 # Add the backend directory to Python path
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
@@ -227,5 +231,2136 @@ class TestErrorHandling:
         response = client.post("/agents", json={})
         assert response.status_code == 422
 
+class TestWorkflowExecution:
+    """Test workflow execution engine limits and cancellation"""
+    
+    def _create_active_workflow(self):
+        from main import workflow_manager, WorkflowCreateRequest, WorkflowNode, WorkflowConnection
+        
+        request = WorkflowCreateRequest(
+            name="Test Workflow",
+            description="A test workflow",
+            nodes=[
+                WorkflowNode(id="input-1", type="input", position={"x": 0, "y": 0}, data={}),
+                WorkflowNode(id="output-1", type="output", position={"x": 1, "y": 0}, data={})
+            ],
+            connections=[WorkflowConnection(id="conn-1", sourceId="input-1", targetId="output-1")]
+        )
+        workflow = workflow_manager.create_workflow(request)
+        workflow.status = "active"
+        return workflow
+    
+    def test_execution_order_and_cycle_detection(self):
+        """Test nodes are topologically ordered and cycles rejected"""
+        from main import WorkflowNode, WorkflowConnection
+        from workflow_engine import WorkflowEngine
+        
+        nodes = [
+            WorkflowNode(id=node_id, type="input", position={"x": 0, "y": 0}, data={})
+            for node_id in ["c", "a", "b"]
+        ]
+        connections = [
+            WorkflowConnection(id="1", sourceId="a", targetId="b"),
+            WorkflowConnection(id="2", sourceId="b", targetId="c")
+        ]
+        order = WorkflowEngine.execution_order(nodes, connections)
+        assert [node.id for node in order] == ["a", "b", "c"]
+        
+        connections.append(WorkflowConnection(id="3", sourceId="c", targetId="a"))
+        with pytest.raises(ValueError):
+            WorkflowEngine.execution_order(nodes, connections)
+    
+    @pytest.mark.asyncio
+    async def test_execute_workflow_passes_input_through(self):
+        """Test a simple input -> output workflow completes"""
+        from main import workflow_manager
+        
+        workflow = self._create_active_workflow()
+        result = await workflow_manager.execute_workflow(workflow.id, {"query": "hello"})
+        
+        assert result["status"] == "completed"
+        assert result["result"]["output"]["output-1"] == {"input-1": {"query": "hello"}}
+        assert "usage" in result
+    
+    @pytest.mark.asyncio
+    async def test_node_timeout(self):
+        """Test a slow node trips its per-node deadline"""
+        from fastapi import HTTPException
+        from main import workflow_manager
+        from workflow_engine import ExecutionBudget
+        
+        workflow = self._create_active_workflow()
+        workflow.nodes[1].data["timeout_seconds"] = 0.05
+        
+        async def slow_node(node, inputs, context):
+            await asyncio.sleep(1)
+        
+        with patch.object(workflow_manager.engine, "node_executor", slow_node):
+            with pytest.raises(HTTPException) as exc_info:
+                await workflow_manager.execute_workflow(workflow.id, {}, ExecutionBudget(node_timeout=0.05))
+        
+        assert exc_info.value.status_code == 504
+        assert workflow.execution_history[-1]["status"] == "timed_out"
+    
+    @pytest.mark.asyncio
+    async def test_token_budget(self):
+        """Test nodes charging past the token budget abort the execution"""
+        from fastapi import HTTPException
+        from main import workflow_manager
+        from workflow_engine import ExecutionBudget
+        
+        workflow = self._create_active_workflow()
+        
+        async def expensive_node(node, inputs, context):
+            context.charge(tokens=600)
+        
+        with patch.object(workflow_manager.engine, "node_executor", expensive_node):
+            with pytest.raises(HTTPException) as exc_info:
+                await workflow_manager.execute_workflow(workflow.id, {}, ExecutionBudget(max_tokens=1000))
+        
+        assert exc_info.value.status_code == 400
+        assert workflow.execution_history[-1]["status"] == "budget_exceeded"
+    
+    @pytest.mark.asyncio
+    async def test_cancel_execution(self):
+        """Test cancelling a running execution"""
+        from fastapi import HTTPException
+        from main import workflow_manager
+        
+        workflow = self._create_active_workflow()
+        started = asyncio.Event()
+        
+        async def blocking_node(node, inputs, context):
+            started.set()
+            await asyncio.sleep(10)
+        
+        with patch.object(workflow_manager.engine, "node_executor", blocking_node):
+            execution = asyncio.create_task(workflow_manager.execute_workflow(workflow.id, {}))
+            await started.wait()
+            
+            execution_id = workflow.execution_history[-1]["execution_id"]
+            assert workflow_manager.cancel_execution(execution_id) is True
+            
+            with pytest.raises(HTTPException) as exc_info:
+                await execution
+        
+        assert exc_info.value.status_code == 409
+        assert workflow.execution_history[-1]["status"] == "cancelled"
+        assert workflow_manager.cancel_execution(execution_id) is False
+
+class TestWorkflowBatchExecution:
+    """Test map nodes and batch workflow execution"""
+    
+    @pytest.mark.asyncio
+    async def test_map_bounded_limits_concurrency(self):
+        """Test fan-out never exceeds the concurrency limit and keeps order"""
+        from workflow_engine import map_bounded
+        
+        in_flight = 0
+        peak = 0
+        
+        async def work(item):
+            nonlocal in_flight, peak
+            in_flight += 1
+            peak = max(peak, in_flight)
+            await asyncio.sleep(0.01 * (item % 3))
+            in_flight -= 1
+            if item == 5:
+                raise ValueError("bad record")
+            return item * 2
+        
+        results = [r async for r in map_bounded(list(range(20)), work, concurrency=3, chunk_size=2)]
+        
+        assert peak <= 3
+        assert [index for index, _, _ in results] == list(range(20))
+        assert results[4][1] == 8
+        assert isinstance(results[5][2], ValueError)
+    
+    @pytest.mark.asyncio
+    async def test_map_bounded_close_cancels_in_flight(self):
+        """Test closing the generator early cancels siblings and None concurrency is capped"""
+        from contextlib import aclosing
+        from workflow_engine import MAP_MAX_CONCURRENCY, map_bounded
+        
+        started = 0
+        cancelled = 0
+        
+        async def work(item):
+            nonlocal started, cancelled
+            started += 1
+            if item == 0:
+                raise ValueError("first record failed")
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                cancelled += 1
+                raise
+        
+        async with aclosing(map_bounded(list(range(500)), work, concurrency=None, ordered=False)) as outcomes:
+            async for index, _, error in outcomes:
+                assert error is not None
+                break
+        
+        assert started == MAP_MAX_CONCURRENCY
+        assert cancelled == started - 1
+    
+    @pytest.mark.asyncio
+    async def test_map_node_fans_out_sub_workflow(self):
+        """Test a map node runs a sub-workflow per list item"""
+        from main import workflow_manager, WorkflowCreateRequest, WorkflowNode, WorkflowConnection
+        
+        item_workflow = workflow_manager.create_workflow(WorkflowCreateRequest(
+            name="Per Record",
+            description="Runs once per record",
+            nodes=[WorkflowNode(id="echo", type="input", position={"x": 0, "y": 0}, data={})],
+            connections=[]
+        ))
+        batch_workflow = workflow_manager.create_workflow(WorkflowCreateRequest(
+            name="Batch",
+            description="Maps over records",
+            nodes=[
+                WorkflowNode(id="input-1", type="input", position={"x": 0, "y": 0}, data={}),
+                WorkflowNode(id="map-1", type="map", position={"x": 1, "y": 0},
+                             data={"items_key": "records", "workflow_id": item_workflow.id, "concurrency": 2})
+            ],
+            connections=[WorkflowConnection(id="conn-1", sourceId="input-1", targetId="map-1")]
+        ))
+        batch_workflow.status = "active"
+        
+        records = [{"n": n} for n in range(5)]
+        result = await workflow_manager.execute_workflow(batch_workflow.id, {"records": records})
+        
+        map_output = result["result"]["output"]["map-1"]
+        assert map_output["total"] == 5
+        assert [r["output"]["echo"] for r in map_output["results"]] == records
+    
+    def test_execute_batch_endpoint_streams_results(self):
+        """Test the batch endpoint streams one line per record plus a summary"""
+        from main import workflow_manager, WorkflowCreateRequest, WorkflowNode
+        
+        workflow = workflow_manager.create_workflow(WorkflowCreateRequest(
+            name="Streamed",
+            description="Streamed batch",
+            nodes=[WorkflowNode(id="input-1", type="input", position={"x": 0, "y": 0}, data={})],
+            connections=[]
+        ))
+        workflow.status = "active"
+        
+        response = client.post(
+            f"/workflows/{workflow.id}/execute-batch",
+            json={"inputs": [{"n": n} for n in range(4)], "concurrency": 2}
+        )
+        assert response.status_code == 200
+        
+        lines = [json.loads(line) for line in response.text.splitlines()]
+        assert len(lines) == 5
+        assert sorted(line["index"] for line in lines[:4]) == [0, 1, 2, 3]
+        assert lines[-1] == {"status": "batch_completed", "total": 4, "completed": 4, "failed": 0}
+
+class TestWorkflowCheckpointing:
+    """Test workflow checkpointing and resume"""
+    
+    def test_file_checkpoint_store_roundtrip(self, tmp_path):
+        """Test node outputs survive a reload and completion removes them"""
+        from checkpoint_store import FileCheckpointStore
+        
+        store = FileCheckpointStore(str(tmp_path))
+        store.begin("exec-1", {"execution_id": "exec-1", "workflow_id": "wf-1"})
+        store.save_node_output("exec-1", "node-a", {"value": 1})
+        store.save_node_output("exec-1", "node-b", "done", {"tokens_used": 12, "cost_used": 0.1})
+        
+        reloaded = FileCheckpointStore(str(tmp_path)).list_incomplete()
+        assert len(reloaded) == 1
+        assert reloaded[0]["header"]["workflow_id"] == "wf-1"
+        assert reloaded[0]["node_outputs"] == {"node-a": {"value": 1}, "node-b": "done"}
+        assert reloaded[0]["usage"] == {"tokens_used": 12, "cost_used": 0.1}
+        
+        store.complete("exec-1")
+        assert store.list_incomplete() == []
+    
+    @pytest.mark.asyncio
+    async def test_resume_skips_finished_nodes(self):
+        """Test a resumed execution only runs nodes without a checkpoint"""
+        from main import workflow_manager, WorkflowCreateRequest, WorkflowNode, WorkflowConnection
+        from checkpoint_store import InMemoryCheckpointStore
+        
+        workflow = workflow_manager.create_workflow(WorkflowCreateRequest(
+            name="Resumable",
+            description="Resumable workflow",
+            nodes=[
+                WorkflowNode(id="expensive", type="model", position={"x": 0, "y": 0}, data={}),
+                WorkflowNode(id="output-1", type="output", position={"x": 1, "y": 0}, data={})
+            ],
+            connections=[WorkflowConnection(id="conn-1", sourceId="expensive", targetId="output-1")]
+        ))
+        workflow.status = "active"
+        
+        store = InMemoryCheckpointStore()
+        store.begin("exec-resume", {
+            "execution_id": "exec-resume",
+            "workflow_id": workflow.id,
+            "input_data": {},
+            "budget": {}
+        })
+        store.save_node_output("exec-resume", "expensive", "cached model answer",
+                               {"tokens_used": 40, "cost_used": 0.5, "elapsed_time": 2.0})
+        
+        executed = []
+        
+        async def record_node(node, inputs, context):
+            executed.append(node.id)
+            return inputs
+        
+        with patch.object(workflow_manager, "checkpoint_store", store), \
+             patch.object(workflow_manager.engine, "checkpoint_store", store), \
+             patch.object(workflow_manager.engine, "node_executor", record_node):
+            result = await workflow_manager.execute_workflow(
+                workflow.id, {}, checkpoint=store.load("exec-resume")
+            )
+        
+        assert executed == ["output-1"]
+        assert result["execution_id"] == "exec-resume"
+        assert result["result"]["output"]["output-1"] == {"expensive": "cached model answer"}
+        assert result["usage"]["tokens_used"] == 40
+        assert result["usage"]["elapsed_time"] >= 2.0
+        assert store.list_incomplete() == []
+    
+    @pytest.mark.asyncio
+    async def test_disconnect_drops_in_memory_checkpoint(self):
+        """Test a caller going away keeps only durable checkpoints"""
+        from main import workflow_manager, WorkflowCreateRequest, WorkflowNode
+        from checkpoint_store import InMemoryCheckpointStore
+        
+        workflow = workflow_manager.create_workflow(WorkflowCreateRequest(
+            name="Abandoned",
+            description="Caller disconnects",
+            nodes=[WorkflowNode(id="slow", type="model", position={"x": 0, "y": 0}, data={})],
+            connections=[]
+        ))
+        workflow.status = "active"
+        
+        async def slow_node(node, inputs, context):
+            await asyncio.sleep(10)
+        
+        store = InMemoryCheckpointStore()
+        with patch.object(workflow_manager, "checkpoint_store", store), \
+             patch.object(workflow_manager.engine, "node_executor", slow_node):
+            execution = asyncio.ensure_future(workflow_manager.execute_workflow(workflow.id, {}))
+            await asyncio.sleep(0.05)
+            assert len(store.list_incomplete()) == 1
+            execution.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await execution
+        
+        assert store.list_incomplete() == []
+
+class TestWorkflowHistoryRetention:
+    """Test bounded workflow execution history"""
+    
+    @pytest.mark.asyncio
+    async def test_history_is_bounded_and_compact(self):
+        """Test history keeps summaries only and honours the record limit"""
+        from main import workflow_manager, WorkflowCreateRequest, WorkflowNode
+        
+        workflow = workflow_manager.create_workflow(WorkflowCreateRequest(
+            name="Retention",
+            description="Retention workflow",
+            nodes=[WorkflowNode(id="input-1", type="input", position={"x": 0, "y": 0}, data={})],
+            connections=[]
+        ))
+        workflow.status = "active"
+        
+        with patch("main.WORKFLOW_HISTORY_MAX_RECORDS", 3):
+            for n in range(5):
+                last = await workflow_manager.execute_workflow(workflow.id, {"n": n})
+        
+        assert workflow.execution_count == 5
+        assert len(workflow.execution_history) == 3
+        assert all("result" not in record and "input_data" not in record
+                   for record in workflow.execution_history)
+        
+        payload = workflow_manager.get_execution_result(last["execution_id"])
+        assert payload["input_data"] == {"n": 4}
+        assert payload["status"] == "completed"
+    
+    def test_history_drops_expired_records(self):
+        """Test records older than the age limit are pruned"""
+        from datetime import timedelta
+        from main import workflow_manager, WorkflowConfig
+        
+        workflow = WorkflowConfig(id="aged", name="Aged", description="Aged workflow")
+        workflow.execution_history.append({"execution_id": "old", "start_time": datetime.now() - timedelta(days=30)})
+        workflow_manager._append_history(workflow, {"execution_id": "new", "start_time": datetime.now()})
+        
+        assert [r["execution_id"] for r in workflow.execution_history] == ["new"]
+        
+        # Expiry also happens on read, without further executions
+        workflow.execution_history.insert(0, {"execution_id": "stale", "start_time": datetime.now() - timedelta(days=30)})
+        workflow_manager.workflows[workflow.id] = workflow
+        try:
+            assert [r["execution_id"] for r in workflow_manager.get_execution_history(workflow.id)] == ["new"]
+        finally:
+            del workflow_manager.workflows[workflow.id]
+    
+    def test_payload_store_evicts_oldest(self):
+        """Test the payload side store is bounded"""
+        from main import ExecutionPayloadStore
+        
+        store = ExecutionPayloadStore(max_entries=2)
+        for n in range(3):
+            store.put(f"exec-{n}", {"n": n})
+        
+        assert store.get("exec-0") is None
+        assert store.get("exec-2") == {"n": 2}
+        
+        # Reads refresh recency; pinned running executions are never evicted
+        store.get("exec-1")
+        store.put("exec-3", {"n": 3}, pin=True)
+        assert store.get("exec-1") == {"n": 1}
+        assert store.get("exec-2") is None
+        store.put("exec-4", {"n": 4})
+        store.put("exec-5", {"n": 5})
+        assert store.get("exec-3") == {"n": 3}
+        store.unpin("exec-3")
+        assert len(store) == 2
+    
+    def test_list_workflows_returns_summaries(self):
+        """Test the list endpoint omits graphs and history"""
+        response = client.get("/workflows")
+        assert response.status_code == 200
+        
+        for workflow in response.json()["workflows"]:
+            assert "execution_history" not in workflow
+            assert "nodes" not in workflow
+            assert "execution_count" in workflow
+
+class TestListSerialization:
+    """Test cached list responses and ETag handling"""
+    
+    def test_list_models_etag_and_304(self):
+        """Test an unchanged list answers 304 to a matching If-None-Match"""
+        first = client.get("/models")
+        assert first.status_code == 200
+        etag = first.headers["etag"]
+        
+        second = client.get("/models", headers={"If-None-Match": etag})
+        assert second.status_code == 304
+    
+    def test_mutation_invalidates_cached_list(self):
+        """Test adding a model changes the ETag and the body"""
+        from main import ModelConfig
+        
+        etag = client.get("/models").headers["etag"]
+        model_manager.add_model_config(ModelConfig(
+            name="etag-test-model",
+            type="api",
+            provider="openai",
+            model_id="gpt-4o"
+        ))
+        
+        response = client.get("/models", headers={"If-None-Match": etag})
+        assert response.status_code == 200
+        assert response.headers["etag"] != etag
+        assert "etag-test-model" in [m["name"] for m in response.json()["models"]]
+    
+    def test_to_jsonable_handles_nested_pydantic(self):
+        """Test dataclasses holding pydantic nodes serialize without asdict"""
+        from main import WorkflowConfig, WorkflowNode
+        from serialization import to_jsonable
+        
+        workflow = WorkflowConfig(
+            id="wf",
+            name="Nested",
+            description="Nested nodes",
+            nodes=[WorkflowNode(id="n1", type="input", position={"x": 0, "y": 0}, data={"k": "v"})]
+        )
+        data = to_jsonable(workflow)
+        
+        assert data["nodes"][0]["data"] == {"k": "v"}
+        assert isinstance(data["created_at"], str)
+
+class TestPluginRuntime:
+    """Test out-of-process plugin execution"""
+    
+    def _enabled_plugin(self, code, configuration=None):
+        from main import plugin_manager, PluginCreateRequest
+        
+        plugin = plugin_manager.create_plugin(PluginCreateRequest(
+            name="Runtime Test Plugin",
+            description="Executes real code",
+            category="tool",
+            author="tests",
+            code=code,
+            configuration=configuration or {}
+        ))
+        plugin_manager.enable_plugin(plugin.id)
+        return plugin
+    
+    @pytest.mark.asyncio
+    async def test_plugin_code_runs_in_worker(self):
+        """Test plugin methods execute the plugin's own code out of process"""
+        from main import plugin_manager
+        
+        plugin = self._enabled_plugin(
+            "import os\n"
+            "def execute(parameters, context):\n"
+            "    return {'total': sum(parameters['values']), 'pid': os.getpid(),\n"
+            "            'scale': context['configuration']['scale']}\n",
+            configuration={"scale": 2}
+        )
+        
+        result = await plugin_manager.execute_plugin(plugin.id, "execute", {"values": [1, 2, 3]}, {})
+        
+        data = result["result"]["data"]
+        assert data["total"] == 6
+        assert data["scale"] == 2
+        assert data["pid"] != os.getpid()
+    
+    @pytest.mark.asyncio
+    async def test_plugin_timeout(self):
+        """Test a plugin running past its timeout is stopped"""
+        from fastapi import HTTPException
+        from main import plugin_manager
+        
+        plugin = self._enabled_plugin(
+            "import time\n"
+            "def execute(parameters, context):\n"
+            "    time.sleep(5)\n",
+            configuration={"timeout_seconds": 0.2}
+        )
+        
+        with pytest.raises(HTTPException) as exc_info:
+            await plugin_manager.execute_plugin(plugin.id, "execute", {}, {})
+        assert "time limit" in exc_info.value.detail
+    
+    @pytest.mark.asyncio
+    async def test_plugin_network_disabled(self):
+        """Test plugins cannot open sockets by default"""
+        from fastapi import HTTPException
+        from main import plugin_manager
+        
+        plugin = self._enabled_plugin(
+            "import socket\n"
+            "def execute(parameters, context):\n"
+            "    socket.create_connection(('example.com', 80))\n"
+        )
+        
+        with pytest.raises(HTTPException) as exc_info:
+            await plugin_manager.execute_plugin(plugin.id, "execute", {}, {})
+        assert "Network access is disabled" in exc_info.value.detail
+
+    @pytest.mark.asyncio
+    async def test_cpu_limit_fails_only_the_offending_call(self):
+        """Test a call over its CPU limit fails without breaking the pool for other calls"""
+        from plugin_runtime import PluginExecutionError, PluginRuntime
+        
+        runtime = PluginRuntime(workers=2, cpu_seconds=1, call_timeout=20)
+        spin = runtime.compile("def execute(parameters, context):\n    while True:\n        pass\n")
+        nap = runtime.compile("import time\ndef execute(parameters, context):\n    time.sleep(1.5)\n    return 'ok'\n")
+        try:
+            await runtime.warm_up()
+            executor = runtime.executor
+            spun, napped = await asyncio.gather(
+                runtime.execute(spin, "execute", {}, {}),
+                runtime.execute(nap, "execute", {}, {}),
+                return_exceptions=True
+            )
+            assert isinstance(spun, PluginExecutionError) and "CPU time limit" in str(spun)
+            assert napped == "ok"
+            assert runtime.executor is executor
+            
+            # A call failing on an already-replaced pool must not restart the new one
+            runtime._restart(object())
+            assert runtime.executor is executor
+        finally:
+            runtime.shutdown()
+
+    @pytest.mark.asyncio
+    async def test_plugin_compiled_once(self):
+        """Test plugin code is compiled at enable time and only recompiled when it changes"""
+        from main import plugin_manager
+        
+        plugin = self._enabled_plugin("def execute(parameters, context):\n    return 1\n")
+        
+        with patch("plugin_runtime.compile", wraps=compile) as compile_mock:
+            for _ in range(3):
+                result = await plugin_manager.execute_plugin(plugin.id, "execute", {}, {})
+                assert result["result"]["data"] == 1
+            assert compile_mock.call_count == 0
+            
+            plugin_manager.update_plugin(plugin.id, {"description": "Unchanged code"})
+            assert compile_mock.call_count == 0
+            
+            plugin_manager.update_plugin(plugin.id, {"code": "def execute(parameters, context):\n    return 2\n"})
+            assert compile_mock.call_count == 1
+        
+        result = await plugin_manager.execute_plugin(plugin.id, "execute", {}, {})
+        assert result["result"]["data"] == 2
+    
+    @pytest.mark.asyncio
+    async def test_hot_reload_keeps_in_flight_calls(self):
+        """Test an update swaps revisions while an in-flight call finishes on the old code"""
+        from main import plugin_manager
+        
+        old_code = (
+            "import time\n"
+            "def execute(parameters, context):\n"
+            "    time.sleep(parameters.get('sleep', 0))\n"
+            "    return 'old'\n"
+        )
+        plugin = self._enabled_plugin(old_code)
+        old_instance = plugin_manager.plugin_registry[plugin.id]
+        
+        in_flight = asyncio.ensure_future(
+            plugin_manager.execute_plugin(plugin.id, "execute", {"sleep": 0.5}, {})
+        )
+        await asyncio.sleep(0.1)
+        
+        plugin_manager.update_plugin(plugin.id, {"code": "def execute(parameters, context):\n    return 'new'\n"})
+        assert old_instance in plugin_manager.draining_instances
+        new_result = await plugin_manager.execute_plugin(plugin.id, "execute", {}, {})
+        assert new_result["result"]["data"] == "new"
+        
+        old_result = await in_flight
+        assert old_result["result"]["data"] == "old"
+        assert old_instance not in plugin_manager.draining_instances
+        assert old_instance.code_hash not in plugin_manager.runtime.bytecode
+        
+        revisions = [r["revision"] for r in plugin_manager.get_execution_history(plugin.id)]
+        assert revisions == [1, 2]
+    
+    def test_invalid_update_changes_nothing(self):
+        """Test code that fails to compile is rejected before the plugin is modified"""
+        from fastapi import HTTPException
+        from main import plugin_manager
+        
+        plugin = self._enabled_plugin("def execute(parameters, context):\n    return 1\n")
+        
+        with pytest.raises(HTTPException) as exc_info:
+            plugin_manager.update_plugin(plugin.id, {"code": "def execute(:\n"})
+        
+        assert exc_info.value.status_code == 400
+        assert plugin.code.startswith("def execute(parameters")
+        assert plugin_manager.plugin_registry[plugin.id].revision == 1
+    
+    @pytest.mark.asyncio
+    async def test_code_changes_are_security_checked_and_initialized(self):
+        """Test updates and installs reject unsafe code, and a first code update goes live"""
+        from fastapi import HTTPException
+        from main import plugin_manager
+        
+        plugin = self._enabled_plugin("")
+        assert plugin.id not in plugin_manager.plugin_registry
+        
+        with pytest.raises(HTTPException) as exc_info:
+            plugin_manager.update_plugin(plugin.id, {"code": "def execute(parameters, context):\n    return open('/etc/passwd').read()\n"})
+        assert exc_info.value.status_code == 400
+        assert "security validation failed" in exc_info.value.detail
+        assert plugin.code == ""
+        
+        plugin_manager.update_plugin(plugin.id, {"code": "def execute(parameters, context):\n    return 'live'\n"})
+        result = await plugin_manager.execute_plugin(plugin.id, "execute", {}, {})
+        assert result["result"]["data"] == "live"
+        
+        with pytest.raises(HTTPException) as exc_info:
+            plugin_manager.install_plugin({"name": "Bad", "description": "Unsafe", "category": "tool",
+                                           "author": "tests", "code": "import subprocess\n"})
+        assert exc_info.value.status_code == 400
+    
+    def test_bytecode_disk_cache(self, tmp_path):
+        """Test compiled bytecode is persisted and reused by a new runtime"""
+        from plugin_runtime import PluginRuntime
+        
+        code = "def execute(parameters, context):\n    return 1\n"
+        digest = PluginRuntime(bytecode_dir=str(tmp_path)).compile(code)
+        assert (tmp_path / f"{digest}.pyc").exists()
+        
+        runtime = PluginRuntime(bytecode_dir=str(tmp_path))
+        with patch("plugin_runtime.compile") as compile_mock:
+            assert runtime.compile(code) == digest
+        compile_mock.assert_not_called()
+
+class TestPluginSecurity:
+    """Test AST-based plugin security analysis"""
+    
+    def test_safe_code_without_false_positives(self):
+        """Test names that merely contain risky words are not flagged"""
+        from plugin_security import SecurityAnalyzer
+        
+        code = (
+            "import json\n"
+            "from math import sqrt\n"
+            "def execute(parameters, context):\n"
+            "    file_path = parameters.get('path', 'http://example.com')\n"
+            "    return {'profile': json.dumps(file_path), 'root': sqrt(4)}\n"
+        )
+        verdict = SecurityAnalyzer().analyze(code)
+        
+        assert verdict["is_safe"] is True
+        assert verdict["issues"] == []
+    
+    def test_denied_imports_calls_and_attributes(self):
+        """Test aliased imports, builtins and escape attributes are resolved and flagged"""
+        from plugin_security import SecurityAnalyzer
+        
+        code = (
+            "import subprocess as sp\n"
+            "from os import path\n"
+            "def execute(parameters, context):\n"
+            "    eval(parameters['expr'])\n"
+            "    return ().__class__.__bases__[0].__subclasses__()\n"
+        )
+        verdict = SecurityAnalyzer().analyze(code)
+        
+        assert verdict["is_safe"] is False
+        issues = " ".join(verdict["issues"])
+        assert "'subprocess'" in issues
+        assert "'os'" in issues
+        assert "'eval'" in issues
+        assert "__subclasses__" in issues
+    
+    def test_shadowed_builtin_is_allowed(self):
+        """Test locally defined names are not mistaken for builtins"""
+        from plugin_security import SecurityAnalyzer
+        
+        code = "def open(x):\n    return x\ndef execute(parameters, context):\n    return open(1)\n"
+        
+        assert SecurityAnalyzer().analyze(code)["is_safe"] is True
+    
+    def test_builtin_shadowing_is_scoped(self):
+        """Test a binding only shadows a builtin where Python would resolve the name to it"""
+        from plugin_security import SecurityAnalyzer
+        
+        analyzer = SecurityAnalyzer()
+        bypasses = [
+            "exec = exec\nexec('1')\n",
+            "def f(open):\n    pass\nopen('/etc/passwd')\n",
+            "def f():\n    [0 for open in ()]\n    return open('/etc/passwd')\n",
+            "if False:\n    def open(x): pass\ndef execute(parameters, context):\n    return open('/etc/passwd')\n",
+        ]
+        for code in bypasses:
+            assert analyzer.analyze(code)["is_safe"] is False, code
+        
+        # Helpers defined after the function that calls them still shadow
+        code = "def execute(parameters, context):\n    return compile(parameters)\ndef compile(p):\n    return p\n"
+        assert analyzer.analyze(code)["is_safe"] is True
+    
+    def test_unknown_modules_and_class_escapes_denied(self):
+        """Test modules outside the policy, asyncio subprocesses and __class__ walks are flagged"""
+        from plugin_security import SecurityAnalyzer
+        
+        analyzer = SecurityAnalyzer()
+        for code in ["import posix\nposix.system('id')\n",
+                     "import asyncio\nasyncio.create_subprocess_shell('ls')\n",
+                     "base = ().__class__.__base__\n",
+                     "import numpy\n"]:
+            assert analyzer.analyze(code)["is_safe"] is False, code
+        
+        # Modules an installed dependency provides may be imported, by their exact import name
+        assert analyzer.analyze("import numpy as np\n", ["numpy"])["is_safe"] is True
+        assert analyzer.analyze("import Numpy\n", ["numpy"])["is_safe"] is False
+        
+        # Before installation they are only unresolved, to be checked against the environment
+        verdict = analyzer.analyze("import numpy\nimport os\n", pending=True)
+        assert verdict["is_safe"] is False
+        assert verdict["unresolved_imports"] == ["numpy"]
+        assert analyzer.analyze("import numpy\n", pending=True)["is_safe"] is True
+
+    def test_denied_modules_reached_through_allowed_ones(self):
+        """Test attribute chains, reflection and format strings cannot reach denied modules or internals"""
+        from plugin_security import SecurityAnalyzer
+
+        analyzer = SecurityAnalyzer()
+        escapes = [
+            "import uuid\nuuid.os.popen('id -un').read()\n",
+            "import typing\ntyping.sys.modules['os']\n",
+            "import random\nrandom._os.system('id')\n",
+            "import uuid\nuuid.platform\n",
+            "from uuid import os\n",
+            "import uuid\nm = uuid\n",
+            "'{0.__class__}'.format(())\n",
+            "getattr((), '__cla' + 'ss__')\n",
+            "import uuid\ngetattr(uuid, 'os')\n",
+            "import operator\noperator.attrgetter('__class__')(())\n",
+            "class A:\n    pass\nA()._secret\n",
+        ]
+        for code in escapes:
+            assert analyzer.analyze(code)["is_safe"] is False, code
+
+        code = (
+            "import collections\n"
+            "class Counter:\n"
+            "    def __init__(self):\n"
+            "        self._counts = collections.Counter()\n"
+            "def execute(parameters, context):\n"
+            "    return '{0} {1.real}'.format(Counter.__name__, getattr(parameters, 'get')('n'))\n"
+        )
+        assert analyzer.analyze(code)["is_safe"] is True
+
+    def test_verdict_cached_by_code_hash(self):
+        """Test analyzing the same code twice parses it once"""
+        from plugin_security import SecurityAnalyzer
+        
+        analyzer = SecurityAnalyzer()
+        code = "def execute(parameters, context):\n    return 1\n"
+        
+        with patch("plugin_security.ast.parse", wraps=ast.parse) as parse_mock:
+            analyzer.analyze(code)
+            analyzer.analyze(code)
+        assert parse_mock.call_count == 1
+    
+    def test_syntax_error_is_unsafe(self):
+        """Test unparsable code is rejected"""
+        from plugin_security import SecurityAnalyzer
+        
+        verdict = SecurityAnalyzer().analyze("def execute(:\n")
+        assert verdict["is_safe"] is False
+
+class TestPluginConcurrency:
+    """Test plugin concurrency limits and wait queues"""
+    
+    def _enabled_plugin(self, configuration):
+        from main import plugin_manager, PluginCreateRequest
+        
+        plugin = plugin_manager.create_plugin(PluginCreateRequest(
+            name="Limited Plugin",
+            description="Slow integration",
+            category="integration",
+            author="tests",
+            code="",
+            configuration=configuration
+        ))
+        plugin_manager.enable_plugin(plugin.id)
+        return plugin
+    
+    @pytest.mark.asyncio
+    async def test_queue_full_rejected_with_429(self):
+        """Test calls beyond the running limit and queue are rejected fast"""
+        from fastapi import HTTPException
+        from main import plugin_manager
+        
+        plugin = self._enabled_plugin({"max_concurrency": 1, "max_queue": 1})
+        release = asyncio.Event()
+        
+        async def slow_code(*args):
+            await release.wait()
+            return {"success": True}
+        
+        with patch.object(plugin_manager, "_execute_plugin_code", side_effect=slow_code):
+            running = asyncio.ensure_future(plugin_manager.execute_plugin(plugin.id, "sync", {}, {}))
+            queued = asyncio.ensure_future(plugin_manager.execute_plugin(plugin.id, "sync", {}, {}))
+            await asyncio.sleep(0)
+            
+            with pytest.raises(HTTPException) as exc_info:
+                await plugin_manager.execute_plugin(plugin.id, "sync", {}, {})
+            assert exc_info.value.status_code == 429
+            
+            release.set()
+            results = await asyncio.gather(running, queued)
+        
+        assert all(r["status"] == "completed" for r in results)
+        stats = plugin_manager.concurrency_stats()["plugins"][plugin.id]
+        assert stats["rejected"] == 1
+        assert stats["in_flight"] == 0
+    
+    @pytest.mark.asyncio
+    async def test_timeout_default_from_configuration(self):
+        """Test the plugin's configured timeout bounds every call"""
+        from fastapi import HTTPException
+        from main import plugin_manager
+        
+        plugin = self._enabled_plugin({"timeout_seconds": 0.05})
+        
+        async def hanging_code(*args):
+            await asyncio.sleep(5)
+        
+        with patch.object(plugin_manager, "_execute_plugin_code", side_effect=hanging_code):
+            with pytest.raises(HTTPException) as exc_info:
+                await plugin_manager.execute_plugin(plugin.id, "sync", {}, {})
+        
+        assert exc_info.value.status_code == 504
+        assert plugin_manager.get_execution_history(plugin.id)[-1]["status"] == "timed_out"
+
+class TestPluginCatalogSearch:
+    """Test indexed plugin catalog and marketplace search"""
+    
+    def _index(self):
+        from catalog_index import CatalogIndex
+        
+        index = CatalogIndex({"name": 3.0, "description": 1.0}, facet_fields=("category",))
+        index.add("slack", {"name": "Slack Notifier", "description": "Send messages"}, {"category": "integration"}, rank=5)
+        index.add("slicer", {"name": "Slice Tool", "description": "Split documents"}, {"category": "tool"}, rank=50)
+        index.add("mailer", {"name": "Mailer", "description": "Send email notifications"}, {"category": "integration"}, rank=0)
+        return index
+    
+    def test_prefix_search_ranked_by_usage(self):
+        """Test prefix matches are found and ties are broken by usage"""
+        result = self._index().search("sl")
+        
+        assert result["ids"] == ["slicer", "slack"]
+        assert result["total"] == 2
+    
+    def test_fuzzy_search(self):
+        """Test misspelled queries still match"""
+        assert self._index().search("notifer")["ids"] == ["slack"]
+    
+    def test_all_tokens_must_match_and_field_weights(self):
+        """Test multi-token queries intersect and name matches outrank description matches"""
+        index = self._index()
+        
+        assert index.search("send email")["ids"] == ["mailer"]
+        index.add("mailer", {"name": "Mailer", "description": "Send email"}, {"category": "integration"}, rank=1000)
+        assert index.search("slack")["ids"] == ["slack"]
+    
+    def test_facets_filters_and_pagination(self):
+        """Test facet counts, filtering and paging"""
+        index = self._index()
+        
+        result = index.search("", {"category": "integration"}, offset=1, limit=1)
+        assert result["total"] == 2
+        assert result["ids"] == ["mailer"]
+        assert result["facets"]["category"] == {"integration": 2}
+        
+        index.remove("slack")
+        assert index.search("slack")["total"] == 0
+        assert index.facet_values("category") == ["integration", "tool"]
+
+    def test_facets_ignore_case(self):
+        """Test facet values differing only in case filter and count as one"""
+        index = self._index()
+        index.add("notion", {"name": "Notion Sync", "description": "Sync pages"}, {"category": "Integration"})
+
+        result = index.search("", {"category": "INTEGRATION"})
+        assert result["total"] == 3
+        assert result["facets"]["category"] == {"integration": 3}
+        assert index.facet_values("category") == ["integration", "tool"]
+    
+    def test_plugins_endpoint_search(self):
+        """Test /plugins searches the index and reflects status changes"""
+        from main import plugin_manager
+        
+        plugin = plugin_manager.install_plugin({
+            "name": "Zephyr Translator",
+            "description": "Translate text",
+            "category": "tool",
+            "author": "catalog-tests"
+        })
+        
+        response = client.get("/plugins", params={"q": "zephyr transl", "status": "installed"})
+        assert response.status_code == 200
+        data = response.json()
+        assert [p["id"] for p in data["plugins"]] == [plugin.id]
+        assert data["facets"]["status"] == {"installed": 1}
+        
+        plugin_manager.enable_plugin(plugin.id)
+        response = client.get("/plugins", params={"q": "zephyr", "status": "installed"})
+        assert response.json()["total"] == 0
+    
+    def test_marketplace_endpoint_search(self):
+        """Test /plugins/marketplace is routed and searchable"""
+        client.post("/plugins/marketplace", json={
+            "name": "Quokka Weather", "description": "Forecasts", "category": "integration", "downloads": 10
+        })
+        
+        response = client.get("/plugins/marketplace", params={"q": "quokka", "limit": 5})
+        assert response.status_code == 200
+        data = response.json()
+        assert data["total"] == 1
+        assert data["plugins"][0]["name"] == "Quokka Weather"
+        assert "integration" in data["categories"]
+
+class TestPluginEnvironments:
+    """Test offline dependency environments for plugins"""
+    
+    @pytest.fixture
+    def wheelhouse(self, tmp_path):
+        """A local wheel directory holding one small pure-Python package"""
+        import zipfile
+        
+        wheelhouse = tmp_path / "wheelhouse"
+        wheelhouse.mkdir()
+        files = {
+            "tinydep/__init__.py": "VALUE = 42\n",
+            "tinydep-1.0.dist-info/METADATA": "Metadata-Version: 2.1\nName: tinydep\nVersion: 1.0\n",
+            "tinydep-1.0.dist-info/WHEEL": "Wheel-Version: 1.0\nGenerator: tests\nRoot-Is-Purelib: true\nTag: py3-none-any\n",
+        }
+        record = "".join(f"{name},,\n" for name in files) + "tinydep-1.0.dist-info/RECORD,,\n"
+        with zipfile.ZipFile(wheelhouse / "tinydep-1.0-py3-none-any.whl", "w") as wheel:
+            for name, content in files.items():
+                wheel.writestr(name, content)
+            wheel.writestr("tinydep-1.0.dist-info/RECORD", record)
+        return wheelhouse
+    
+    def test_environment_built_once_and_shared(self, wheelhouse, tmp_path):
+        """Test identical dependency sets share one environment, reused after a restart"""
+        from plugin_environments import PluginEnvironmentManager
+        
+        root = str(tmp_path / "envs")
+        manager = PluginEnvironmentManager(wheelhouse=str(wheelhouse), root=root)
+        path = manager.ensure(["TinyDep"])
+        
+        assert os.path.isfile(os.path.join(path, "tinydep", "__init__.py"))
+        assert "tinydep==1.0" in open(os.path.join(path, "requirements.lock")).read()
+        assert manager.ensure(["tinydep "]) == path
+        
+        restarted = PluginEnvironmentManager(wheelhouse=str(wheelhouse), root=root)
+        with patch("plugin_environments.subprocess.run") as run_mock:
+            assert restarted.ensure(["tinydep"]) == path
+        run_mock.assert_not_called()
+    
+    def test_missing_dependency_fails_offline(self, wheelhouse, tmp_path):
+        """Test dependencies absent from the wheelhouse are not fetched from the network"""
+        from plugin_environments import PluginDependencyError, PluginEnvironmentManager
+        
+        manager = PluginEnvironmentManager(wheelhouse=str(wheelhouse), root=str(tmp_path / "envs"))
+        with pytest.raises(PluginDependencyError):
+            manager.ensure(["definitely-not-in-wheelhouse"])
+    
+    @pytest.mark.asyncio
+    async def test_plugin_imports_its_dependencies(self, wheelhouse, tmp_path):
+        """Test enabled plugins run with their dependency environment on the path"""
+        from main import plugin_manager, PluginCreateRequest
+        from plugin_environments import PluginEnvironmentManager
+        
+        environments = PluginEnvironmentManager(wheelhouse=str(wheelhouse), root=str(tmp_path / "envs"))
+        with patch.object(plugin_manager, "environments", environments):
+            plugin = plugin_manager.create_plugin(PluginCreateRequest(
+                name="Dependent Plugin",
+                description="Uses tinydep",
+                category="tool",
+                author="tests",
+                code="def execute(parameters, context):\n    import tinydep\n    return tinydep.VALUE\n",
+                dependencies=["tinydep"]
+            ))
+            plugin_manager.enable_plugin(plugin.id)
+            result = await plugin_manager.execute_plugin(plugin.id, "execute", {}, {})
+        
+        assert result["result"]["data"] == 42
+    
+    def test_import_names_come_from_installed_dists(self, wheelhouse, tmp_path):
+        """Test importable modules are read from dist-info, not guessed from requirement names"""
+        from plugin_environments import PluginDependencyError, PluginEnvironmentManager
+        
+        manager = PluginEnvironmentManager(wheelhouse=str(wheelhouse), root=str(tmp_path / "envs"))
+        assert manager.modules(manager.ensure(["tinydep"])) == {"tinydep"}
+        assert manager.modules(None) == frozenset()
+        
+        site_dir = tmp_path / "site"
+        for dist, top_level in [("PyYAML-6.0", "_yaml\nyaml\n"), ("beautifulsoup4-4.12", "bs4\n")]:
+            (site_dir / f"{dist}.dist-info").mkdir(parents=True)
+            (site_dir / f"{dist}.dist-info" / "top_level.txt").write_text(top_level)
+        assert manager.modules(str(site_dir)) == {"_yaml", "yaml", "bs4"}
+        
+        shadowing = tmp_path / "shadowing"
+        (shadowing / "evil-1.0.dist-info").mkdir(parents=True)
+        (shadowing / "evil-1.0.dist-info" / "top_level.txt").write_text("json\n")
+        with pytest.raises(PluginDependencyError):
+            manager.modules(str(shadowing))
+    
+    def test_host_packages_not_importable(self, wheelhouse, tmp_path):
+        """Test plugins cannot import modules their environment does not install"""
+        from fastapi import HTTPException
+        from main import plugin_manager, PluginCreateRequest
+        from plugin_environments import PluginEnvironmentManager
+        
+        code = "def execute(parameters, context):\n    import psutil\n    return psutil.cpu_count()\n"
+        for environments in [PluginEnvironmentManager(wheelhouse=str(wheelhouse), root=str(tmp_path / "envs")),
+                             PluginEnvironmentManager(wheelhouse=None)]:
+            with patch.object(plugin_manager, "environments", environments):
+                plugin = plugin_manager.create_plugin(PluginCreateRequest(
+                    name="Host Import",
+                    description="Imports a host package",
+                    category="tool",
+                    author="tests",
+                    code=code,
+                    dependencies=["tinydep"]
+                ))
+                with pytest.raises(HTTPException) as exc_info:
+                    plugin_manager.enable_plugin(plugin.id)
+            assert exc_info.value.status_code == 400
+            assert plugin.status != "enabled"
+    
+    def test_update_route_checks_security_before_installing(self):
+        """Test rejected updates never install their dependencies"""
+        from main import plugin_manager, PluginCreateRequest
+
+        plugin = plugin_manager.create_plugin(PluginCreateRequest(
+            name="Checked Update",
+            description="Updated with unsafe code",
+            category="tool",
+            author="tests",
+            code="def execute(parameters, context):\n    return 1\n"
+        ))
+        plugin_manager.enable_plugin(plugin.id)
+
+        with patch.object(plugin_manager.environments, "ensure") as ensure_mock:
+            response = client.put(f"/plugins/{plugin.id}", json={
+                "code": "import subprocess\ndef execute(parameters, context):\n    return 1\n",
+                "dependencies": ["tinydep"]
+            })
+
+        assert response.status_code == 400
+        ensure_mock.assert_not_called()
+        assert plugin.dependencies == []
+
+    @pytest.mark.asyncio
+    async def test_enable_route_installs_off_the_event_loop(self):
+        """Test dependency installs for the enable route run in a worker thread"""
+        import threading
+        from main import plugin_manager, PluginCreateRequest
+        
+        plugin = plugin_manager.create_plugin(PluginCreateRequest(
+            name="Threaded Install",
+            description="Dependencies installed off the loop",
+            category="tool",
+            author="tests",
+            code="def execute(parameters, context):\n    return 1\n",
+            dependencies=["tinydep"]
+        ))
+        install_threads = []
+        
+        def ensure(dependencies):
+            install_threads.append(threading.current_thread())
+            return None
+        
+        with patch.object(plugin_manager.environments, "ensure", side_effect=ensure):
+            await plugin_manager.prepare_dependencies(plugin.dependencies)
+        
+        assert install_threads and install_threads[0] is not threading.main_thread()
+
+class TestBlobStore:
+    """Test shared-memory payload passing"""
+    
+    def test_refcounting_and_eviction(self):
+        """Test pinned blobs survive pressure and unreferenced ones are evicted LRU-first"""
+        from blob_store import BlobNotFoundError, BlobStoreFullError, SharedBlobStore
+        
+        store = SharedBlobStore(max_bytes=300)
+        try:
+            pinned = store.put(b"a" * 100)
+            first = store.put(b"b" * 100, pinned=False)
+            second = store.put(b"c" * 100, pinned=False)
+            
+            store.put(b"d" * 100, pinned=False)
+            with pytest.raises(BlobNotFoundError):
+                store.view(first)
+            assert bytes(store.view(second)) == b"c" * 100
+            assert bytes(store.view(pinned)) == b"a" * 100
+            
+            with pytest.raises(BlobStoreFullError):
+                store.put(b"e" * 250)
+            
+            store.release(pinned)
+            store.put(b"e" * 200)
+            assert second["$blob"] not in store
+            assert pinned["$blob"] in store  # Most recently used survives
+            assert store.total_bytes == 300
+        finally:
+            store.close()
+
+    def test_references_are_counted_per_holder(self):
+        """Test a holder cannot release references it does not own"""
+        from blob_store import SharedBlobStore
+
+        store = SharedBlobStore(max_bytes=300)
+        try:
+            handle = store.put(b"a" * 100)
+            store.retain(handle, "exec-1")
+
+            assert store.release(handle, "exec-2") is False
+            assert store.drop(handle["$blob"])
+            assert store.drop(handle["$blob"])  # The creator's reference is only released once
+            assert handle["$blob"] in store
+
+            assert store.release(handle, "exec-1")
+            assert store.stats()["pinned"] == 0
+        finally:
+            store.close()
+
+    @pytest.mark.asyncio
+    async def test_plugin_reads_and_returns_blobs_by_handle(self):
+        """Test large payloads reach plugin workers and come back without inline copies"""
+        from fastapi import HTTPException
+        from blob_store import create_detached, discard_detached
+        from main import plugin_manager, PluginCreateRequest
+        
+        payload = os.urandom(2 * 1024 * 1024)
+        upload = client.post("/blobs", content=payload, headers={"content-type": "application/pdf"})
+        assert upload.status_code == 200
+        handle = upload.json()
+        assert handle["size"] == len(payload)
+        
+        plugin = plugin_manager.create_plugin(PluginCreateRequest(
+            name="Blob Plugin",
+            description="Reverses documents",
+            category="tool",
+            author="tests",
+            code=(
+                "def execute(parameters, context):\n"
+                "    document = parameters['document']\n"
+                "    return {'type': type(document).__name__, 'reversed': bytes(document)[::-1]}\n"
+            )
+        ))
+        plugin_manager.enable_plugin(plugin.id)
+        
+        result = await plugin_manager.execute_plugin(plugin.id, "execute", {"document": handle}, {})
+        data = result["result"]["data"]
+        assert data["type"] == "memoryview"
+        assert data["reversed"]["$blob"] in plugin_manager.runtime.blobs
+        
+        download = client.get(f"/blobs/{data['reversed']['$blob']}")
+        assert download.content == payload[::-1]
+        
+        assert client.delete(f"/blobs/{handle['$blob']}").status_code == 200
+        assert client.get(f"/blobs/{handle['$blob']}").status_code == 404
+
+        # Segments the store did not issue cannot be attached by name
+        forged = create_detached(b"secret" * 1024)
+        try:
+            with pytest.raises(HTTPException):
+                await plugin_manager.execute_plugin(plugin.id, "execute", {"document": forged}, {})
+        finally:
+            discard_detached(forged)
+
+class TestPluginMethods:
+    """Test typed method dispatch for plugins"""
+    
+    def _enabled_plugin(self, code):
+        from main import plugin_manager, PluginCreateRequest
+        
+        plugin = plugin_manager.create_plugin(PluginCreateRequest(
+            name="Methods Test Plugin",
+            description="Declares its methods",
+            category="tool",
+            author="tests",
+            code=code
+        ))
+        plugin_manager.enable_plugin(plugin.id)
+        return plugin
+    
+    @pytest.mark.asyncio
+    async def test_declared_schema_rejects_bad_parameters(self):
+        """Test declared parameter schemas are enforced before the plugin runs"""
+        from fastapi import HTTPException
+        from main import plugin_manager
+        
+        plugin = self._enabled_plugin(
+            "METHODS = {'scale': {'description': 'Multiply values', 'parameters': {\n"
+            "    'type': 'object', 'required': ['values'], 'additionalProperties': False,\n"
+            "    'properties': {'values': {'type': 'array', 'items': {'type': 'number'}},\n"
+            "                   'factor': {'type': 'integer', 'minimum': 1}}}}}\n"
+            "def scale(parameters, context):\n"
+            "    return [v * parameters.get('factor', 1) for v in parameters['values']]\n"
+            "def helper(parameters, context):\n"
+            "    return 'not declared'\n"
+        )
+        
+        result = await plugin_manager.execute_plugin(plugin.id, "scale", {"values": [1, 2.5], "factor": 2}, {})
+        assert result["result"]["data"] == [2, 5.0]
+        
+        history_before = len(plugin_manager.get_execution_history(plugin.id))
+        for parameters, message in [
+            ({}, "parameters.values: is required"),
+            ({"values": [1, "x"]}, "parameters.values[1]: expected number"),
+            ({"values": [], "factor": 0}, "parameters.factor: must be >= 1"),
+            ({"values": [], "extra": True}, "parameters.extra: is not allowed"),
+        ]:
+            with pytest.raises(HTTPException) as exc_info:
+                await plugin_manager.execute_plugin(plugin.id, "scale", parameters, {})
+            assert exc_info.value.status_code == 422
+            assert message in exc_info.value.detail
+        assert len(plugin_manager.get_execution_history(plugin.id)) == history_before
+        
+        with pytest.raises(HTTPException) as exc_info:
+            await plugin_manager.execute_plugin(plugin.id, "helper", {}, {})
+        assert exc_info.value.status_code == 400
+        
+        response = client.get(f"/plugins/{plugin.id}/methods")
+        assert [m["name"] for m in response.json()["methods"]] == ["scale", "configure"]
+    
+    @pytest.mark.asyncio
+    async def test_implicit_methods_and_invalid_declarations(self):
+        """Test undeclared plugins expose public functions and bad METHODS are rejected"""
+        from fastapi import HTTPException
+        from main import plugin_manager
+        
+        plugin = self._enabled_plugin(
+            "def execute(parameters, context):\n"
+            "    return 'ok'\n"
+            "def _private(parameters, context):\n"
+            "    return 'hidden'\n"
+        )
+        assert [m["name"] for m in plugin_manager.get_plugin_methods(plugin.id)] == ["execute", "configure"]
+        with pytest.raises(HTTPException) as exc_info:
+            await plugin_manager.execute_plugin(plugin.id, "_private", {}, {})
+        assert exc_info.value.status_code == 400
+        
+        result = await plugin_manager.execute_plugin(plugin.id, "configure", {"mode": "fast"}, {})
+        assert result["result"]["configuration"] == {"mode": "fast"}
+        
+        response = client.put(f"/plugins/{plugin.id}", json={
+            "code": "METHODS = {'missing': {}}\ndef execute(parameters, context):\n    return 'ok'\n"
+        })
+        assert response.status_code == 400
+        assert "does not define it" in response.json()["detail"]
+        assert plugin_manager.get_plugin(plugin.id).code.startswith("def execute")
+
+        for declaration in ("{'execute': 1}", "{'execute': {'parameters': {'properties': []}}}",
+                            "{'execute': {'parameters': {'type': 'integer', 'minimum': 'a'}}}"):
+            response = client.put(f"/plugins/{plugin.id}", json={
+                "code": f"METHODS = {declaration}\ndef execute(parameters, context):\n    return 'ok'\n"
+            })
+            assert response.status_code == 400, declaration
+
+class TestPluginBatchExecution:
+    """Test batch plugin invocation"""
+    
+    def _enabled_plugin(self, code):
+        from main import plugin_manager, PluginCreateRequest
+        
+        plugin = plugin_manager.create_plugin(PluginCreateRequest(
+            name="Batch Test Plugin",
+            description="Scores many inputs",
+            category="tool",
+            author="tests",
+            code=code
+        ))
+        plugin_manager.enable_plugin(plugin.id)
+        return plugin
+    
+    def test_vectorized_batch_streams_one_history_entry(self):
+        """Test a batch function receives chunks and the batch is recorded once"""
+        from main import plugin_manager
+        
+        plugin = self._enabled_plugin(
+            "def score(parameters, context):\n"
+            "    return {'value': parameters['x'] * 2, 'chunk': 1}\n"
+            "def score_batch(items, context):\n"
+            "    return [{'value': item['x'] * 2, 'chunk': len(items)} for item in items]\n"
+        )
+        assert plugin_manager.get_plugin_methods(plugin.id)[0]["batch"] is True
+        
+        response = client.post(f"/plugins/{plugin.id}/execute-batch", json={
+            "method": "score",
+            "items": [{"x": x} for x in range(5)],
+            "chunk_size": 2,
+            "ordered": True
+        })
+        assert response.status_code == 200
+        records = [json.loads(line) for line in response.text.splitlines()]
+        
+        assert [r["index"] for r in records[:-1]] == [0, 1, 2, 3, 4]
+        assert [r["result"]["data"]["value"] for r in records[:-1]] == [0, 2, 4, 6, 8]
+        assert [r["result"]["data"]["chunk"] for r in records[:-1]] == [2, 2, 2, 2, 1]
+        assert records[-1]["status"] == "batch_completed"
+        assert records[-1]["completed"] == 5
+        
+        history = plugin_manager.get_execution_history(plugin.id)
+        assert len(history) == 1
+        assert history[0]["batch_size"] == 5
+        assert history[0]["vectorized"] is True
+        assert history[0]["status"] == "completed"
+        assert plugin_manager.get_plugin(plugin.id).usage_count == 5
+    
+    def test_unvectorized_batch_reports_item_failures(self):
+        """Test items run individually, failures stay per item and bad items are rejected up front"""
+        from main import plugin_manager
+        
+        plugin = self._enabled_plugin(
+            "METHODS = {'invert': {'parameters': {'type': 'object', 'required': ['x']}}}\n"
+            "def invert(parameters, context):\n"
+            "    return 1 / parameters['x']\n"
+        )
+        
+        response = client.post(f"/plugins/{plugin.id}/execute-batch", json={
+            "method": "invert", "items": [{"x": 2}, {}]
+        })
+        assert response.status_code == 422
+        assert "items[1].x: is required" in response.json()["detail"]
+        
+        response = client.post(f"/plugins/{plugin.id}/execute-batch", json={
+            "method": "invert", "items": [{"x": 2}, {"x": 0}, {"x": 4}]
+        })
+        records = {r.get("index"): r for r in map(json.loads, response.text.splitlines())}
+        assert records[0]["result"]["data"] == 0.5
+        assert records[1]["status"] == "failed"
+        assert "ZeroDivisionError" in records[1]["error"]
+        assert records[2]["result"]["data"] == 0.25
+        assert records[None]["failed"] == 1
+        
+        history = plugin_manager.get_execution_history(plugin.id)
+        assert [h["status"] for h in history] == ["partial"]
+        assert history[0]["vectorized"] is False
+
+    @pytest.mark.asyncio
+    async def test_batch_pins_only_while_streamed(self):
+        """Test an unread batch holds no revision and history keeps a bounded sample"""
+        from main import plugin_manager, PLUGIN_BATCH_HISTORY_SAMPLE
+
+        plugin = self._enabled_plugin("def double(parameters, context):\n    return parameters['x'] * 2\n")
+        plugin_instance = plugin_manager.plugin_registry[plugin.id]
+        items = [{"x": x} for x in range(PLUGIN_BATCH_HISTORY_SAMPLE + 5)]
+
+        await plugin_manager.execute_plugin_batch(plugin.id, "double", items, {})
+        assert plugin_instance.in_flight == 0
+
+        stream = await plugin_manager.execute_plugin_batch(plugin.id, "double", items, {})
+        records = [record async for record in stream]
+        assert records[-1]["completed"] == len(items)
+        assert plugin_instance.in_flight == 0
+
+        history = plugin_manager.get_execution_history(plugin.id)
+        assert len(history) == 1
+        assert history[0]["batch_size"] == len(items)
+        assert len(history[0]["parameters"]) == len(history[0]["results"]) == PLUGIN_BATCH_HISTORY_SAMPLE
+
+class TestIntegralAI:
+    """Test Integral AI jobs and metrics"""
+    
+    def test_running_stats_match_recomputation(self):
+        """Test Welford and windowed aggregates agree with a full recomputation"""
+        import statistics
+        from metrics_store import RunningStats
+        
+        values = [((i * 37) % 101) / 7.0 for i in range(250)]
+        stats = RunningStats(window=20)
+        for value in values:
+            stats.add(value)
+        
+        assert stats.count == 250
+        assert stats.mean == pytest.approx(statistics.fmean(values))
+        assert stats.stddev == pytest.approx(statistics.pstdev(values))
+        assert (stats.min, stats.max) == (min(values), max(values))
+        assert stats.window_mean == pytest.approx(statistics.fmean(values[-20:]))
+        assert stats.window_stddev == pytest.approx(statistics.pstdev(values[-20:]))
+        assert RunningStats().snapshot()["mean"] == 0.0
+    
+    @pytest.mark.asyncio
+    async def test_metrics_track_stored_results(self):
+        """Test metrics reflect stored results without rescanning them"""
+        from main import IntegralAIManager, SafetyMasteryRequest, EnergyEfficiencyRequest
+        
+        manager = IntegralAIManager()
+        manager._collect_telemetry = lambda: {}  # A clean platform passes every check
+        await manager.safe_mastery_assessment(SafetyMasteryRequest(task_type="grasp"))
+        await manager.energy_efficiency_monitoring(EnergyEfficiencyRequest(consumption_phases=["idle"]))
+        await manager.energy_efficiency_monitoring(EnergyEfficiencyRequest(consumption_phases=["inference"]))
+        
+        metrics = manager.get_integral_ai_metrics()
+        scores = [p["efficiency_score"] for p in manager.energy_profiles.values()]
+        assert metrics["energy_efficiency"]["total_monitoring_sessions"] == 2
+        assert metrics["energy_efficiency"]["avg_efficiency_score"] == pytest.approx(sum(scores) / 2)
+        assert metrics["energy_efficiency"]["energy_profiles"] == list(manager.energy_profiles)
+        assert metrics["safe_mastery"]["avg_safety_score"] == 100.0
+        assert metrics["autonomous_skill_learning"]["avg_skills_acquired"] == 0.0
+
+    @pytest.mark.asyncio
+    async def test_runs_execute_as_background_jobs(self):
+        """Test submitted runs return immediately, report progress and can be cancelled"""
+        from fastapi import HTTPException
+        from main import IntegralAIManager, AutonomousLearningRequest, EnergyEfficiencyRequest
+        from job_scheduler import JobScheduler
+        
+        manager = IntegralAIManager()
+        manager.jobs = JobScheduler(max_concurrency=1, max_queue=1)
+        
+        learning = manager.submit_job("autonomous_skill_learning", AutonomousLearningRequest(skill_domain="grasp"))
+        energy = manager.submit_job("energy_efficiency_monitoring", EnergyEfficiencyRequest(consumption_phases=["idle"]))
+        assert learning["status"] == "queued"
+        with pytest.raises(HTTPException) as exc_info:
+            manager.submit_job("energy_efficiency_monitoring", EnergyEfficiencyRequest())
+        assert exc_info.value.status_code == 429
+        
+        await asyncio.sleep(0.25)
+        job = manager.get_job(learning["job_id"])
+        assert job.status == "running"
+        assert 0 < job.progress < 100
+        manager.cancel_job(learning["job_id"])
+        
+        await asyncio.wait_for(manager.get_job(energy["job_id"]).task, 5)
+        assert manager.get_job(learning["job_id"]).status == "cancelled"
+        assert manager.get_job(energy["job_id"]).status == "completed"
+        assert manager.get_job(energy["job_id"]).result["monitoring_id"] in manager.energy_profiles
+        assert manager.autonomous_skills == {}
+        assert manager.jobs.stats()["queued"] == 0
+
+    @pytest.mark.asyncio
+    async def test_learning_energy_is_labelled_by_skill_domain(self):
+        """Test learning runs share one energy label per domain instead of one per run"""
+        from main import IntegralAIManager, AutonomousLearningRequest, energy_sampler
+
+        manager = IntegralAIManager()
+        results = await asyncio.gather(*(
+            manager.autonomous_skill_learning(AutonomousLearningRequest(skill_domain="weld")) for _ in range(2)
+        ))
+
+        labels = [labels for labels in energy_sampler.totals if labels[0] == "learning" and labels[1] == "skill:weld"]
+        assert labels == [("learning", "skill:weld", None)]
+        assert all(result["learning_id"] not in str(energy_sampler.totals) for result in results)
+
+    @pytest.mark.asyncio
+    async def test_compliance_checks_run_concurrently_and_cache(self):
+        """Test checks run in parallel with timeouts and results are cached per task and level"""
+        from compliance_checks import CheckContext, ComplianceRegistry
+        
+        registry = ComplianceRegistry(cache_ttl=60)
+        calls = []
+        
+        @registry.register("slow")
+        async def slow(context):
+            calls.append("slow")
+            await asyncio.sleep(0.2)
+            return {"score": 0.97}
+        
+        @registry.register("also_slow")
+        async def also_slow(context):
+            await asyncio.sleep(0.2)
+            return {"score": 0.5, "passed": True}
+        
+        @registry.register("hangs", timeout=0.05)
+        async def hangs(context):
+            await asyncio.sleep(10)
+        
+        context = CheckContext(task_type="grasp", safety_level="conservative", failure_threshold=0.01)
+        started = time.monotonic()
+        results = await registry.run(context)
+        assert time.monotonic() - started < 0.35
+        
+        assert [r["check"] for r in results] == ["slow", "also_slow", "hangs"]
+        assert [r["passed"] for r in results] == [False, True, False]  # 0.97 misses the 0.99 bar
+        assert "Timed out" in results[2]["error"]
+        
+        again = await registry.run(context)
+        assert calls == ["slow"]
+        assert all(r["cached"] for r in again)
+        await registry.run(CheckContext(task_type="grasp", safety_level="aggressive", failure_threshold=0.01))
+        assert calls == ["slow", "slow"]
+        await registry.run(CheckContext(task_type="grasp", safety_level="aggressive", failure_threshold=0.5))
+        assert calls == ["slow", "slow", "slow"]
+
+        # Telemetry is only collected when the checks actually run
+        collected = []
+        cached_context = CheckContext(task_type="grasp", safety_level="aggressive", failure_threshold=0.5,
+                                      collect_telemetry=lambda: collected.append(1) or {})
+        await registry.run(cached_context)
+        assert collected == []
+
+    @pytest.mark.asyncio
+    async def test_compliance_cache_is_bounded(self):
+        """Test expired entries are pruned on insert and the entry count is capped"""
+        from compliance_checks import CheckContext, ComplianceRegistry
+
+        registry = ComplianceRegistry(cache_ttl=60, cache_max_entries=3)
+
+        @registry.register("quick")
+        async def quick(context):
+            return {"score": 1.0}
+
+        for task_type in ["a", "b", "c", "d", "e"]:
+            await registry.run(CheckContext(task_type=task_type, safety_level="balanced", failure_threshold=0.01))
+        assert [key[0] for key in registry._cache] == ["c", "d", "e"]
+
+        registry.cache_ttl = 0
+        await registry.run(CheckContext(task_type="f", safety_level="balanced", failure_threshold=0.01))
+        assert [key[0] for key in registry._cache] == ["f"]
+
+    @pytest.mark.asyncio
+    async def test_safety_assessment_uses_telemetry(self):
+        """Test the default checks score real failure telemetry"""
+        from main import IntegralAIManager, SafetyMasteryRequest
+        
+        manager = IntegralAIManager()
+        manager._collect_telemetry = lambda: {"plugins": {"executions": 10, "failed": 2}}
+        result = await manager.safe_mastery_assessment(SafetyMasteryRequest(task_type="weld"))
+        
+        checks = {c["check"]: c for c in result["result"]["compliance_checks"]}
+        assert checks["catastrophic_failure_prevention"]["passed"] is False
+        assert checks["catastrophic_failure_prevention"]["details"]["failure_rate"] == pytest.approx(0.2)
+        assert checks["skill_acquisition_safety"]["passed"] is True
+        assert result["safety_score"] == 75.0
+
+    def test_history_store_ranges_rollups_and_retention(self):
+        """Test time-indexed history supports windows, label filters, rollups and expiry"""
+        from timeseries_store import TimeSeriesStore
+        
+        now = time.time()
+        store = TimeSeriesStore(raw_retention=3600)
+        for i in range(120):
+            store.append("safety", {"i": i}, {"score": float(i)},
+                         {"task_type": "weld" if i % 2 else "grasp"}, timestamp=now - 7170 + i * 60)
+        
+        # Only the last hour of raw records is retained
+        assert store.count("safety") == 60
+        assert [r["i"] for r in store.range("safety", limit=3)] == [119, 118, 117]
+        assert [r["i"] for r in store.range("safety", start=now - 300, newest_first=False)] == [115, 116, 117, 118, 119]
+        assert all(r["i"] % 2 for r in store.range("safety", tag="task_type", value="weld"))
+        
+        hours = store.rollup("safety", "hour")
+        assert sum(bucket["count"] for bucket in hours) == 120
+        minutes = store.rollup("safety", "minute", start=now - 180)
+        assert [bucket["fields"]["score"]["mean"] for bucket in minutes][-1] == 119.0
+    
+    @pytest.mark.asyncio
+    async def test_history_endpoints_return_windowed_data(self):
+        """Test manager history is newest first and rollups are available"""
+        from main import IntegralAIManager, EnergyEfficiencyRequest
+        
+        manager = IntegralAIManager()
+        first = await manager.energy_efficiency_monitoring(EnergyEfficiencyRequest(consumption_phases=["idle"]))
+        second = await manager.energy_efficiency_monitoring(EnergyEfficiencyRequest(consumption_phases=["idle"]))
+        
+        assert [h["monitoring_id"] for h in manager.get_energy_history()] == [second["monitoring_id"], first["monitoring_id"]]
+        rollup = manager.query_history("energy", resolution="minute")
+        assert rollup["total"] == 2
+        assert sum(bucket["count"] for bucket in rollup["history"]) == 2
+        
+        response = client.get("/integral-ai/energy-efficiency/history", params={"resolution": "day"})
+        assert response.status_code == 400
+
+class TestEnergySampler:
+    """Test energy sampling and attribution"""
+    
+    def test_rapl_counters_handle_wraparound(self, tmp_path):
+        """Test RAPL package zones are summed and counter wraparound is corrected"""
+        from energy_sampler import RaplSource
+        
+        for zone, value in [("intel-rapl:0", 900_000), ("intel-rapl:0:0", 5), ("intel-rapl:1", 1_000_000)]:
+            (tmp_path / zone).mkdir()
+            (tmp_path / zone / "energy_uj").write_text(str(value))
+            (tmp_path / zone / "max_energy_range_uj").write_text("1000000")
+        
+        source = RaplSource(str(tmp_path))
+        assert source.available()
+        assert source.read() == pytest.approx(1.9)
+        (tmp_path / "intel-rapl:0" / "energy_uj").write_text("100000")
+        assert source.read() == pytest.approx(2.1)
+    
+    def test_samples_are_attributed_and_buffered(self):
+        """Test energy is split across concurrent attributions, idle otherwise, in a bounded buffer"""
+        from energy_sampler import EnergySampler, EnergySource
+        
+        class CountingSource(EnergySource):
+            name = "counting"
+            joules = 0.0
+            
+            def read(self):
+                self.joules += 10.0
+                return self.joules
+        
+        sampler = EnergySampler(CountingSource(), capacity=4)
+        sampler.sample()  # idle
+        with sampler.attribute("inference", agent="a1", model="m1") as single:
+            with sampler.attribute("learning", agent="a2"):
+                pass
+        
+        assert sampler.totals[("idle", None, None)].joules == pytest.approx(20.0)
+        assert single.joules == pytest.approx(25.0)
+        assert sampler.totals[("learning", "a2", None)].joules == pytest.approx(5.0)
+        
+        summary = sampler.summary(phase="inference")
+        assert summary["total_joules"] == pytest.approx(25.0)
+        assert summary["breakdown"][0]["model"] == "m1"
+        
+        samples = sampler.recent(10)
+        assert len(samples) == 4
+        assert sum(sample["joules"] for sample in samples) == pytest.approx(40.0)
+        assert samples[-1]["labels"] == [["inference", "a1", "m1"]]
+
+    def test_labels_and_label_sets_are_bounded(self):
+        """Test free-form labels are pooled past the cap and unreferenced label sets are dropped"""
+        from energy_sampler import OTHER, EnergySampler, SyntheticSource
+
+        sampler = EnergySampler(SyntheticSource(), capacity=4, max_labels=3)
+        for domain in range(10):
+            with sampler.attribute("learning", agent="anchor"):
+                with sampler.attribute("learning", agent=f"skill:{domain}"):
+                    pass
+
+        assert len(sampler.totals) == 4
+        assert ("learning", OTHER, OTHER) in sampler.totals
+        assert len(sampler._sets) <= 2 * sampler.capacity
+        assert all(sample["labels"] for sample in sampler.recent(4))
+
+class TestExecutionAnalytics:
+    """Test columnar execution analytics"""
+    
+    def test_grouped_percentiles_match_per_group_computation(self):
+        """Test vectorized per-group stats agree with computing each group separately"""
+        import numpy as np
+        from analytics import ExecutionAnalytics
+        
+        analytics = ExecutionAnalytics(capacity=5000)
+        rng = np.random.default_rng(7)
+        hour = 3600 * (int(time.time()) // 3600)
+        rows = []
+        for i in range(3000):
+            entity = f"plugin-{i % 3}"
+            status = "failed" if i % 10 == 0 else "completed"
+            duration = float(rng.exponential(0.2 + i % 3))
+            timestamp = hour - 3600 * (i % 2) + 5
+            analytics.record("plugins", entity, status, duration, datetime.fromtimestamp(timestamp))
+            rows.append((entity, timestamp // 3600, status, duration))
+        
+        result = analytics.query("plugins", ["entity", "hour"], [50, 95])
+        assert result["executions"] == 3000
+        assert result["groups"] == 6
+        for row in result["rows"]:
+            bucket = datetime.fromisoformat(row["hour"]).timestamp() // 3600
+            group = [r for r in rows if r[0] == row["entity"] and r[1] == bucket]
+            durations = [r[3] for r in group]
+            assert row["count"] == len(group)
+            assert row["failure_rate"] == pytest.approx(sum(r[2] == "failed" for r in group) / len(group))
+            assert row["p95_latency"] == pytest.approx(np.percentile(durations, 95))
+            assert row["p50_latency"] == pytest.approx(np.percentile(durations, 50))
+        
+        filtered = analytics.query("plugins", ["status"], [50], entity="plugin-1")
+        assert {row["status"] for row in filtered["rows"]} == {"completed", "failed"}
+        assert sum(row["count"] for row in filtered["rows"]) == 1000
+    
+    def test_log_overwrites_oldest_rows_at_capacity(self):
+        """Test the columns stop growing at capacity and keep the newest rows"""
+        from analytics import ExecutionAnalytics
+        
+        analytics = ExecutionAnalytics(capacity=1500)
+        for i in range(2000):
+            analytics.record("workflows", "wf", "completed", float(i))
+        
+        log = analytics.logs["workflows"]
+        assert log.size == 1500
+        assert len(log.duration) == 1500
+        assert analytics.query("workflows", [], [0])["rows"][0]["p0_latency"] == 500.0
+    
+    def test_analytics_endpoint_reports_plugin_executions(self):
+        """Test executed plugins show up in /analytics and bad queries are rejected"""
+        from main import plugin_manager, PluginCreateRequest
+        
+        plugin = plugin_manager.create_plugin(PluginCreateRequest(
+            name="Analytics Test Plugin",
+            description="Echoes its input",
+            category="tool",
+            author="tests",
+            code="def echo(parameters, context):\n    return parameters\n"
+        ))
+        plugin_manager.enable_plugin(plugin.id)
+        for x in range(3):
+            assert client.post(f"/plugins/{plugin.id}/execute",
+                               json={"plugin_id": plugin.id, "method": "echo",
+                                     "parameters": {"x": x}}).status_code == 200
+        
+        response = client.get("/analytics/plugins", params={"group_by": "entity,method", "entity": plugin.id})
+        assert response.status_code == 200
+        rows = response.json()["rows"]
+        assert [(row["method"], row["count"], row["failure_rate"]) for row in rows] == [("echo", 3, 0.0)]
+        assert "p95_latency" in rows[0]
+        
+        assert client.get("/analytics/plugins", params={"group_by": "colour"}).status_code == 400
+        assert client.get("/analytics/agents").status_code == 404
+        assert client.get("/analytics").json()["sources"]["plugins"]["rows"] >= 3
+
+class TestAgentToolLoop:
+    """Test the tool-calling agent loop"""
+    
+    @pytest.mark.asyncio
+    async def test_tool_calls_run_concurrently_and_are_cached_per_turn(self):
+        """Test one response's tool calls overlap and repeated calls reuse the first result"""
+        from agent_executor import AgentExecutor, Tool, ToolCall
+        
+        invocations = []
+        
+        async def invoke(tool, arguments):
+            invocations.append(arguments["city"])
+            await asyncio.sleep(0.2)
+            return {"city": arguments["city"], "temp": 20}
+        
+        script = [
+            [ToolCall("1", "weather", {"city": "Oslo"}), ToolCall("2", "weather", {"city": "Rome"}),
+             ToolCall("3", "weather", {"city": "Oslo"})],
+            [ToolCall("4", "weather", {"city": "Rome"})],
+            []
+        ]
+        seen_messages = []
+        
+        async def complete(messages, tools):
+            seen_messages.append(list(messages))
+            assert tools[0]["function"]["name"] == "weather"
+            calls = script[len(seen_messages) - 1]
+            return {"content": "" if calls else "Both are 20C", "tool_calls": calls}
+        
+        tool = Tool("weather", "Current weather", {"type": "object"}, "plugin-1", "weather")
+        executor = AgentExecutor(complete, invoke, [tool], max_iterations=5)
+        started = time.monotonic()
+        steps = [step async for step in executor.run([{"role": "user", "content": "Weather?"}])]
+        elapsed = time.monotonic() - started
+        
+        assert sorted(invocations) == ["Oslo", "Rome"]
+        assert elapsed < 0.35
+        final = steps[-1]
+        assert final["response"] == "Both are 20C"
+        assert final["finish_reason"] == "stop"
+        assert (final["iterations"], final["tool_calls"], final["cached_tool_calls"]) == (3, 4, 2)
+        tool_messages = [m for m in seen_messages[1] if m["role"] == "tool"]
+        assert [m["tool_call_id"] for m in tool_messages] == ["1", "2", "3"]
+    
+    @pytest.mark.asyncio
+    async def test_loop_stops_at_max_iterations(self):
+        """Test a model that keeps calling tools is cut off and asked to answer without tools"""
+        from agent_executor import AgentExecutor, Tool, ToolCall
+        
+        specs_seen = []
+        
+        async def complete(messages, tools):
+            specs_seen.append(len(tools))
+            if not tools:
+                return {"content": "Best effort answer", "tool_calls": []}
+            return {"content": "", "tool_calls": [ToolCall(str(len(specs_seen)), "missing", {})]}
+        
+        executor = AgentExecutor(complete, None, [Tool("noop", "", {}, "plugin-1", "noop")], max_iterations=2)
+        steps = [step async for step in executor.run([])]
+        
+        assert specs_seen == [1, 1, 0]
+        assert steps[-1]["finish_reason"] == "max_iterations"
+        assert (steps[-1]["response"], steps[-1]["empty"]) == ("Best effort answer", False)
+        assert [s["error"] for s in steps if s["type"] == "tool_result"] == ["Unknown tool: missing"] * 2
+    
+    @pytest.mark.asyncio
+    async def test_closing_the_turn_cancels_shared_tool_calls(self):
+        """Test tool calls still running when the turn ends are cancelled"""
+        from agent_executor import AgentExecutor, Tool, ToolCall
+        
+        started = asyncio.Event()
+        cancelled = []
+        
+        async def invoke(tool, arguments):
+            started.set()
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                cancelled.append(tool.name)
+                raise
+        
+        async def complete(messages, tools):
+            return {"content": "", "tool_calls": [ToolCall("1", "slow", {})]}
+        
+        executor = AgentExecutor(complete, invoke, [Tool("slow", "", {}, "plugin-1", "slow")])
+        steps = executor.run([])
+        while (await steps.__anext__())["type"] != "tool_call":
+            pass
+        pending = asyncio.ensure_future(steps.__anext__())
+        await started.wait()
+        pending.cancel()
+        await asyncio.gather(pending, return_exceptions=True)
+        await steps.aclose()
+        await asyncio.sleep(0)
+        assert cancelled == ["slow"]
+        assert executor._cache == {}
+    
+    def test_tool_names_are_disambiguated(self):
+        """Test names that collide after sanitizing or truncation get numeric suffixes"""
+        from agent_executor import tool_name
+        
+        taken = set()
+        for plugin_name in ("my plugin", "my-plugin!", "my_plugin"):
+            taken.add(tool_name(plugin_name, "run", taken))
+        assert taken == {"my_plugin__run", "my-plugin___run", "my_plugin__run_2"}
+        
+        long_name = "x" * 80
+        first = tool_name(long_name, "a")
+        second = tool_name(long_name, "b", {first})
+        assert first != second and len(second) == 64 and second.endswith("_2")
+    
+    def test_chat_uses_agent_plugins_as_tools(self):
+        """Test /chat runs the plugin the model calls and streams the steps on /chat/stream"""
+        from main import plugin_manager, PluginCreateRequest, AgentCreateRequest
+        from agent_executor import ToolCall
+        
+        plugin = plugin_manager.create_plugin(PluginCreateRequest(
+            name="Adder",
+            description="Adds numbers",
+            category="tool",
+            author="tests",
+            code="def add(parameters, context):\n    return parameters['a'] + parameters['b']\n"
+        ))
+        plugin_manager.enable_plugin(plugin.id)
+        agent = agent_manager.create_agent(AgentCreateRequest(
+            name="Calculator",
+            description="Uses tools",
+            model_config={"name": "tool-model", "type": "api", "provider": "openai", "model_id": "gpt"},
+            system_prompt="Use tools",
+            tools=["Adder"]
+        ))
+        
+        async def complete(config, messages, tools=None):
+            if messages[-1]["role"] == "tool":
+                return {"content": f"The sum is {json.loads(messages[-1]['content'])['data']}", "tool_calls": []}
+            assert [t["function"]["name"] for t in tools] == ["Adder__add"]
+            return {"content": "", "tool_calls": [ToolCall("c1", "Adder__add", {"a": 2, "b": 3})]}
+        
+        with patch.object(agent_manager.model_manager, "complete", complete):
+            response = client.post("/chat", json={"agent_id": agent.id, "message": "2+3?", "stream": False})
+            streamed = client.post("/chat/stream", json={"agent_id": agent.id, "message": "2+3?"})
+        
+        assert response.status_code == 200
+        body = response.json()
+        assert body["response"] == "The sum is 5"
+        assert body["tool_calls"] == 1
+        assert [step["type"] for step in body["steps"]] == [
+            "model_response", "tool_call", "tool_result", "model_response"
+        ]
+        steps = [json.loads(line) for line in streamed.text.splitlines()]
+        assert steps[2]["result"] == {"success": True, "data": 5}
+        assert steps[-1]["type"] == "final"
+
+class TestPromptCaching:
+    """Test prompt prefix caching support"""
+    
+    def test_history_window_keeps_prefix_stable(self):
+        """Test history is trimmed in blocks so consecutive turns share their first messages"""
+        from prompt_cache import stable_history_window
+        
+        history = list(range(25))
+        assert stable_history_window(history[:9], 10) == list(range(9))
+        assert stable_history_window(history[:19], 10)[0] == 0
+        assert stable_history_window(history[:20], 10) == list(range(10, 20))
+        windows = [stable_history_window(history[:n], 10) for n in range(20, 26)]
+        assert all(window[0] == 10 for window in windows)
+        
+        # A window never opens on an assistant message
+        chat = [{"role": role} for role in ["user", "assistant", "user", "user", "assistant", "user"]]
+        assert stable_history_window(chat, 3) == chat[3:]
+        assert stable_history_window(chat, 2) == chat[5:]  # chat[4] is an assistant message
+    
+    def test_failed_turn_leaves_no_orphaned_user_message(self):
+        """Test a turn whose model call fails is not recorded in the conversation"""
+        from main import AgentCreateRequest
+        
+        agent = agent_manager.create_agent(AgentCreateRequest(
+            name="Flaky",
+            description="Model fails once",
+            model_config={"name": "flaky-model", "type": "api", "provider": "anthropic", "model_id": "claude"},
+            system_prompt="Be brief"
+        ))
+        seen = []
+        
+        async def complete(config, messages, tools=None):
+            seen.append([m["role"] for m in messages])
+            if len(seen) == 1:
+                raise RuntimeError("overloaded")
+            return {"content": "Hello", "tool_calls": []}
+        
+        with patch.object(agent_manager.model_manager, "complete", complete):
+            assert client.post("/chat", json={"agent_id": agent.id, "message": "Hi", "stream": False}).status_code == 500
+            assert agent_manager.active_conversations[agent.id] == []
+            assert client.post("/chat", json={"agent_id": agent.id, "message": "Hi", "stream": False}).status_code == 200
+        
+        assert seen[-1] == ["system", "user"]
+        assert [m.role for m in agent_manager.active_conversations[agent.id]] == ["user", "assistant"]
+    
+    def test_cache_breakpoints_only_for_explicit_providers(self):
+        """Test Anthropic requests get cache_control on tools, system prompt and latest message"""
+        from prompt_cache import apply_cache_control
+        
+        messages = [
+            {"role": "system", "content": "Long instructions"},
+            {"role": "user", "content": "Hi"},
+            {"role": "assistant", "content": "Hello"},
+            {"role": "user", "content": "Add 2 and 3"}
+        ]
+        tools = [{"type": "function", "function": {"name": "a"}}, {"type": "function", "function": {"name": "b"}}]
+        
+        assert apply_cache_control("openai", messages, tools) == (messages, tools)
+        marked, marked_tools = apply_cache_control("anthropic", messages, tools)
+        assert marked[0]["content"] == [{"type": "text", "text": "Long instructions",
+                                         "cache_control": {"type": "ephemeral"}}]
+        assert marked[3]["content"][0]["cache_control"] == {"type": "ephemeral"}
+        assert marked[1]["content"] == "Hi" and marked[2]["content"] == "Hello"
+        assert "cache_control" in marked_tools[1] and "cache_control" not in marked_tools[0]
+        assert messages[0]["content"] == "Long instructions"
+    
+    @pytest.mark.asyncio
+    async def test_cached_tokens_are_reported_in_metrics(self):
+        """Test cached and uncached input tokens from responses accumulate per model"""
+        from types import SimpleNamespace
+        import main
+        from main import ModelConfig
+        
+        usages = [
+            {"prompt_tokens": 1200, "completion_tokens": 10, "cache_creation_input_tokens": 1100},
+            {"prompt_tokens": 1250, "completion_tokens": 12, "prompt_tokens_details": {"cached_tokens": 1100}}
+        ]
+        sent = []
+        
+        async def acompletion(model, messages, **options):
+            sent.append(messages)
+            message = SimpleNamespace(content="ok", tool_calls=None)
+            return SimpleNamespace(choices=[SimpleNamespace(message=message)], usage=usages[len(sent) - 1])
+        
+        config = ModelConfig(name="cache-test", type="api", provider="anthropic", model_id="claude")
+        litellm = SimpleNamespace(acompletion=acompletion)
+        with patch.object(main, "LITE_LLM_AVAILABLE", True), patch.object(main, "litellm", litellm, create=True):
+            for _ in usages:
+                result = await model_manager.complete(config, [{"role": "system", "content": "Rules"},
+                                                               {"role": "user", "content": "Hi"}])
+        
+        assert result["usage"]["cached_input_tokens"] == 1100
+        assert result["usage"]["uncached_input_tokens"] == 150
+        assert sent[0][0]["content"][0]["cache_control"] == {"type": "ephemeral"}
+        metrics = model_manager.performance_metrics["cache-test"]
+        assert metrics["input_tokens"] == 2450
+        assert metrics["cached_input_tokens"] == metrics["cache_write_tokens"] == 1100
+        assert metrics["cached_input_ratio"] == pytest.approx(1100 / 2450)
+
+class TestRequestHedging:
+    """Test hedged model requests"""
+    
+    @staticmethod
+    def _attempt(first_token_after, log, name):
+        async def attempt(first_token):
+            log.append(name)
+            try:
+                await asyncio.sleep(first_token_after)
+                first_token.set()
+                await asyncio.sleep(0.01)
+                return name
+            except asyncio.CancelledError:
+                log.append(f"{name} cancelled")
+                raise
+        return attempt
+    
+    @pytest.mark.asyncio
+    async def test_slow_first_token_is_hedged_within_budget(self):
+        """Test a hedge fires after the p90 TTFT, wins, cancels the primary and spends budget"""
+        from hedging import HedgePolicy, Hedger
+        
+        hedger = Hedger(HedgePolicy(min_samples=5, budget=0.1, burst=1))
+        for _ in range(5):
+            hedger.ttft.add(0.05)
+        
+        log = []
+        started = time.monotonic()
+        result, race = await hedger.run(self._attempt(1.0, log, "primary"), self._attempt(0.02, log, "hedge"))
+        assert result == "hedge"
+        assert race == {"hedged": True, "winner": "hedge", "hedge_delay": pytest.approx(0.05)}
+        assert time.monotonic() - started < 0.5
+        assert "primary cancelled" in log
+        # The losing primary is recorded at its elapsed time, never at the hedge's TTFT
+        assert hedger.ttft.count == 6
+        assert hedger.ttft.max >= 0.07
+        
+        # The budget is spent, so the next slow request waits for its primary
+        log.clear()
+        result, race = await hedger.run(self._attempt(0.2, log, "primary"), self._attempt(0.0, log, "hedge"))
+        assert (result, race["hedged"]) == ("primary", False)
+        assert log == ["primary"]
+        assert hedger.stats()["budget_denied"] == 1
+    
+    @pytest.mark.asyncio
+    async def test_no_hedging_without_ttft_history_and_failures_fall_through(self):
+        """Test hedging waits for TTFT samples, and a primary failing mid-race leaves the hedge to answer"""
+        from hedging import HedgePolicy, Hedger
+        
+        hedger = Hedger(HedgePolicy(min_samples=3))
+        log = []
+        result, race = await hedger.run(self._attempt(0.01, log, "primary"), self._attempt(0.0, log, "hedge"))
+        assert (result, race["hedged"], race["hedge_delay"]) == ("primary", False, None)
+        
+        for _ in range(3):
+            hedger.ttft.add(0.02)
+        
+        async def failing(first_token):
+            await asyncio.sleep(0.04)  # after the hedge starts, before it responds
+            raise RuntimeError("backend unavailable")
+        
+        result, race = await hedger.run(failing, self._attempt(0.1, log, "hedge"))
+        assert (result, race["winner"]) == ("hedge", "hedge")
+        assert hedger.ttft.count == 4  # The failed primary has no TTFT
+    
+    @pytest.mark.asyncio
+    async def test_model_hedges_to_alternate_backend(self):
+        """Test ModelConfig.hedging routes the hedge to the alternate model and counts it"""
+        from main import ModelConfig
+        
+        with pytest.raises(ValueError):
+            ModelConfig(name="bad", type="api", provider="openai", model_id="m", hedging={"percentile": 120})
+        
+        disabled = ModelConfig(name="hedge-off", type="api", provider="openai", model_id="m",
+                               hedging={"enabled": False})
+        assert model_manager._hedger(disabled) is None
+        assert "hedge-off" not in model_manager.hedgers
+        
+        primary = ModelConfig(name="hedge-primary", type="api", provider="openai", model_id="m",
+                              hedging={"alternate": "hedge-backup", "min_samples": 1})
+        model_manager.add_model_config(ModelConfig(name="hedge-backup", type="api", provider="openai", model_id="b"))
+        model_manager._hedger(primary).ttft.add(0.01)
+        
+        async def complete_once(config, messages, tools=None, first_token=None):
+            await asyncio.sleep(1.0 if config.name == "hedge-primary" else 0.0)
+            return {"content": config.name, "tool_calls": []}
+        
+        with patch.object(model_manager, "_complete_once", complete_once):
+            result = await model_manager.complete(primary, [{"role": "user", "content": "hi"}])
+        
+        assert result["content"] == "hedge-backup"
+        assert result["hedge"]["winner"] == "hedge"
+        metrics = model_manager.performance_metrics["hedge-primary"]
+        assert (metrics["hedged_requests"], metrics["hedge_wins"]) == (1, 1)
+
+class TestModelWarmup:
+    """Test startup model warm-up and readiness gating"""
+    
+    @pytest.mark.asyncio
+    async def test_ready_only_once_critical_models_answer(self):
+        """Test probes run concurrently with timeouts and critical failures are retried"""
+        from types import SimpleNamespace
+        from model_warmup import ModelWarmer
+        
+        cold = {"vllm": 2}  # fails its first two probes, like a server still loading weights
+        
+        async def probe(config):
+            if config.name == "hung":
+                await asyncio.sleep(10)
+            if cold.get(config.name):
+                cold[config.name] -= 1
+                raise ConnectionError("connection refused")
+            await asyncio.sleep(0.05)
+        
+        configs = [SimpleNamespace(name=name) for name in ("vllm", "api", "hung")]
+        warmer = ModelWarmer(probe, critical=["vllm"], timeout=0.2, retry_interval=0.05, enabled=True)
+        assert not warmer.ready
+        
+        started = time.monotonic()
+        warmer.start(configs)
+        while not warmer.first_round_done:
+            await asyncio.sleep(0.01)
+        assert time.monotonic() - started < 0.4
+        statuses = {m["name"]: m["status"] for m in warmer.report()["models"]}
+        assert statuses == {"vllm": "failed", "api": "ready", "hung": "failed"}
+        assert not warmer.ready
+        
+        for _ in range(100):
+            if warmer.ready:
+                break
+            await asyncio.sleep(0.02)
+        assert warmer.ready
+        assert warmer.models["vllm"].attempts == 3
+        assert warmer.models["hung"].attempts == 1  # not critical, so not retried
+        await warmer.stop()
+    
+    def test_ready_endpoint_reflects_warmup(self):
+        """Test /ready is 503 until warm-up finishes and 200 after, with per-model detail"""
+        import main
+        from model_warmup import ModelReadiness, ModelWarmer
+        
+        warmer = ModelWarmer(None, critical=["gpt-4o"], enabled=True)
+        warmer.models["gpt-4o"] = ModelReadiness("gpt-4o", critical=True, status="warming")
+        with patch.object(main, "model_warmer", warmer):
+            assert client.get("/ready").status_code == 503
+            warmer.models["gpt-4o"].status = "ready"
+            warmer.first_round_done = True
+            response = client.get("/ready")
+        
+        assert response.status_code == 200
+        assert response.json()["models"][0]["name"] == "gpt-4o"
+        assert client.get("/health").status_code == 200
+
 if __name__ == "__main__":
     pytest.main([__file__])
\ No newline at end of file
@@ -0,0 +1,167 @@
+"""
+Time-series store for Google ADK Agent Platform
+Append-only, time-indexed records with range queries, minute and hour rollups, and retention
+"""
+
+import bisect
+import os
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+TIMESERIES_RAW_RETENTION_SECONDS = float(os.getenv("TIMESERIES_RAW_RETENTION_SECONDS", str(24 * 3600)))
+TIMESERIES_MINUTE_RETENTION_SECONDS = float(os.getenv("TIMESERIES_MINUTE_RETENTION_SECONDS", str(7 * 24 * 3600)))
+TIMESERIES_HOUR_RETENTION_SECONDS = float(os.getenv("TIMESERIES_HOUR_RETENTION_SECONDS", str(90 * 24 * 3600)))
+
+# Rollup resolutions in seconds
+RESOLUTIONS = {"minute": 60, "hour": 3600}
+
+
+class _Rollup:
+    """Per-bucket count plus sum/min/max of each value field"""
+
+    def __init__(self, width: int, retention: float):
+        self.width = width
+        self.retention = retention
+        self.starts: List[float] = []
+        self.buckets: Dict[float, Dict[str, Any]] = {}
+
+    def add(self, timestamp: float, values: Dict[str, float]) -> None:
+        start = timestamp - timestamp % self.width
+        bucket = self.buckets.get(start)
+        if bucket is None:
+            bucket = self.buckets[start] = {"count": 0, "fields": {}}
+            if not self.starts or start > self.starts[-1]:
+                self.starts.append(start)
+            else:
+                bisect.insort(self.starts, start)  # clock stepped backwards
+        bucket["count"] += 1
+        for name, value in values.items():
+            stats = bucket["fields"].get(name)
+            if stats is None:
+                bucket["fields"][name] = [value, value, value]  # sum, min, max
+            else:
+                stats[0] += value
+                stats[1] = min(stats[1], value)
+                stats[2] = max(stats[2], value)
+
+    def trim(self, now: float) -> None:
+        expired = bisect.bisect_left(self.starts, now - self.retention - self.width)
+        if expired:
+            for start in self.starts[:expired]:
+                del self.buckets[start]
+            del self.starts[:expired]
+
+    def query(self, start: float, end: float) -> List[Dict[str, Any]]:
+        lo = bisect.bisect_left(self.starts, start - start % self.width)
+        hi = bisect.bisect_right(self.starts, end)
+        rows = []
+        for bucket_start in self.starts[lo:hi]:
+            bucket = self.buckets[bucket_start]
+            rows.append({
+                "start": datetime.fromtimestamp(bucket_start).isoformat(),
+                "count": bucket["count"],
+                "fields": {
+                    name: {"mean": total / bucket["count"], "min": low, "max": high, "sum": total}
+                    for name, (total, low, high) in bucket["fields"].items()
+                }
+            })
+        return rows
+
+
+class _Series:
+    def __init__(self, rollup_retention: Dict[str, float]):
+        self.timestamps: List[float] = []
+        self.records: List[Dict[str, Any]] = []
+        self.rollups = {name: _Rollup(RESOLUTIONS[name], retention) for name, retention in rollup_retention.items()}
+
+
+class TimeSeriesStore:
+    """Named series of records indexed by time.
+
+    Appends keep each series sorted, so a time range is two binary searches
+    away. Rollups are updated on append, so aggregated queries cost the number
+    of buckets rather than records. Records tagged with labels (for example a
+    skill domain) are also indexed under a per-label series, so filtered
+    queries stay range lookups too.
+    """
+
+    def __init__(self, raw_retention: float = TIMESERIES_RAW_RETENTION_SECONDS,
+                 rollup_retention: Optional[Dict[str, float]] = None):
+        self.raw_retention = raw_retention
+        self.rollup_retention = rollup_retention or {
+            "minute": TIMESERIES_MINUTE_RETENTION_SECONDS,
+            "hour": TIMESERIES_HOUR_RETENTION_SECONDS
+        }
+        self.series: Dict[str, _Series] = {}
+
+    @staticmethod
+    def _key(series: str, tag: Optional[str] = None, value: Optional[str] = None) -> str:
+        return series if tag is None else f"{series}|{tag}={value}"
+
+    def append(self, series: str, record: Dict[str, Any], values: Optional[Dict[str, float]] = None,
+               tags: Optional[Dict[str, Optional[str]]] = None, timestamp: Optional[float] = None) -> None:
+        """Store a record with the numeric fields to roll up and the labels to index it by"""
+        timestamp = time.time() if timestamp is None else timestamp
+        keys = [self._key(series)] + [self._key(series, tag, value)
+                                      for tag, value in (tags or {}).items() if value is not None]
+        for key in keys:
+            entry = self.series.get(key)
+            if entry is None:
+                entry = self.series[key] = _Series(self.rollup_retention)
+            if not entry.timestamps or timestamp >= entry.timestamps[-1]:
+                entry.timestamps.append(timestamp)
+                entry.records.append(record)
+            else:
+                position = bisect.bisect_right(entry.timestamps, timestamp)
+                entry.timestamps.insert(position, timestamp)
+                entry.records.insert(position, record)
+            for rollup in entry.rollups.values():
+                rollup.add(timestamp, values or {})
+            self._trim(entry, timestamp)
+
+    def _trim(self, entry: _Series, now: float) -> None:
+        # Expired raw points are dropped in batches so appends stay amortized O(1)
+        cutoff = now - self.raw_retention
+        if entry.timestamps and entry.timestamps[0] < cutoff:
+            expired = bisect.bisect_left(entry.timestamps, cutoff)
+            if expired * 8 >= len(entry.timestamps) or expired >= 1024:
+                del entry.timestamps[:expired]
+                del entry.records[:expired]
+                for rollup in entry.rollups.values():
+                    rollup.trim(now)
+
+    def _bounds(self, entry: _Series, start: Optional[float], end: Optional[float]) -> range:
+        start = max(start if start is not None else 0.0, time.time() - self.raw_retention)
+        lo = bisect.bisect_left(entry.timestamps, start)
+        hi = len(entry.timestamps) if end is None else bisect.bisect_right(entry.timestamps, end)
+        return range(lo, hi)
+
+    def count(self, series: str, start: Optional[float] = None, end: Optional[float] = None,
+              tag: Optional[str] = None, value: Optional[str] = None) -> int:
+        entry = self.series.get(self._key(series, tag, value))
+        return len(self._bounds(entry, start, end)) if entry else 0
+
+    def range(self, series: str, start: Optional[float] = None, end: Optional[float] = None,
+              limit: Optional[int] = None, tag: Optional[str] = None, value: Optional[str] = None,
+              newest_first: bool = True) -> List[Dict[str, Any]]:
+        """Raw records in [start, end], newest first by default"""
+        entry = self.series.get(self._key(series, tag, value))
+        if entry is None:
+            return []
+        bounds = self._bounds(entry, start, end)
+        if newest_first:
+            bounds = bounds[::-1]
+        if limit is not None:
+            bounds = bounds[:limit]
+        return [entry.records[i] for i in bounds]
+
+    def rollup(self, series: str, resolution: str, start: Optional[float] = None, end: Optional[float] = None,
+               tag: Optional[str] = None, value: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Pre-aggregated buckets at a resolution, oldest first"""
+        if resolution not in RESOLUTIONS:
+            raise ValueError(f"Unknown resolution: {resolution}; use one of {sorted(RESOLUTIONS)}")
+        entry = self.series.get(self._key(series, tag, value))
+        if entry is None or resolution not in entry.rollups:
+            return []
+        return entry.rollups[resolution].query(start or 0.0, time.time() if end is None else end)
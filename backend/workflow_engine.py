@@ -0,0 +1,274 @@
+"""
+Workflow execution engine for Google ADK Agent Platform
+Traverses workflow graphs node by node with deadlines, cancellation and resource budgets
+"""
+
+import asyncio
+import os
+import time
+from collections import defaultdict, deque
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Sequence, Tuple
+
+import structlog
+
+logger = structlog.get_logger(__name__)
+
+# Upper bound on concurrent chunks for map nodes and batch executions
+MAP_MAX_CONCURRENCY = int(os.getenv("MAP_MAX_CONCURRENCY", "64"))
+
+
+class WorkflowTimeoutError(Exception):
+    """Raised when a node or a whole execution runs past its deadline"""
+
+
+class WorkflowBudgetExceededError(Exception):
+    """Raised when an execution exhausts its token or cost budget"""
+
+
+@dataclass
+class ExecutionBudget:
+    """Wall-clock, token and cost limits for a single workflow execution"""
+    execution_timeout: Optional[float] = None  # seconds for the whole execution
+    node_timeout: Optional[float] = None  # default seconds per node
+    max_tokens: Optional[int] = None
+    max_cost: Optional[float] = None
+
+
+@dataclass
+class ExecutionContext:
+    """Mutable state shared by all nodes of one workflow execution"""
+    execution_id: str
+    workflow_id: str
+    input_data: Dict[str, Any]
+    budget: ExecutionBudget
+    started_at: float = field(default_factory=time.monotonic)
+    tokens_used: int = 0
+    cost_used: float = 0.0
+    node_outputs: Dict[str, Any] = field(default_factory=dict)
+    parent: Optional["ExecutionContext"] = None  # set for map sub-executions
+    blob_handles: List[Dict[str, Any]] = field(default_factory=list)  # blobs pinned until the execution ends
+
+    def root(self) -> "ExecutionContext":
+        """The top-level execution this context belongs to"""
+        return self if self.parent is None else self.parent.root()
+
+    def remaining_time(self) -> Optional[float]:
+        """Seconds left before the execution deadline, or None if unbounded"""
+        if self.budget.execution_timeout is None:
+            return None
+        return self.budget.execution_timeout - (time.monotonic() - self.started_at)
+
+    def charge(self, tokens: int = 0, cost: float = 0.0) -> None:
+        """Account for tokens and cost spent by a node, enforcing the budget"""
+        if self.parent is not None:
+            self.parent.charge(tokens, cost)
+        self.tokens_used += tokens
+        self.cost_used += cost
+
+        if self.budget.max_tokens is not None and self.tokens_used > self.budget.max_tokens:
+            raise WorkflowBudgetExceededError(
+                f"Token budget exceeded: {self.tokens_used} > {self.budget.max_tokens}"
+            )
+        if self.budget.max_cost is not None and self.cost_used > self.budget.max_cost:
+            raise WorkflowBudgetExceededError(
+                f"Cost budget exceeded: {self.cost_used:.4f} > {self.budget.max_cost:.4f}"
+            )
+
+    def child(self, execution_id: str, workflow_id: str, input_data: Dict[str, Any]) -> "ExecutionContext":
+        """Context for a sub-execution that charges this execution's budget"""
+        remaining = self.remaining_time()
+        return ExecutionContext(
+            execution_id=execution_id,
+            workflow_id=workflow_id,
+            input_data=input_data,
+            budget=ExecutionBudget(
+                execution_timeout=remaining,
+                node_timeout=self.budget.node_timeout
+            ),
+            parent=self
+        )
+
+    def restore_usage(self, usage: Dict[str, Any]) -> None:
+        """Carry over usage recorded before a resume so the budget is not reset"""
+        self.tokens_used = usage.get("tokens_used", 0)
+        self.cost_used = usage.get("cost_used", 0.0)
+        self.started_at -= usage.get("elapsed_time", 0.0)
+
+    def usage(self) -> Dict[str, Any]:
+        """Resource usage so far"""
+        return {
+            "tokens_used": self.tokens_used,
+            "cost_used": self.cost_used,
+            "elapsed_time": time.monotonic() - self.started_at
+        }
+
+
+async def map_bounded(
+    items: Sequence[Any],
+    func: Callable[[Any], Awaitable[Any]],
+    concurrency: Optional[int] = 8,
+    chunk_size: int = 1,
+    ordered: bool = True
+) -> AsyncIterator[Tuple[int, Any, Optional[Exception]]]:
+    """Apply func to items with at most `concurrency` chunks in flight.
+
+    Yields (index, result, error) as results become available. With ordered=True
+    results are yielded in input order, buffering at most a few windows ahead.
+    Concurrency is capped at MAP_MAX_CONCURRENCY, which also applies when it is
+    None. Closing the generator early cancels the chunks still in flight, so
+    consumers that may stop early should iterate under contextlib.aclosing.
+    """
+    concurrency = max(1, min(concurrency or MAP_MAX_CONCURRENCY, MAP_MAX_CONCURRENCY))
+    chunk_size = max(1, chunk_size)
+    chunk_starts = iter(range(0, len(items), chunk_size))
+    max_buffered = concurrency * chunk_size * 4
+
+    async def run_chunk(start: int) -> List[Tuple[int, Any, Optional[Exception]]]:
+        results = []
+        for index in range(start, min(start + chunk_size, len(items))):
+            try:
+                results.append((index, await func(items[index]), None))
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                results.append((index, None, e))
+        return results
+
+    pending: set = set()
+    buffered: Dict[int, Tuple[Any, Optional[Exception]]] = {}
+    next_index = 0
+
+    def refill() -> None:
+        while len(pending) < concurrency and (not ordered or len(buffered) < max_buffered):
+            start = next(chunk_starts, None)
+            if start is None:
+                return
+            pending.add(asyncio.ensure_future(run_chunk(start)))
+
+    try:
+        refill()
+        while pending:
+            done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                pending.discard(task)
+                for index, result, error in task.result():
+                    if ordered:
+                        buffered[index] = (result, error)
+                    else:
+                        yield index, result, error
+
+            while next_index in buffered:
+                result, error = buffered.pop(next_index)
+                yield next_index, result, error
+                next_index += 1
+
+            refill()
+    finally:
+        for task in pending:
+            task.cancel()
+        if pending:
+            await asyncio.gather(*pending, return_exceptions=True)
+
+
+NodeExecutor = Callable[[Any, Dict[str, Any], ExecutionContext], Awaitable[Any]]
+
+
+class WorkflowEngine:
+    """Executes workflow nodes in dependency order under an ExecutionBudget"""
+
+    def __init__(self, node_executor: NodeExecutor, checkpoint_store: Optional[Any] = None):
+        self.node_executor = node_executor
+        self.checkpoint_store = checkpoint_store
+
+    @staticmethod
+    def build_edges(nodes: List[Any], connections: List[Any]) -> Dict[str, List[str]]:
+        """Map each node id to the ids of its upstream nodes"""
+        node_ids = {node.id for node in nodes}
+        upstream: Dict[str, List[str]] = {node.id: [] for node in nodes}
+
+        edges = [(c.sourceId, c.targetId) for c in connections]
+        for node in nodes:
+            edges.extend((node.id, target) for target in node.connections)
+
+        for source, target in edges:
+            if source in node_ids and target in node_ids and source not in upstream[target]:
+                upstream[target].append(source)
+
+        return upstream
+
+    @classmethod
+    def execution_order(cls, nodes: List[Any], connections: List[Any]) -> List[Any]:
+        """Topologically sort nodes, raising ValueError if the graph has a cycle"""
+        upstream = cls.build_edges(nodes, connections)
+        downstream: Dict[str, List[str]] = defaultdict(list)
+        for target, sources in upstream.items():
+            for source in sources:
+                downstream[source].append(target)
+
+        by_id = {node.id: node for node in nodes}
+        pending = {node_id: len(sources) for node_id, sources in upstream.items()}
+        ready = deque(node.id for node in nodes if pending[node.id] == 0)
+        order = []
+
+        while ready:
+            node_id = ready.popleft()
+            order.append(by_id[node_id])
+            for target in downstream[node_id]:
+                pending[target] -= 1
+                if pending[target] == 0:
+                    ready.append(target)
+
+        if len(order) != len(nodes):
+            raise ValueError("Workflow graph contains a cycle")
+        return order
+
+    def _node_timeout(self, node: Any, context: ExecutionContext) -> Optional[float]:
+        """Effective deadline for a node: its own timeout capped by the execution deadline"""
+        timeout = node.data.get("timeout_seconds", context.budget.node_timeout)
+        remaining = context.remaining_time()
+
+        if remaining is not None:
+            if remaining <= 0:
+                raise WorkflowTimeoutError(
+                    f"Execution exceeded {context.budget.execution_timeout}s deadline"
+                )
+            timeout = remaining if timeout is None else min(timeout, remaining)
+
+        return timeout
+
+    async def run(self, nodes: List[Any], connections: List[Any], context: ExecutionContext) -> Dict[str, Any]:
+        """Run every node once, feeding each the outputs of its upstream nodes"""
+        upstream = self.build_edges(nodes, connections)
+
+        for node in self.execution_order(nodes, connections):
+            if node.id in context.node_outputs:
+                # Restored from a checkpoint; don't repeat the work
+                continue
+
+            sources = upstream[node.id]
+            if sources:
+                inputs = {source: context.node_outputs.get(source) for source in sources}
+            else:
+                inputs = dict(context.input_data)
+
+            timeout = self._node_timeout(node, context)
+            try:
+                output = await asyncio.wait_for(self.node_executor(node, inputs, context), timeout)
+            except asyncio.TimeoutError:
+                remaining = context.remaining_time()
+                if remaining is not None and remaining <= 0:
+                    raise WorkflowTimeoutError(
+                        f"Execution exceeded {context.budget.execution_timeout}s deadline at node {node.id}"
+                    )
+                raise WorkflowTimeoutError(f"Node {node.id} exceeded {timeout}s timeout")
+
+            context.node_outputs[node.id] = output
+            if self.checkpoint_store is not None and context.parent is None:
+                await asyncio.to_thread(
+                    self.checkpoint_store.save_node_output, context.execution_id, node.id, output, context.usage()
+                )
+            logger.debug("Workflow node completed", execution_id=context.execution_id,
+                         node_id=node.id, node_type=node.type)
+
+        return context.node_outputs
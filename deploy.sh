@@ -177,7 +177,8 @@ python -m vllm.entrypoints.openai.api_server \
     --port 8000 \
     --tensor-parallel-size 1 \
     --max-model-len 4096 \
-    --gpu-memory-utilization 0.9
+    --gpu-memory-utilization 0.9 \
+    --enable-prefix-caching
 
 EOF
             
@@ -370,6 +370,7 @@ python -m vllm.entrypoints.openai.api_server \
     --tensor-parallel-size 1 \
     --max-model-len 4096 \
     --gpu-memory-utilization 0.9 \
+    --enable-prefix-caching \
     --enable-auto-tool-choice \
     --trust-remote-code
 
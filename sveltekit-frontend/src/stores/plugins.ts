@@ -1,4 +1,4 @@
-import { writable, derived } from 'svelte/store';
+import { writable, derived, get } from 'svelte/store';
 import type { Writable, Readable } from 'svelte/store';
 
 // Plugin Types
@@ -137,26 +137,8 @@ export const activePlugins: Readable<PluginMarketplaceItem[]> = derived(
 export const filteredPlugins: Readable<PluginMarketplaceItem[]> = derived(
   [pluginState],
   ([$pluginState]) => {
-    let plugins = $pluginState.availablePlugins;
-    
-    // Apply search filter
-    if ($pluginState.searchQuery.trim()) {
-      const query = $pluginState.searchQuery.toLowerCase();
-      plugins = plugins.filter(plugin => 
-        plugin.name.toLowerCase().includes(query) ||
-        plugin.description.toLowerCase().includes(query) ||
-        plugin.tags.some(tag => tag.toLowerCase().includes(query))
-      );
-    }
-    
-    // Apply category filter
-    if ($pluginState.selectedCategory !== 'all') {
-      plugins = plugins.filter(plugin => 
-        plugin.category.toLowerCase() === $pluginState.selectedCategory.toLowerCase()
-      );
-    }
-    
-    return plugins;
+    // Search and category filtering happen server-side in loadMarketplace
+    return $pluginState.availablePlugins;
   }
 );
 
@@ -165,19 +147,34 @@ export const pluginCategories: Readable<string[]> = derived(
   ([$pluginState]) => $pluginState.pluginCategories
 );
 
+// Marketplace search: typing is debounced, and a newer request supersedes any in flight
+const SEARCH_DEBOUNCE_MS = 250;
+let searchTimer: ReturnType<typeof setTimeout> | undefined;
+let marketplaceRequest: AbortController | null = null;
+
 // Initialize plugin actions
 const initializePluginActions = () => {
   const actions: PluginActions = {
     loadMarketplace: async () => {
+      clearTimeout(searchTimer);
+      marketplaceRequest?.abort();
+      const request = new AbortController();
+      marketplaceRequest = request;
       pluginState.update(state => ({ ...state, isLoading: true, error: null }));
       
       try {
-        const response = await fetch('/api/plugins/marketplace');
+        const { searchQuery, selectedCategory } = get(pluginState);
+        const params = new URLSearchParams();
+        if (searchQuery.trim()) params.set('q', searchQuery.trim());
+        if (selectedCategory !== 'all') params.set('category', selectedCategory);
+        
+        const response = await fetch(`/api/plugins/marketplace?${params}`, { signal: request.signal });
         if (!response.ok) {
           throw new Error(`Failed to load marketplace: ${response.statusText}`);
         }
         
         const data = await response.json();
+        if (request !== marketplaceRequest) return;
         
         pluginState.update(state => ({
           ...state,
@@ -186,11 +183,15 @@ const initializePluginActions = () => {
           isLoading: false
         }));
       } catch (error) {
+        // Superseded by a newer search; that request owns the loading state
+        if (request !== marketplaceRequest) return;
         pluginState.update(state => ({
           ...state,
           error: error instanceof Error ? error.message : 'Unknown error',
           isLoading: false
         }));
+      } finally {
+        if (request === marketplaceRequest) marketplaceRequest = null;
       }
     },
 
@@ -199,6 +200,8 @@ const initializePluginActions = () => {
         ...state,
         searchQuery: query
       }));
+      clearTimeout(searchTimer);
+      searchTimer = setTimeout(() => actions.loadMarketplace(), SEARCH_DEBOUNCE_MS);
     },
 
     filterByCategory: (category: string) => {
@@ -206,6 +209,7 @@ const initializePluginActions = () => {
         ...state,
         selectedCategory: category
       }));
+      actions.loadMarketplace();
     },
 
     installPlugin: async (pluginId: string) => {